@@ -3,12 +3,16 @@ Sécurité et authentification JWT
 """
 
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional, Tuple
 from jose import JWTError, jwt
 import bcrypt
+import threading
+import time
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
 from database.database import get_db
 from database.models import Utilisateur
 
@@ -21,6 +25,13 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30 * 24 * 60  # 30 jours
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+# Cache des utilisateurs authentifiés (par processus) : évite un SELECT sur utilisateur
+# à chaque requête. Les modifications faites via l'API l'invalident immédiatement ;
+# sur les autres workers, un changement (désactivation, rôle) est vu au plus tard après ce délai.
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.getenv("AUTH_PRINCIPAL_CACHE_TTL", "60"))
+_principal_cache: Dict[int, Tuple[float, dict]] = {}
+_principal_cache_lock = threading.Lock()
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Vérifie un mot de passe en utilisant bcrypt directement"""
@@ -72,6 +83,41 @@ def verify_token(token: str, credentials_exception):
         raise credentials_exception
 
 
+def invalidate_principal_cache(user_id: Optional[int] = None):
+    """Retire un utilisateur (ou tous si user_id est None) du cache d'authentification"""
+    with _principal_cache_lock:
+        if user_id is None:
+            _principal_cache.clear()
+        else:
+            _principal_cache.pop(user_id, None)
+
+
+def _load_principal(db: Session, user_id: int) -> Optional[Utilisateur]:
+    """
+    Charge l'utilisateur depuis le cache si possible. L'instance reconstruite est
+    rattachée à la session de la requête sans requête SQL, ce qui permet aux routes
+    de la modifier et de la valider comme un utilisateur chargé normalement.
+    """
+    if PRINCIPAL_CACHE_TTL_SECONDS > 0:
+        present = db.identity_map.get(identity_key(Utilisateur, user_id))
+        if present is not None:
+            return present
+        with _principal_cache_lock:
+            entry = _principal_cache.get(user_id)
+        if entry and entry[0] > time.monotonic():
+            user = Utilisateur(**entry[1])
+            make_transient_to_detached(user)
+            db.add(user)
+            return user
+
+    user = db.query(Utilisateur).filter(Utilisateur.id == user_id).first()
+    if user is not None and PRINCIPAL_CACHE_TTL_SECONDS > 0:
+        snapshot = {attr.key: getattr(user, attr.key) for attr in sa_inspect(Utilisateur).column_attrs}
+        with _principal_cache_lock:
+            _principal_cache[user_id] = (time.monotonic() + PRINCIPAL_CACHE_TTL_SECONDS, snapshot)
+    return user
+
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
@@ -84,7 +130,7 @@ async def get_current_user(
     )
     
     user_id = verify_token(token, credentials_exception)
-    user = db.query(Utilisateur).filter(Utilisateur.id == user_id).first()
+    user = _load_principal(db, user_id)
     
     if user is None:
         raise credentials_exception
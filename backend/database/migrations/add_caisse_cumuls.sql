@@ -0,0 +1,32 @@
+-- Migration: Cumuls des opérations de caisse
+-- GET /api/caisses/{id}/etat lit le total des entrées, des sorties et le nombre
+-- d'opérations directement sur la caisse au lieu de parcourir operation_caisse.
+-- Ces colonnes sont mises à jour avec chaque opération ; le script
+-- scripts/reconcilier_caisses.py les compare au registre des opérations.
+
+BEGIN;
+
+ALTER TABLE caisse ADD COLUMN IF NOT EXISTS total_entrees NUMERIC(14, 2) NOT NULL DEFAULT 0;
+ALTER TABLE caisse ADD COLUMN IF NOT EXISTS total_sorties NUMERIC(14, 2) NOT NULL DEFAULT 0;
+ALTER TABLE caisse ADD COLUMN IF NOT EXISTS nombre_operations INTEGER NOT NULL DEFAULT 0;
+
+-- Initialisation depuis l'historique existant
+UPDATE caisse c SET
+    total_entrees = r.total_entrees,
+    total_sorties = r.total_sorties,
+    nombre_operations = r.nombre_operations
+FROM (
+    SELECT
+        caisse_id,
+        COALESCE(SUM(montant) FILTER (WHERE type_operation IN ('entree', 'ouverture')), 0) AS total_entrees,
+        COALESCE(SUM(montant) FILTER (WHERE type_operation IN ('sortie', 'fermeture')), 0) AS total_sorties,
+        COUNT(*) AS nombre_operations
+    FROM operation_caisse
+    GROUP BY caisse_id
+) r
+WHERE r.caisse_id = c.id;
+
+-- Dernières opérations d'une caisse (état de la caisse)
+CREATE INDEX IF NOT EXISTS idx_operation_caisse_caisse_date ON operation_caisse (caisse_id, date_operation DESC);
+
+COMMIT;
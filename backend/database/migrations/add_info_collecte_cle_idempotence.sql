@@ -0,0 +1,13 @@
+-- Migration: Clé d'idempotence des collectes
+-- Renseignée par les terminaux qui rejouent leurs collectes hors ligne via
+-- POST /api/collectes/batch : une collecte déjà reçue n'est pas recréée.
+
+BEGIN;
+
+ALTER TABLE public.info_collecte
+    ADD COLUMN IF NOT EXISTS cle_idempotence VARCHAR(100);
+
+CREATE UNIQUE INDEX IF NOT EXISTS info_collecte_cle_idempotence_key
+    ON public.info_collecte (cle_idempotence);
+
+COMMIT;
@@ -0,0 +1,17 @@
+-- Migration: Index composites pour les filtres par période sur info_collecte
+-- Les filtres de date de l'API sont des plages [début, fin) sur date_collecte
+-- (services/plages_dates.py) et peuvent donc utiliser ces index.
+-- CONCURRENTLY : pas de verrou bloquant sur la table, à exécuter hors transaction.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_info_collecte_statut_annule_date
+    ON public.info_collecte (statut, annule, date_collecte);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_info_collecte_collecteur_date
+    ON public.info_collecte (collecteur_id, date_collecte);
+
+ANALYZE public.info_collecte;
+
+-- Vérification (doit afficher un Index Scan / Bitmap Index Scan sur l'un des index) :
+-- EXPLAIN SELECT count(*) FROM info_collecte
+--  WHERE statut = 'completed' AND annule = FALSE
+--    AND date_collecte >= DATE '2025-01-15' AND date_collecte < DATE '2025-01-16';
@@ -0,0 +1,113 @@
+-- Migration: Agrégats de collecte précalculés pour la cartographie
+-- La vue cartographie_contribuable_view ne regroupe plus toute la table info_collecte
+-- à chaque appel : elle lit la table cartographie_contribuable_stats, tenue à jour
+-- par l'API (création / validation / annulation de collecte) et reconstruite périodiquement.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS cartographie_contribuable_stats (
+    contribuable_id INTEGER PRIMARY KEY REFERENCES contribuable(id) ON DELETE CASCADE,
+    nombre_collectes INTEGER NOT NULL DEFAULT 0,
+    total_collecte NUMERIC(12, 2) NOT NULL DEFAULT 0,
+    derniere_collecte TIMESTAMP WITHOUT TIME ZONE,
+    updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Remplissage initial
+INSERT INTO cartographie_contribuable_stats
+    (contribuable_id, nombre_collectes, total_collecte, derniere_collecte, updated_at)
+SELECT
+    c.id,
+    COALESCE(a.nombre_collectes, 0),
+    COALESCE(a.total_collecte, 0),
+    a.derniere_collecte,
+    now()
+FROM contribuable c
+LEFT JOIN (
+    SELECT
+        ic.contribuable_id,
+        COUNT(*) AS nombre_collectes,
+        COALESCE(SUM(ic.montant), 0)::numeric(12,2) AS total_collecte,
+        MAX(ic.date_collecte) AS derniere_collecte
+    FROM info_collecte ic
+    WHERE ic.statut = 'completed'
+      AND ic.annule = FALSE
+    GROUP BY ic.contribuable_id
+) a ON a.contribuable_id = c.id
+ON CONFLICT (contribuable_id) DO UPDATE SET
+    nombre_collectes = EXCLUDED.nombre_collectes,
+    total_collecte = EXCLUDED.total_collecte,
+    derniere_collecte = EXCLUDED.derniere_collecte,
+    updated_at = EXCLUDED.updated_at;
+
+DROP VIEW IF EXISTS cartographie_contribuable_view;
+
+CREATE OR REPLACE VIEW cartographie_contribuable_view AS
+WITH taxes_impayees AS (
+    SELECT
+        at.contribuable_id,
+        json_agg(DISTINCT t.nom) AS taxes
+    FROM affectation_taxe at
+    JOIN taxe t ON t.id = at.taxe_id
+    WHERE at.actif = TRUE
+    GROUP BY at.contribuable_id
+),
+base_contribuables AS (
+    SELECT
+        c.id,
+        c.nom,
+        c.prenom,
+        c.nom_activite,
+        c.telephone,
+        c.adresse,
+        CASE
+            WHEN c.latitude BETWEEN -5 AND 5
+             AND c.longitude BETWEEN 6 AND 16 THEN c.latitude::float
+            WHEN q.geom IS NOT NULL THEN ST_Y(q.geom)::float
+            ELSE NULL
+        END AS latitude,
+        CASE
+            WHEN c.latitude BETWEEN -5 AND 5
+             AND c.longitude BETWEEN 6 AND 16 THEN c.longitude::float
+            WHEN q.geom IS NOT NULL THEN ST_X(q.geom)::float
+            ELSE NULL
+        END AS longitude,
+        c.photo_url,
+        c.actif,
+        tc.nom AS type_contribuable,
+        q.nom AS quartier,
+        z.nom AS zone,
+        CONCAT(cl.nom, ' ', COALESCE(cl.prenom, '')) AS collecteur
+    FROM contribuable c
+    LEFT JOIN quartier q ON q.id = c.quartier_id
+    LEFT JOIN zone z ON z.id = q.zone_id
+    LEFT JOIN type_contribuable tc ON tc.id = c.type_contribuable_id
+    LEFT JOIN collecteur cl ON cl.id = c.collecteur_id
+)
+SELECT
+    bc.id,
+    bc.nom,
+    bc.prenom,
+    bc.nom_activite,
+    bc.telephone,
+    bc.adresse,
+    bc.latitude,
+    bc.longitude,
+    bc.photo_url,
+    bc.actif,
+    bc.type_contribuable,
+    bc.quartier,
+    bc.zone,
+    bc.collecteur,
+    COALESCE(cs.derniere_collecte >= date_trunc('month', now()), FALSE) AS a_paye,
+    COALESCE(cs.total_collecte, 0)::numeric(12,2) AS total_collecte,
+    COALESCE(cs.nombre_collectes, 0) AS nombre_collectes,
+    cs.derniere_collecte,
+    COALESCE(ti.taxes, '[]'::json) AS taxes_impayees
+FROM base_contribuables bc
+LEFT JOIN cartographie_contribuable_stats cs ON cs.contribuable_id = bc.id
+LEFT JOIN taxes_impayees ti ON ti.contribuable_id = bc.id
+WHERE bc.latitude IS NOT NULL
+  AND bc.longitude IS NOT NULL;
+
+COMMIT;
@@ -0,0 +1,39 @@
+-- Migration: Cumul journalier des collectes pour les rapports
+-- Les endpoints /api/rapports/* lisent ce cumul (une ligne par jour, collecteur, taxe
+-- et moyen de paiement) au lieu de parcourir info_collecte. L'API le tient à jour à
+-- chaque changement de statut d'une collecte ; la journée en cours est lue en direct.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS collecte_daily_rollup (
+    jour DATE NOT NULL,
+    collecteur_id INTEGER NOT NULL REFERENCES collecteur(id) ON DELETE CASCADE,
+    taxe_id INTEGER NOT NULL REFERENCES taxe(id) ON DELETE CASCADE,
+    type_paiement type_paiement_enum NOT NULL,
+    montant_total NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    nombre_transactions INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (jour, collecteur_id, taxe_id, type_paiement)
+);
+
+CREATE INDEX IF NOT EXISTS idx_collecte_daily_rollup_collecteur ON collecte_daily_rollup (collecteur_id, jour);
+CREATE INDEX IF NOT EXISTS idx_collecte_daily_rollup_taxe ON collecte_daily_rollup (taxe_id, jour);
+
+-- Remplissage initial
+DELETE FROM collecte_daily_rollup;
+INSERT INTO collecte_daily_rollup
+    (jour, collecteur_id, taxe_id, type_paiement, montant_total, nombre_transactions, updated_at)
+SELECT
+    date(ic.date_collecte),
+    ic.collecteur_id,
+    ic.taxe_id,
+    ic.type_paiement,
+    COALESCE(SUM(ic.montant), 0),
+    COUNT(*),
+    now()
+FROM info_collecte ic
+WHERE ic.statut = 'completed'
+  AND ic.annule = FALSE
+GROUP BY date(ic.date_collecte), ic.collecteur_id, ic.taxe_id, ic.type_paiement;
+
+COMMIT;
@@ -0,0 +1,28 @@
+-- Migration: Détection des impayés en masse
+-- POST /api/impayes/detecter-impayes calcule tous les dossiers en quelques requêtes
+-- groupées. Cette table garde l'historique des exécutions, qui sert de point de
+-- reprise aux détections incrémentales (?incremental=true).
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS detection_impayes_execution (
+    id SERIAL PRIMARY KEY,
+    date_debut TIMESTAMP NOT NULL,
+    date_fin TIMESTAMP,
+    incremental BOOLEAN DEFAULT FALSE,
+    jours_retard_min INTEGER NOT NULL,
+    taux_penalite NUMERIC(5, 2) NOT NULL,
+    affectations_revues INTEGER DEFAULT 0,
+    dossiers_crees INTEGER DEFAULT 0,
+    dossiers_mis_a_jour INTEGER DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_detection_impayes_execution_date_debut ON detection_impayes_execution (date_debut);
+
+-- Montant payé par affectation (contribuable, taxe, depuis la date de début)
+CREATE INDEX IF NOT EXISTS idx_info_collecte_contribuable_taxe_date ON info_collecte (contribuable_id, taxe_id, date_collecte);
+
+-- Collectes modifiées depuis la dernière détection
+CREATE INDEX IF NOT EXISTS idx_info_collecte_updated_at ON info_collecte (updated_at);
+
+COMMIT;
@@ -0,0 +1,24 @@
+-- Migration: Séquence des références de collecte
+-- Les références COL-YYYYMMDD-NNNN étaient numérotées par COUNT(*) + 1, ce qui
+-- produisait des doublons lors de créations simultanées. Le numéro vient
+-- désormais de cette séquence (services/references_collecte.py).
+
+BEGIN;
+
+CREATE SEQUENCE IF NOT EXISTS info_collecte_reference_seq;
+
+-- Démarrer après le plus grand numéro déjà attribué pour ne pas réutiliser une référence existante
+SELECT setval(
+    'info_collecte_reference_seq',
+    GREATEST(
+        COALESCE((
+            SELECT MAX(substring(reference FROM '^COL-[0-9]{8}-([0-9]+)$')::bigint)
+            FROM info_collecte
+            WHERE reference ~ '^COL-[0-9]{8}-[0-9]+$'
+        ), 0),
+        (SELECT COUNT(*) FROM info_collecte),
+        1
+    )
+);
+
+COMMIT;
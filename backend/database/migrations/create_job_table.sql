@@ -0,0 +1,30 @@
+-- Migration: Tâches en arrière-plan
+-- Les endpoints longs (détection des impayés, génération des relances, fichier de
+-- commissions, exports PDF/CSV) acceptent ?asynchrone=true : ils enregistrent une
+-- tâche dans cette table et répondent immédiatement ; les workers (services/jobs.py)
+-- l'exécutent et y écrivent l'avancement et le résultat (GET /api/jobs/{id}).
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS job (
+    id SERIAL PRIMARY KEY,
+    type VARCHAR(50) NOT NULL,
+    statut VARCHAR(20) NOT NULL DEFAULT 'en_attente',
+    parametres JSON,
+    progression INTEGER DEFAULT 0,
+    message VARCHAR(255),
+    resultat JSON,
+    erreur TEXT,
+    tentatives INTEGER DEFAULT 0,
+    worker VARCHAR(100),
+    created_by INTEGER REFERENCES utilisateur(id) ON DELETE SET NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    heartbeat_at TIMESTAMP,
+    finished_at TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_job_statut_created_at ON job (statut, created_at);
+
+COMMIT;
@@ -3,7 +3,7 @@ Modèles SQLAlchemy pour la base de données PostgreSQL
 Application de Collecte de Taxe Municipale - Mairie de Libreville
 """
 
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Date, ForeignKey, Enum, Text, Numeric, JSON, UniqueConstraint, BigInteger
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Date, ForeignKey, Enum, Text, Numeric, JSON, UniqueConstraint, BigInteger, Index, Sequence
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
@@ -287,6 +287,10 @@ class AffectationTaxe(Base):
     dossiers_impayes = relationship("DossierImpaye", back_populates="affectation_taxe")
 
 
+# Numérotation des références de collecte (services/references_collecte.py)
+reference_collecte_seq = Sequence("info_collecte_reference_seq", metadata=Base.metadata)
+
+
 # ==================== TABLE INFO_COLLECTE ====================
 class InfoCollecte(Base):
     """Informations sur les collectes effectuées"""
@@ -301,6 +305,7 @@ class InfoCollecte(Base):
     type_paiement = Column(Enum(TypePaiementEnum, name='type_paiement_enum', create_type=False, values_callable=lambda x: [e.value for e in TypePaiementEnum]), nullable=False)
     statut = Column(Enum(StatutCollecteEnum, name='statut_collecte_enum', create_type=False, values_callable=lambda x: [e.value for e in StatutCollecteEnum]), default=StatutCollecteEnum.PENDING)
     reference = Column(String(50), unique=True, nullable=False, index=True)
+    cle_idempotence = Column(String(100), unique=True, nullable=True)  # Fournie par le terminal (synchronisation hors ligne)
     billetage = Column(Text, nullable=True)  # JSON: {"5000": 5, "1000": 10}
     date_collecte = Column(DateTime, nullable=False, default=datetime.utcnow)
     date_cloture = Column(DateTime, nullable=True)  # Date de clôture de journée
@@ -316,6 +321,41 @@ class InfoCollecte(Base):
     taxe = relationship("Taxe", back_populates="collectes")
     collecteur = relationship("Collecteur", back_populates="collectes")
     location = relationship("CollecteLocation", back_populates="collecte", uselist=False)
+    
+    # Filtres par période (plages [début, fin) sur date_collecte, cf. services/plages_dates.py)
+    __table_args__ = (
+        Index("idx_info_collecte_statut_annule_date", "statut", "annule", "date_collecte"),
+        Index("idx_info_collecte_collecteur_date", "collecteur_id", "date_collecte"),
+        # Montant payé par affectation (services/detection_impayes.py)
+        Index("idx_info_collecte_contribuable_taxe_date", "contribuable_id", "taxe_id", "date_collecte"),
+        Index("idx_info_collecte_updated_at", "updated_at"),
+    )
+
+
+# ==================== TABLE CARTOGRAPHIE_CONTRIBUABLE_STATS ====================
+class CartographieContribuableStats(Base):
+    """Agrégats de collecte par contribuable, maintenus pour la vue de cartographie"""
+    __tablename__ = "cartographie_contribuable_stats"
+    
+    contribuable_id = Column(Integer, ForeignKey("contribuable.id", ondelete="CASCADE"), primary_key=True)
+    nombre_collectes = Column(Integer, nullable=False, default=0)  # Collectes complétées non annulées
+    total_collecte = Column(Numeric(12, 2), nullable=False, default=0)
+    derniere_collecte = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# ==================== TABLE COLLECTE_DAILY_ROLLUP ====================
+class CollecteDailyRollup(Base):
+    """Cumul journalier des collectes complétées non annulées, pour les rapports"""
+    __tablename__ = "collecte_daily_rollup"
+    
+    jour = Column(Date, primary_key=True)
+    collecteur_id = Column(Integer, ForeignKey("collecteur.id", ondelete="CASCADE"), primary_key=True)
+    taxe_id = Column(Integer, ForeignKey("taxe.id", ondelete="CASCADE"), primary_key=True)
+    type_paiement = Column(Enum(TypePaiementEnum, name='type_paiement_enum', create_type=False, values_callable=lambda x: [e.value for e in TypePaiementEnum]), primary_key=True)
+    montant_total = Column(Numeric(14, 2), nullable=False, default=0)
+    nombre_transactions = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
 # ==================== TABLE ZONE_GEOGRAPHIQUE ====================
@@ -633,6 +673,22 @@ class DossierImpaye(Base):
     collecteur = relationship("Collecteur", back_populates="dossiers_impayes")
 
 
+# ==================== TABLE DETECTION_IMPAYES_EXECUTION ====================
+class DetectionImpayesExecution(Base):
+    """Historique des détections d'impayés (point de reprise des exécutions incrémentales)"""
+    __tablename__ = "detection_impayes_execution"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    date_debut = Column(DateTime, nullable=False, index=True)
+    date_fin = Column(DateTime, nullable=True)  # NULL tant que l'exécution n'est pas terminée
+    incremental = Column(Boolean, default=False)
+    jours_retard_min = Column(Integer, nullable=False)
+    taux_penalite = Column(Numeric(5, 2), nullable=False)
+    affectations_revues = Column(Integer, default=0)
+    dossiers_crees = Column(Integer, default=0)
+    dossiers_mis_a_jour = Column(Integer, default=0)
+
+
 # ==================== ENUM TYPE CAISSE ====================
 class TypeCaisseEnum(str, enum.Enum):
     """Types de caisses"""
@@ -677,6 +733,10 @@ class Caisse(Base):
     date_fermeture = Column(DateTime, nullable=True)  # Date de dernière fermeture
     date_cloture = Column(DateTime, nullable=True)  # Date de dernière clôture
     montant_cloture = Column(Numeric(12, 2), nullable=True)  # Montant à la clôture
+    # Cumuls des opérations, tenus à jour avec chaque opération (services/soldes_caisse.py)
+    total_entrees = Column(Numeric(14, 2), nullable=False, default=0, server_default="0")
+    total_sorties = Column(Numeric(14, 2), nullable=False, default=0, server_default="0")
+    nombre_operations = Column(Integer, nullable=False, default=0, server_default="0")
     notes = Column(Text, nullable=True)  # Notes sur la caisse
     actif = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -691,6 +751,9 @@ class Caisse(Base):
 class OperationCaisse(Base):
     """Opérations de caisse des collecteurs"""
     __tablename__ = "operation_caisse"
+    __table_args__ = (
+        Index("idx_operation_caisse_caisse_date", "caisse_id", "date_operation"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     caisse_id = Column(Integer, ForeignKey("caisse.id"), nullable=False, index=True)
@@ -878,3 +941,30 @@ class Notification(Base):
     
     # Relations
     user = relationship("Utilisateur", backref="notifications")
+
+
+# ==================== TABLE JOB ====================
+class Job(Base):
+    """Tâches longues exécutées en arrière-plan (services/jobs.py)"""
+    __tablename__ = "job"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    type = Column(String(50), nullable=False)  # detection_impayes, generation_relances, generation_commissions, export_rapport
+    statut = Column(String(20), nullable=False, default="en_attente")  # en_attente, en_cours, termine, echec
+    parametres = Column(JSON, nullable=True)
+    progression = Column(Integer, default=0)  # 0 à 100
+    message = Column(String(255), nullable=True)  # Étape en cours
+    resultat = Column(JSON, nullable=True)
+    erreur = Column(Text, nullable=True)
+    tentatives = Column(Integer, default=0)
+    worker = Column(String(100), nullable=True)
+    created_by = Column(Integer, ForeignKey("utilisateur.id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("idx_job_statut_created_at", "statut", "created_at"),
+    )
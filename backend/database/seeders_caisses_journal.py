@@ -15,6 +15,9 @@ from datetime import datetime, date, timedelta
 from decimal import Decimal
 import random
 
+from services.plages_dates import filtre_jour
+from services.soldes_caisse import reconcilier_cumuls
+
 
 def seed_coupures(db: Session):
     """Créer une base de coupures utilisées pour les caisses"""
@@ -185,6 +188,9 @@ def seed_operations_caisse(db: Session):
     
     db.commit()
     print(f"✅ {len(operations)} opérations de caisse créées")
+    
+    # Aligner les cumuls des caisses sur les opérations insérées
+    reconcilier_cumuls(db, corriger=True)
 
 
 def seed_journal_travaux(db: Session):
@@ -205,7 +211,7 @@ def seed_journal_travaux(db: Session):
         
         # Compter les collectes du jour
         collectes_du_jour = collectes_query.filter(
-            func.date(InfoCollecte.date_collecte) == jour
+            filtre_jour(InfoCollecte.date_collecte, jour)
         ).all()
         
         nb_collectes = len(collectes_du_jour)
@@ -213,7 +219,7 @@ def seed_journal_travaux(db: Session):
         
         # Compter les opérations
         operations_du_jour = db.query(OperationCaisse).filter(
-            func.date(OperationCaisse.date_operation) == jour
+            filtre_jour(OperationCaisse.date_operation, jour)
         ).all()
         
         nb_operations = len(operations_du_jour)
@@ -3,11 +3,12 @@ Application FastAPI principale
 Application de Collecte de Taxe Municipale - Mairie de Libreville
 """
 
-from fastapi import FastAPI, Request, Response
+from fastapi import Depends, FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import JSONResponse
-from database.database import init_db
+from auth.security import require_role
+from database.database import async_engine, init_db, statistiques_pool
 from routers import (
     taxes,
     contribuables,
@@ -32,8 +33,14 @@ from routers import (
     qr_code,
     geolocalisation,
     notifications,
+    jobs,
 )
+from services.cartographie_stats import periodic_rebuild as rebuild_cartographie_stats
+from services.jobs import demarrer_workers as demarrer_workers_jobs
+from services.clients_http import demarrer_clients, fermer_clients
+from services.ventis_messaging import ventis_messaging_service
 from pathlib import Path
+import asyncio
 import json
 
 app = FastAPI(
@@ -67,6 +74,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Curseur-Suivant"],  # pagination par curseur des opérations de caisse
 )
 
 # Inclusion des routers
@@ -93,6 +101,7 @@ app.include_router(journal.router)
 app.include_router(qr_code.router)
 app.include_router(geolocalisation.router)
 app.include_router(notifications.router)
+app.include_router(jobs.router)
 
 # Servir les fichiers statiques (photos uploadées)
 uploads_dir = Path(__file__).parent / "uploads"
@@ -105,6 +114,28 @@ async def startup_event():
     """Initialise la base de données au démarrage"""
     init_db()
     print("✅ Base de données initialisée")
+    # Clients HTTP partagés (Ventis, BambooPay)
+    await demarrer_clients()
+    # Renouvellement anticipé du token Keycloak de Ventis
+    app.state.ventis_token_task = asyncio.create_task(ventis_messaging_service.rafraichir_jeton_en_continu())
+    # Reconstruction périodique des agrégats de cartographie
+    app.state.cartographie_task = asyncio.create_task(rebuild_cartographie_stats())
+    # Workers des tâches en arrière-plan (JOBS_WORKERS=0 si scripts/job_worker.py tourne à part)
+    app.state.jobs_arret = demarrer_workers_jobs()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Arrête les tâches de fond"""
+    for nom in ("cartographie_task", "ventis_token_task"):
+        task = getattr(app.state, nom, None)
+        if task:
+            task.cancel()
+    arret = getattr(app.state, "jobs_arret", None)
+    if arret:
+        arret.set()
+    await fermer_clients()
+    await async_engine.dispose()
 
 
 @app.get("/")
@@ -122,3 +153,12 @@ async def health_check():
     """Vérification de santé de l'API"""
     return {"status": "healthy"}
 
+
+@app.get("/health/db-pool", dependencies=[Depends(require_role(["admin"]))])
+def db_pool_stats():
+    """
+    Connexions du pool SQLAlchemy de ce processus (utilisées, débordement, attente).
+    Réservé aux administrateurs : dimensionnement, retard du réplica, mode PgBouncer.
+    """
+    return statistiques_pool()
+
@@ -13,6 +13,7 @@ from auth.security import (
     get_password_hash,
     create_access_token,
     get_current_active_user,
+    invalidate_principal_cache,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
 from auth.schemas import (
@@ -58,6 +59,7 @@ def login(
     # Mettre à jour la dernière connexion
     user.derniere_connexion = datetime.utcnow()
     db.commit()
+    invalidate_principal_cache(user.id)
     
     # Créer le token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -149,6 +151,7 @@ def update_current_user(
     
     current_user.updated_at = datetime.utcnow()
     db.commit()
+    invalidate_principal_cache(current_user.id)
     db.refresh(current_user)
     
     return current_user
@@ -161,6 +164,8 @@ def change_password(
     current_user: Utilisateur = Depends(get_current_active_user)
 ):
     """Change le mot de passe de l'utilisateur connecté"""
+    # Relire le hash en base : l'utilisateur peut provenir du cache d'authentification
+    db.refresh(current_user)
     if not verify_password(password_data.current_password, current_user.mot_de_passe_hash):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -170,6 +175,7 @@ def change_password(
     current_user.mot_de_passe_hash = get_password_hash(password_data.new_password)
     current_user.updated_at = datetime.utcnow()
     db.commit()
+    invalidate_principal_cache(current_user.id)
     
     return None
 
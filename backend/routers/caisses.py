@@ -2,7 +2,8 @@
 Routes pour la gestion des caisses des collecteurs
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc
 from typing import List, Optional
@@ -31,6 +32,17 @@ from schemas.coupure import (
     CoupuresListResponse,
 )
 from auth.security import get_current_active_user
+from services.report_cache import invalider_apres_commit
+from services.soldes_caisse import cumuler_operation, verrouiller_caisse
+from services.registre_operations import (
+    ENTETE_CURSEUR_SUIVANT,
+    FORMATS_EXPORT,
+    curseur_suivant,
+    filtre_apres,
+    flux_operations,
+    media_type,
+    ordre_registre,
+)
 
 router = APIRouter(
     prefix="/api/caisses",
@@ -242,19 +254,9 @@ def get_etat_caisse(caisse_id: int, db: Session = Depends(get_db)):
     if not caisse:
         raise HTTPException(status_code=404, detail="Caisse non trouvée")
     
-    # Calculer les statistiques
-    operations = db.query(OperationCaisse).filter(OperationCaisse.caisse_id == caisse_id).all()
-    
-    total_entrees = sum(
-        op.montant for op in operations 
-        if op.type_operation in [TypeOperationCaisseEnum.ENTREE.value, TypeOperationCaisseEnum.OUVERTURE.value]
-    ) or Decimal('0')
-    
-    total_sorties = sum(
-        op.montant for op in operations 
-        if op.type_operation in [TypeOperationCaisseEnum.SORTIE.value, TypeOperationCaisseEnum.FERMETURE.value]
-    ) or Decimal('0')
-    
+    # Cumuls tenus à jour avec chaque opération : pas de parcours de l'historique
+    total_entrees = caisse.total_entrees or Decimal('0')
+    total_sorties = caisse.total_sorties or Decimal('0')
     solde_theorique = caisse.solde_initial + total_entrees - total_sorties
     
     # Opérations récentes (10 dernières)
@@ -268,7 +270,7 @@ def get_etat_caisse(caisse_id: int, db: Session = Depends(get_db)):
     
     return EtatCaisseResponse(
         caisse=caisse,
-        nombre_operations=len(operations),
+        nombre_operations=caisse.nombre_operations or 0,
         total_entrees=total_entrees,
         total_sorties=total_sorties,
         solde_theorique=solde_theorique,
@@ -340,7 +342,7 @@ def ouvrir_caisse(
     db: Session = Depends(get_db)
 ):
     """Ouvre une caisse"""
-    caisse = db.query(Caisse).filter(Caisse.id == caisse_id).first()
+    caisse = verrouiller_caisse(db, caisse_id)
     if not caisse:
         raise HTTPException(status_code=404, detail="Caisse non trouvée")
     
@@ -363,8 +365,10 @@ def ouvrir_caisse(
     caisse.solde_initial = solde_initial
     caisse.solde_actuel = solde_initial
     caisse.date_ouverture = datetime.utcnow()
+    cumuler_operation(caisse, operation.type_operation, operation.montant)
     
     db.add(operation)
+    invalider_apres_commit(db)
     db.commit()
     db.refresh(operation)
     
@@ -378,7 +382,7 @@ def fermer_caisse(
     db: Session = Depends(get_db)
 ):
     """Ferme une caisse"""
-    caisse = db.query(Caisse).filter(Caisse.id == caisse_id).first()
+    caisse = verrouiller_caisse(db, caisse_id)
     if not caisse:
         raise HTTPException(status_code=404, detail="Caisse non trouvée")
     
@@ -403,8 +407,10 @@ def fermer_caisse(
     # Mettre à jour la caisse
     caisse.etat = EtatCaisseEnum.FERMEE.value
     caisse.date_fermeture = datetime.utcnow()
+    cumuler_operation(caisse, operation.type_operation, operation.montant)
     
     db.add(operation)
+    invalider_apres_commit(db)
     db.commit()
     db.refresh(operation)
     
@@ -419,7 +425,7 @@ def cloturer_caisse(
     db: Session = Depends(get_db)
 ):
     """Clôture une caisse (fin de journée)"""
-    caisse = db.query(Caisse).filter(Caisse.id == caisse_id).first()
+    caisse = verrouiller_caisse(db, caisse_id)
     if not caisse:
         raise HTTPException(status_code=404, detail="Caisse non trouvée")
     
@@ -444,8 +450,10 @@ def cloturer_caisse(
     caisse.etat = EtatCaisseEnum.CLOTUREE.value
     caisse.date_cloture = datetime.utcnow()
     caisse.montant_cloture = montant_cloture
+    cumuler_operation(caisse, operation.type_operation, operation.montant)
     
     db.add(operation)
+    invalider_apres_commit(db)
     db.commit()
     db.refresh(operation)
     
@@ -459,7 +467,7 @@ def create_operation_caisse(
     db: Session = Depends(get_db)
 ):
     """Crée une opération de caisse (entrée, sortie, ajustement)"""
-    caisse = db.query(Caisse).filter(Caisse.id == caisse_id).first()
+    caisse = verrouiller_caisse(db, caisse_id)
     if not caisse:
         raise HTTPException(status_code=404, detail="Caisse non trouvée")
     
@@ -500,11 +508,13 @@ def create_operation_caisse(
         solde_apres=solde_apres
     )
     
-    # Mettre à jour le solde de la caisse
+    # Mettre à jour le solde et les cumuls de la caisse
     caisse.solde_actuel = solde_apres
     caisse.updated_at = datetime.utcnow()
+    cumuler_operation(caisse, db_operation.type_operation, db_operation.montant)
     
     db.add(db_operation)
+    invalider_apres_commit(db)
     db.commit()
     db.refresh(db_operation)
     
@@ -514,18 +524,46 @@ def create_operation_caisse(
 @router.get("/{caisse_id}/operations", response_model=List[OperationCaisseResponse])
 def get_operations_caisse(
     caisse_id: int,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     type_operation: Optional[str] = None,
+    apres: Optional[str] = Query(None, description="Curseur de pagination (en-tête X-Curseur-Suivant de la page précédente)"),
+    format_export: Optional[str] = Query(None, alias="format", description="Export en flux de tout le registre : ndjson ou csv"),
     db: Session = Depends(get_db)
 ):
-    """Récupère les opérations d'une caisse"""
-    query = db.query(OperationCaisse).filter(OperationCaisse.caisse_id == caisse_id)
-    
+    """
+    Récupère les opérations d'une caisse, des plus récentes aux plus anciennes.
+    Avec `apres`, la page reprend après le curseur (skip ignoré) ; chaque page
+    complète renvoie le curseur suivant dans l'en-tête X-Curseur-Suivant.
+    Avec `format`, tout le registre est exporté en flux (NDJSON ou CSV).
+    """
+    criteres = [OperationCaisse.caisse_id == caisse_id]
     if type_operation:
-        query = query.filter(OperationCaisse.type_operation == type_operation)
+        criteres.append(OperationCaisse.type_operation == type_operation)
+    if apres:
+        try:
+            criteres.append(filtre_apres(apres))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    if format_export:
+        if format_export not in FORMATS_EXPORT:
+            raise HTTPException(status_code=400, detail=f"Format invalide. Valeurs acceptées: {list(FORMATS_EXPORT)}")
+        return StreamingResponse(
+            flux_operations(criteres, format_export),
+            media_type=media_type(format_export),
+            headers={"Content-Disposition": f'attachment; filename="operations_caisse_{caisse_id}.{format_export}"'}
+        )
+    
+    query = db.query(OperationCaisse).filter(*criteres).order_by(*ordre_registre())
+    if not apres:
+        query = query.offset(skip)
+    operations = query.limit(limit).all()
     
-    operations = query.order_by(desc(OperationCaisse.date_operation)).offset(skip).limit(limit).all()
+    suivant = curseur_suivant(operations, limit)
+    if suivant:
+        response.headers[ENTETE_CURSEUR_SUIVANT] = suivant
     return operations
 
 
@@ -6,11 +6,13 @@ from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func, text
 from typing import Optional, List, Dict, Any
-from database.database import get_db
+from database.database import get_read_db
 from database.models import ZoneGeographique, Quartier, InfoCollecte, StatutCollecteEnum, Contribuable
 from datetime import datetime, date
 from decimal import Decimal
 from pydantic import BaseModel
+from services.report_cache import cached_report
+from services.plages_dates import filtres_periode
 
 router = APIRouter(prefix="/api/cartographie", tags=["cartographie"])
 
@@ -73,10 +75,7 @@ def _sum_collectes_for_ids(
         InfoCollecte.annule == False
     )
 
-    if date_min:
-        query = query.filter(func.date(InfoCollecte.date_collecte) >= date_min)
-    if date_max:
-        query = query.filter(func.date(InfoCollecte.date_collecte) <= date_max)
+    query = query.filter(*filtres_periode(InfoCollecte.date_collecte, date_min, date_max))
 
     return query.scalar() or Decimal('0')
 
@@ -124,10 +123,11 @@ def _build_zone_stats(rows: List[Dict[str, Any]]) -> List[ZoneStatistique]:
 
 
 @router.get("/statistiques", response_model=StatistiquesCartographie)
+@cached_report("cartographie")
 def get_statistiques_cartographie(
     date_debut: Optional[date] = Query(None, description="Date de début pour les statistiques"),
     date_fin: Optional[date] = Query(None, description="Date de fin pour les statistiques"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Récupère les statistiques complètes pour la cartographie
@@ -175,9 +175,10 @@ def get_statistiques_cartographie(
 
 
 @router.get("/evolution-journaliere")
+@cached_report("cartographie")
 def get_evolution_journaliere(
     jours: int = Query(7, ge=1, le=30, description="Nombre de jours à retourner"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Récupère l'évolution des collectes sur les N derniers jours
@@ -193,7 +194,7 @@ def get_evolution_journaliere(
     ).filter(
         InfoCollecte.statut == StatutCollecteEnum.COMPLETED,
         InfoCollecte.annule == False,
-        func.date(InfoCollecte.date_collecte) >= date_debut
+        *filtres_periode(InfoCollecte.date_collecte, date_debut)
     ).group_by(
         func.date(InfoCollecte.date_collecte)
     ).order_by(
@@ -227,9 +228,10 @@ def get_evolution_journaliere(
 
 
 @router.get("/map/contribuables")
+@cached_report("cartographie")
 def get_contribuables_for_map(
     actif: Optional[bool] = Query(True, description="Filtrer par contribuables actifs"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Retourne les contribuables à afficher sur la carte en se basant
@@ -293,9 +295,10 @@ def get_contribuables_for_map(
 
 
 @router.get("/map/quartiers")
+@cached_report("cartographie")
 def get_quartiers_for_map(
     actif: Optional[bool] = Query(True, description="Filtrer par quartiers actifs"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Récupère les quartiers avec leurs géométries pour affichage sur la carte.
@@ -346,7 +349,8 @@ def get_quartiers_for_map(
 
 
 @router.get("/stats-globales")
-def get_stats_globales(db: Session = Depends(get_db)):
+@cached_report("cartographie")
+def get_stats_globales(db: Session = Depends(get_read_db)):
     """
     Récupère les statistiques globales pour le dashboard de cartographie
     """
@@ -371,7 +375,8 @@ def get_stats_globales(db: Session = Depends(get_db)):
 
 
 @router.get("/stats-zones")
-def get_stats_zones(db: Session = Depends(get_db)):
+@cached_report("cartographie")
+def get_stats_zones(db: Session = Depends(get_read_db)):
     """
     Récupère les statistiques par zone géographique
     """
@@ -390,9 +395,10 @@ def get_stats_zones(db: Session = Depends(get_db)):
 
 
 @router.get("/evolution-collecte")
+@cached_report("cartographie")
 def get_evolution_collecte(
     jours: int = Query(7, ge=1, le=30, description="Nombre de jours"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     Récupère l'évolution de la collecte sur les N derniers jours
@@ -407,7 +413,7 @@ def get_evolution_collecte(
     ).filter(
         InfoCollecte.statut == StatutCollecteEnum.COMPLETED,
         InfoCollecte.annule == False,
-        func.date(InfoCollecte.date_collecte) >= date_debut
+        *filtres_periode(InfoCollecte.date_collecte, date_debut)
     ).group_by(
         func.date(InfoCollecte.date_collecte)
     ).order_by(
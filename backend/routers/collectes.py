@@ -3,15 +3,35 @@ Routes pour la gestion des collectes
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
-from database.database import get_db
+from database.database import get_async_db, get_db
 from database.models import InfoCollecte, Taxe, StatutCollecteEnum
-from schemas.info_collecte import InfoCollecteCreate, InfoCollecteUpdate, InfoCollecteResponse
+from schemas.info_collecte import (
+    InfoCollecteBatchRequest,
+    InfoCollecteBatchResponse,
+    InfoCollecteCreate,
+    InfoCollecteUpdate,
+    InfoCollecteResponse,
+)
 from datetime import datetime, date
 from decimal import Decimal
 from pydantic import BaseModel, Field
 from auth.security import get_current_active_user
+from services.collecte_hooks import collectes_modifiees
+from services.ingestion_collectes import ingerer_collectes
+from services.references_collecte import (
+    TAILLE_BLOC_MAX,
+    dernier_numero_attribue,
+    est_conflit_reference,
+    est_reference_attribuee,
+    est_reference_valide,
+    prochaine_reference,
+    reserver_references,
+)
 
 router = APIRouter(
     prefix="/api/collectes",
@@ -24,8 +44,12 @@ class CollecteAnnulationRequest(BaseModel):
     raison: str = Field(..., min_length=3, description="Raison de l'annulation")
 
 
+class ReferencesReserveesResponse(BaseModel):
+    references: List[str]
+
+
 @router.get("/", response_model=List[InfoCollecteResponse])
-def get_collectes(
+async def get_collectes(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     collecteur_id: Optional[int] = None,
@@ -35,43 +59,42 @@ def get_collectes(
     date_debut: Optional[date] = None,
     date_fin: Optional[date] = None,
     telephone: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Récupère la liste des collectes avec filtres et relations"""
-    from sqlalchemy.orm import joinedload
-    from database.models import Contribuable
-    
-    from database.models import CollecteLocation
+    """Récupère la liste des collectes avec filtres et relations (session asynchrone)"""
+    from database.models import Collecteur, Contribuable
     
-    query = db.query(InfoCollecte).options(
-        joinedload(InfoCollecte.contribuable),
+    query = select(InfoCollecte).options(
+        joinedload(InfoCollecte.contribuable).defer(Contribuable.geom),
         joinedload(InfoCollecte.taxe),
-        joinedload(InfoCollecte.collecteur),
+        joinedload(InfoCollecte.collecteur).defer(Collecteur.geom),
         joinedload(InfoCollecte.location)
     )
     
     if collecteur_id:
-        query = query.filter(InfoCollecte.collecteur_id == collecteur_id)
+        query = query.where(InfoCollecte.collecteur_id == collecteur_id)
     if contribuable_id:
-        query = query.filter(InfoCollecte.contribuable_id == contribuable_id)
+        query = query.where(InfoCollecte.contribuable_id == contribuable_id)
     if taxe_id:
-        query = query.filter(InfoCollecte.taxe_id == taxe_id)
+        query = query.where(InfoCollecte.taxe_id == taxe_id)
     if statut:
         try:
             statut_enum = StatutCollecteEnum(statut)
-            query = query.filter(InfoCollecte.statut == statut_enum)
+            query = query.where(InfoCollecte.statut == statut_enum)
         except ValueError:
             raise HTTPException(status_code=400, detail="Statut invalide")
     if date_debut:
-        query = query.filter(InfoCollecte.date_collecte >= datetime.combine(date_debut, datetime.min.time()))
+        query = query.where(InfoCollecte.date_collecte >= datetime.combine(date_debut, datetime.min.time()))
     if date_fin:
-        query = query.filter(InfoCollecte.date_collecte <= datetime.combine(date_fin, datetime.max.time()))
+        query = query.where(InfoCollecte.date_collecte <= datetime.combine(date_fin, datetime.max.time()))
     if telephone:
         # Filtrer par téléphone du contribuable
-        query = query.join(Contribuable).filter(Contribuable.telephone.ilike(f"%{telephone}%"))
+        query = query.join(Contribuable).where(Contribuable.telephone.ilike(f"%{telephone}%"))
     
-    collectes = query.order_by(InfoCollecte.date_collecte.desc()).offset(skip).limit(limit).all()
-    return collectes
+    result = await db.execute(
+        query.order_by(InfoCollecte.date_collecte.desc()).offset(skip).limit(limit)
+    )
+    return result.unique().scalars().all()
 
 
 @router.get("/{collecte_id}", response_model=InfoCollecteResponse)
@@ -93,6 +116,33 @@ def get_collecte(collecte_id: int, db: Session = Depends(get_db)):
     return collecte
 
 
+@router.post("/references", response_model=ReferencesReserveesResponse, status_code=201)
+def reserver_references_collecte(
+    nombre: int = Query(50, ge=1, le=TAILLE_BLOC_MAX, description="Nombre de références à réserver"),
+    db: Session = Depends(get_db)
+):
+    """Réserve un bloc de références pour un terminal qui saisit des collectes hors ligne"""
+    references = reserver_references(db, nombre)
+    db.commit()
+    return ReferencesReserveesResponse(references=references)
+
+
+@router.post("/batch", response_model=InfoCollecteBatchResponse)
+def create_collectes_batch(payload: InfoCollecteBatchRequest, db: Session = Depends(get_db)):
+    """
+    Enregistre un lot de collectes saisies hors ligne (jusqu'à 500) en une transaction.
+    Chaque collecte reçoit un résultat : "creee", "existante" (déjà reçue, même clé
+    d'idempotence ou même référence) ou "erreur".
+    """
+    resultats = ingerer_collectes(db, payload.collectes)
+    return InfoCollecteBatchResponse(
+        creees=sum(1 for r in resultats if r.statut == "creee"),
+        existantes=sum(1 for r in resultats if r.statut == "existante"),
+        erreurs=sum(1 for r in resultats if r.statut == "erreur"),
+        resultats=resultats
+    )
+
+
 @router.post("/", response_model=InfoCollecteResponse, status_code=201)
 def create_collecte(collecte: InfoCollecteCreate, db: Session = Depends(get_db)):
     """Crée une nouvelle collecte"""
@@ -104,17 +154,34 @@ def create_collecte(collecte: InfoCollecteCreate, db: Session = Depends(get_db))
     # Calculer la commission
     commission = float(collecte.montant) * (float(taxe.commission_pourcentage) / 100)
     
-    # Générer une référence unique
-    reference = f"COL-{datetime.utcnow().strftime('%Y%m%d')}-{db.query(InfoCollecte).count() + 1:04d}"
+    # Référence pré-réservée par le terminal (hors ligne) ou attribuée par la séquence
+    if collecte.reference:
+        if not est_reference_valide(collecte.reference):
+            raise HTTPException(status_code=400, detail="Format de référence invalide")
+        if db.query(InfoCollecte.id).filter(InfoCollecte.reference == collecte.reference).first():
+            raise HTTPException(status_code=409, detail="Une collecte existe déjà avec cette référence")
+        if not est_reference_attribuee(collecte.reference, dernier_numero_attribue(db)):
+            raise HTTPException(status_code=400, detail="Référence non réservée")
+        reference = collecte.reference
+    else:
+        reference = prochaine_reference(db)
     
     db_collecte = InfoCollecte(
-        **collecte.dict(),
+        **collecte.dict(exclude={"reference"}),
         commission=Decimal(str(commission)),
         reference=reference,
         statut=StatutCollecteEnum.PENDING
     )
     db.add(db_collecte)
-    db.commit()
+    try:
+        collectes_modifiees(db, [db_collecte])
+        db.commit()
+    except IntegrityError as e:
+        # Même référence envoyée deux fois simultanément : la vérification ci-dessus ne suffit pas
+        db.rollback()
+        if est_conflit_reference(e):
+            raise HTTPException(status_code=409, detail="Une collecte existe déjà avec cette référence")
+        raise
     db.refresh(db_collecte)
     return db_collecte
 
@@ -139,6 +206,8 @@ def update_collecte(collecte_id: int, collecte_update: InfoCollecteUpdate, db: S
         setattr(db_collecte, field, value)
     
     db_collecte.updated_at = datetime.utcnow()
+    if "statut" in update_data or "annule" in update_data:
+        collectes_modifiees(db, [db_collecte])
     db.commit()
     db.refresh(db_collecte)
     return db_collecte
@@ -159,6 +228,7 @@ def annuler_collecte(
     db_collecte.raison_annulation = payload.raison
     db_collecte.statut = StatutCollecteEnum.CANCELLED
     db_collecte.updated_at = datetime.utcnow()
+    collectes_modifiees(db, [db_collecte])
     db.commit()
     db.refresh(db_collecte)
     return db_collecte
@@ -177,6 +247,7 @@ def valider_collecte(collecte_id: int, db: Session = Depends(get_db)):
     db_collecte.statut = StatutCollecteEnum.COMPLETED
     db_collecte.date_cloture = datetime.utcnow()
     db_collecte.updated_at = datetime.utcnow()
+    collectes_modifiees(db, [db_collecte])
     db.commit()
     db.refresh(db_collecte)
     return db_collecte
@@ -190,6 +261,7 @@ def delete_collecte(collecte_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Collecte non trouvée")
     
     db.delete(db_collecte)
+    collectes_modifiees(db, [db_collecte])
     db.commit()
     return None
 
@@ -22,6 +22,7 @@ from schemas.collecteur import CollecteurCreate, CollecteurUpdate, CollecteurRes
 from schemas.activite_collecteur import ActiviteCollecteurResponse, ActiviteJour
 from schemas.statistiques_collecteur import StatistiquesCollecteurResponse
 from services.statistiques_collecteur import compute_statistiques_collecteur
+from services.plages_dates import filtre_jour, filtres_periode
 from auth.security import get_current_active_user
 from schemas.performances import (
     ObjectifsCollecteurResponse,
@@ -212,12 +213,12 @@ def _fallback_performances(
             montant = db.query(func.coalesce(func.sum(InfoCollecte.montant), 0)).filter(
                 InfoCollecte.collecteur_id == collecteur_id,
                 InfoCollecte.annule == False,
-                func.date(InfoCollecte.date_collecte) == day,
+                filtre_jour(InfoCollecte.date_collecte, day),
             ).scalar() or Decimal("0")
             nombre = db.query(func.count(InfoCollecte.id)).filter(
                 InfoCollecte.collecteur_id == collecteur_id,
                 InfoCollecte.annule == False,
-                func.date(InfoCollecte.date_collecte) == day,
+                filtre_jour(InfoCollecte.date_collecte, day),
             ).scalar() or 0
             points.append(
                 PerformancePoint(
@@ -236,14 +237,12 @@ def _fallback_performances(
             montant = db.query(func.coalesce(func.sum(InfoCollecte.montant), 0)).filter(
                 InfoCollecte.collecteur_id == collecteur_id,
                 InfoCollecte.annule == False,
-                func.date(InfoCollecte.date_collecte) >= start,
-                func.date(InfoCollecte.date_collecte) <= end,
+                *filtres_periode(InfoCollecte.date_collecte, start, end),
             ).scalar() or Decimal("0")
             nombre = db.query(func.count(InfoCollecte.id)).filter(
                 InfoCollecte.collecteur_id == collecteur_id,
                 InfoCollecte.annule == False,
-                func.date(InfoCollecte.date_collecte) >= start,
-                func.date(InfoCollecte.date_collecte) <= end,
+                *filtres_periode(InfoCollecte.date_collecte, start, end),
             ).scalar() or 0
             points.append(
                 PerformancePoint(
@@ -264,18 +263,12 @@ def _fallback_performances(
             montant = db.query(func.coalesce(func.sum(InfoCollecte.montant), 0)).filter(
                 InfoCollecte.collecteur_id == collecteur_id,
                 InfoCollecte.annule == False,
-                InfoCollecte.date_collecte >= datetime.combine(
-                    month_start, datetime.min.time()
-                ),
-                InfoCollecte.date_collecte <= month_end,
+                *filtres_periode(InfoCollecte.date_collecte, month_start, next_month - timedelta(days=1)),
             ).scalar() or Decimal("0")
             nombre = db.query(func.count(InfoCollecte.id)).filter(
                 InfoCollecte.collecteur_id == collecteur_id,
                 InfoCollecte.annule == False,
-                InfoCollecte.date_collecte >= datetime.combine(
-                    month_start, datetime.min.time()
-                ),
-                InfoCollecte.date_collecte <= month_end,
+                *filtres_periode(InfoCollecte.date_collecte, month_start, next_month - timedelta(days=1)),
             ).scalar() or 0
             points.append(
                 PerformancePoint(
@@ -512,8 +505,7 @@ def get_activites_collecteur(
     collectes = db.query(InfoCollecte).filter(
         InfoCollecte.collecteur_id == collecteur_id,
         InfoCollecte.annule == False,
-        func.date(InfoCollecte.date_collecte) >= date_debut,
-        func.date(InfoCollecte.date_collecte) <= date_fin
+        *filtres_periode(InfoCollecte.date_collecte, date_debut, date_fin)
     ).order_by(InfoCollecte.date_collecte).all()
     
     # Grouper par jour
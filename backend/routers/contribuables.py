@@ -4,10 +4,11 @@ Routes pour la gestion des contribuables
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, defer, joinedload
+from sqlalchemy import func, select
 from typing import List, Optional, Tuple
-from database.database import get_db
+from database.database import get_async_db, get_db
 from database.models import Contribuable
 from schemas.contribuable import ContribuableCreate, ContribuableUpdate, ContribuableResponse
 from datetime import datetime
@@ -62,7 +63,7 @@ def distance_to_quartier(db: Session, quartier_id: Optional[int], geom_point) ->
 
 
 @router.get("/", response_model=List[ContribuableResponse])
-def get_contribuables(
+async def get_contribuables(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     actif: Optional[bool] = None,
@@ -70,53 +71,41 @@ def get_contribuables(
     quartier_id: Optional[int] = None,
     type_contribuable_id: Optional[int] = None,
     search: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Récupère la liste des contribuables avec filtres et relations"""
-    from sqlalchemy.orm import joinedload
+    """Récupère la liste des contribuables avec filtres et relations (session asynchrone)"""
+    from database.models import Collecteur, Quartier
     
-    # Query de base avec relations (incluant la zone du quartier)
-    from database.models import Quartier, Zone
-    query = db.query(Contribuable).options(
+    # Query de base avec relations (incluant la zone du quartier) ; les géométries
+    # ne font pas partie de la réponse
+    query = select(Contribuable).options(
+        defer(Contribuable.geom),
         joinedload(Contribuable.type_contribuable),
-        joinedload(Contribuable.quartier).joinedload(Quartier.zone),
-        joinedload(Contribuable.collecteur)
+        joinedload(Contribuable.quartier).defer(Quartier.geom).joinedload(Quartier.zone),
+        joinedload(Contribuable.collecteur).defer(Collecteur.geom)
     )
     
-    # Query pour compter le total (sans les relations pour la performance)
-    count_query = db.query(func.count(Contribuable.id))
-    
-    # Appliquer les mêmes filtres aux deux queries
     if actif is not None:
-        query = query.filter(Contribuable.actif == actif)
-        count_query = count_query.filter(Contribuable.actif == actif)
+        query = query.where(Contribuable.actif == actif)
     if collecteur_id:
-        query = query.filter(Contribuable.collecteur_id == collecteur_id)
-        count_query = count_query.filter(Contribuable.collecteur_id == collecteur_id)
+        query = query.where(Contribuable.collecteur_id == collecteur_id)
     if quartier_id:
-        query = query.filter(Contribuable.quartier_id == quartier_id)
-        count_query = count_query.filter(Contribuable.quartier_id == quartier_id)
+        query = query.where(Contribuable.quartier_id == quartier_id)
     if type_contribuable_id:
-        query = query.filter(Contribuable.type_contribuable_id == type_contribuable_id)
-        count_query = count_query.filter(Contribuable.type_contribuable_id == type_contribuable_id)
+        query = query.where(Contribuable.type_contribuable_id == type_contribuable_id)
     if search:
         search_term = f"%{search}%"
-        search_filter = (
+        query = query.where(
             (Contribuable.nom.ilike(search_term)) |
             (Contribuable.prenom.ilike(search_term)) |
             (Contribuable.telephone.ilike(search_term)) |
             (Contribuable.numero_identification.ilike(search_term))
         )
-        query = query.filter(search_filter)
-        count_query = count_query.filter(search_filter)
     
     # Récupérer les résultats
-    contribuables = query.offset(skip).limit(limit).all()
-    
     # Note: Le total n'est pas retourné dans la réponse car on utilise List[ContribuableResponse]
-    # Pour avoir le total, il faudrait créer un schéma de réponse avec pagination
-    # Pour l'instant, on retourne juste la liste
-    return contribuables
+    result = await db.execute(query.offset(skip).limit(limit))
+    return result.unique().scalars().all()
 
 
 @router.get("/{contribuable_id}", response_model=ContribuableResponse)
@@ -4,18 +4,21 @@ Routes pour la gestion des impayés
 
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, and_, or_, case
+from sqlalchemy import func
 from typing import List, Optional
 from database.database import get_db
 from database.models import (
     DossierImpaye, Contribuable, AffectationTaxe, InfoCollecte, 
-    StatutCollecteEnum, Taxe, Collecteur
+    StatutCollecteEnum, Collecteur
 )
 from schemas.dossier_impaye import (
     DossierImpayeCreate, DossierImpayeUpdate, DossierImpayeResponse,
     DossierImpayeListResponse, CalculPenalitesRequest, CalculPenalitesResponse
 )
-from datetime import datetime, date, timedelta
+from services.detection_impayes import detecter_impayes_en_masse
+from services.jobs import soumettre_job, tache_job
+from routers.jobs import reponse_job_acceptee
+from datetime import datetime
 from decimal import Decimal
 
 router = APIRouter(prefix="/api/impayes", tags=["impayes"])
@@ -78,105 +81,54 @@ def calculer_penalites_endpoint(request: CalculPenalitesRequest):
 def detecter_impayes(
     jours_retard_min: int = Query(7, ge=0, description="Nombre minimum de jours de retard"),
     taux_penalite: Decimal = Query(Decimal("0.5"), description="Taux de pénalité journalier en %"),
+    incremental: bool = Query(False, description="Ne recalculer que les affectations modifiées depuis la dernière détection"),
+    asynchrone: bool = Query(False, description="Exécuter en arrière-plan et répondre 202 avec la tâche (GET /api/jobs/{id})"),
     db: Session = Depends(get_db)
 ):
     """Détecte automatiquement les impayés et crée les dossiers"""
-    date_limite = datetime.utcnow() - timedelta(days=jours_retard_min)
-    
-    # Trouver les affectations actives avec échéance dépassée
-    affectations = db.query(AffectationTaxe).filter(
-        AffectationTaxe.actif == True,
-        AffectationTaxe.date_debut <= date_limite
-    ).all()
-    
-    dossiers_crees = []
-    
-    for affectation in affectations:
-        # Calculer la date d'échéance selon la périodicité
-        date_echeance = affectation.date_debut
-        if affectation.taxe.periodicite == "mensuelle":
-            date_echeance = affectation.date_debut + timedelta(days=30)
-        elif affectation.taxe.periodicite == "hebdomadaire":
-            date_echeance = affectation.date_debut + timedelta(days=7)
-        elif affectation.taxe.periodicite == "trimestrielle":
-            date_echeance = affectation.date_debut + timedelta(days=90)
-        
-        # Vérifier si l'échéance est dépassée
-        if date_echeance < datetime.utcnow():
-            # Calculer le montant initial
-            montant_initial = affectation.montant_custom if affectation.montant_custom else affectation.taxe.montant
-            
-            # Calculer le montant payé
-            montant_paye = calculer_montant_paye(
-                affectation.contribuable_id,
-                affectation.taxe_id,
-                affectation.date_debut,
-                db
-            )
-            
-            # Si pas complètement payé
-            if montant_paye < montant_initial:
-                montant_restant = montant_initial - montant_paye
-                
-                # Calculer les pénalités
-                penalites, jours_retard = calculer_penalites(montant_restant, date_echeance, taux_penalite)
-                
-                # Déterminer la priorité
-                if jours_retard > 90:
-                    priorite = "urgente"
-                elif jours_retard > 60:
-                    priorite = "elevee"
-                elif jours_retard > 30:
-                    priorite = "normale"
-                else:
-                    priorite = "faible"
-                
-                # Vérifier si un dossier existe déjà
-                dossier_existant = db.query(DossierImpaye).filter(
-                    DossierImpaye.affectation_taxe_id == affectation.id,
-                    DossierImpaye.statut.in_(["en_cours", "partiellement_paye"])
-                ).first()
-                
-                if not dossier_existant:
-                    # Créer le dossier
-                    nouveau_dossier = DossierImpaye(
-                        contribuable_id=affectation.contribuable_id,
-                        affectation_taxe_id=affectation.id,
-                        montant_initial=montant_initial,
-                        montant_paye=montant_paye,
-                        montant_restant=montant_restant,
-                        penalites=penalites,
-                        date_echeance=date_echeance,
-                        jours_retard=jours_retard,
-                        priorite=priorite,
-                        statut="en_cours"
-                    )
-                    db.add(nouveau_dossier)
-                    dossiers_crees.append(nouveau_dossier)
-                else:
-                    # Mettre à jour le dossier existant
-                    dossier_existant.montant_paye = montant_paye
-                    dossier_existant.montant_restant = montant_restant
-                    dossier_existant.penalites = penalites
-                    dossier_existant.jours_retard = jours_retard
-                    dossier_existant.priorite = priorite
-                    dossier_existant.updated_at = datetime.utcnow()
-                    dossiers_crees.append(dossier_existant)
-    
-    db.commit()
+    if asynchrone:
+        job = soumettre_job(db, "detection_impayes", {
+            "jours_retard_min": jours_retard_min,
+            "taux_penalite": str(taux_penalite),
+            "incremental": incremental,
+        })
+        return reponse_job_acceptee(job)
+    
+    resultat = detecter_impayes_en_masse(db, jours_retard_min, taux_penalite, incremental)
+    if resultat is None:
+        raise HTTPException(status_code=409, detail="Une détection des impayés est déjà en cours")
     
     # Recharger avec les relations et convertir en schémas
-    dossiers_ids = [d.id for d in dossiers_crees]
     dossiers_chargees = db.query(DossierImpaye).options(
         joinedload(DossierImpaye.contribuable),
         joinedload(DossierImpaye.affectation_taxe).joinedload(AffectationTaxe.taxe),
         joinedload(DossierImpaye.collecteur)
-    ).filter(DossierImpaye.id.in_(dossiers_ids)).all()
+    ).filter(DossierImpaye.id.in_(resultat.dossiers_ids)).all()
     
-    from schemas.dossier_impaye import DossierImpayeResponse
     return [DossierImpayeResponse.model_validate(dossier, from_attributes=True) for dossier in dossiers_chargees]
 
 
+@tache_job("detection_impayes")
+def _job_detection_impayes(db: Session, parametres: dict, progression) -> dict:
+    """Détection des impayés en arrière-plan (?asynchrone=true)"""
+    progression(10, "Calcul des impayés")
+    resultat = detecter_impayes_en_masse(
+        db,
+        int(parametres.get("jours_retard_min", 7)),
+        Decimal(parametres.get("taux_penalite", "0.5")),
+        bool(parametres.get("incremental", False)),
+    )
+    if resultat is None:
+        raise RuntimeError("Une détection des impayés est déjà en cours")
+    return {
+        "incremental": resultat.incremental,
+        "affectations_revues": resultat.affectations_revues,
+        "dossiers_crees": len(resultat.dossiers_crees),
+        "dossiers_mis_a_jour": len(resultat.dossiers_mis_a_jour),
+        "dossiers_actualises": resultat.dossiers_actualises,
+    }
+
+
 @router.get("/", response_model=DossierImpayeListResponse)
 def get_impayes(
     skip: int = Query(0, ge=0),
@@ -0,0 +1,74 @@
+"""
+Routes pour le suivi des tâches en arrière-plan
+"""
+
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, JSONResponse
+from sqlalchemy.orm import Session
+
+from auth.security import get_current_active_user
+from database.database import get_db
+from database.models import Job
+from schemas.job import JobResponse
+from services.jobs import STATUT_TERMINE, chemin_fichier_job
+
+router = APIRouter(
+    prefix="/api/jobs",
+    tags=["jobs"],
+    dependencies=[Depends(get_current_active_user)],
+)
+
+
+def reponse_job_acceptee(job: Job) -> JSONResponse:
+    """Réponse 202 des endpoints qui délèguent leur travail à une tâche"""
+    return JSONResponse(
+        status_code=202,
+        content=jsonable_encoder(JobResponse.model_validate(job, from_attributes=True)),
+        headers={"Location": f"/api/jobs/{job.id}"},
+    )
+
+
+@router.get("/", response_model=List[JobResponse])
+def list_jobs(
+    type: Optional[str] = Query(None, description="Type de tâche"),
+    statut: Optional[str] = Query(None, description="en_attente, en_cours, termine, echec"),
+    limit: int = Query(50, ge=1, le=200),
+    db: Session = Depends(get_db),
+):
+    """Liste les tâches les plus récentes"""
+    query = db.query(Job)
+    if type:
+        query = query.filter(Job.type == type)
+    if statut:
+        query = query.filter(Job.statut == statut)
+    return query.order_by(Job.created_at.desc(), Job.id.desc()).limit(limit).all()
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+def get_job(job_id: int, db: Session = Depends(get_db)):
+    """État, avancement et résultat d'une tâche"""
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Tâche non trouvée")
+    return job
+
+
+@router.get("/{job_id}/fichier")
+def telecharger_fichier_job(job_id: int, db: Session = Depends(get_db)):
+    """Télécharge le fichier produit par une tâche terminée (export de rapport)"""
+    job = db.query(Job).filter(Job.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Tâche non trouvée")
+    nom = (job.resultat or {}).get("fichier") if isinstance(job.resultat, dict) else None
+    if job.statut != STATUT_TERMINE or not nom:
+        raise HTTPException(status_code=404, detail="Aucun fichier pour cette tâche")
+    try:
+        chemin = chemin_fichier_job(nom)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Aucun fichier pour cette tâche")
+    if not chemin.is_file():
+        raise HTTPException(status_code=410, detail="Fichier supprimé")
+    return FileResponse(chemin, filename=nom)
@@ -2,19 +2,22 @@
 Routes pour les journaux de travaux quotidiens et les commissions
 """
 
+from contextlib import contextmanager
 from datetime import date, datetime
 from pathlib import Path
 from typing import Optional
 import csv
 import json
+import os
 from decimal import Decimal
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, insert, select, true
 from sqlalchemy.orm import Session
 
 from auth.security import get_current_active_user
-from database.database import get_db
+from database.database import get_db, get_read_db
 from database.models import (
     JournalTravaux,
     Caisse,
@@ -42,6 +45,24 @@ from schemas.journal import (
 )
 from schemas.info_collecte import InfoCollecteResponse
 from schemas.caisse import OperationCaisseResponse
+from services.plages_dates import bornes_jour, filtre_jour
+from services.report_cache import cached_report
+from services.registre_operations import (
+    ENTETE_CURSEUR_SUIVANT,
+    FORMATS_EXPORT,
+    curseur_suivant,
+    filtre_apres,
+    flux_operations,
+    media_type,
+    ordre_registre,
+)
+from services.jobs import soumettre_job, tache_job
+from routers.jobs import reponse_job_acceptee
+
+# Durée de cache des chiffres d'une journée en cours (secondes)
+JOURNAL_CACHE_TTL = int(os.getenv("JOURNAL_CACHE_TTL", "5"))
+# Collecteurs lus par lot lors de la génération des commissions
+TAILLE_LOT_COMMISSIONS = 500
 
 router = APIRouter(
     prefix="/api/journal",
@@ -54,27 +75,40 @@ def _compute_decimal(value) -> Decimal:
     return Decimal(value or 0).quantize(Decimal("0.01"))
 
 
-def _write_commissions_json(file_path: Path, commissions_items: list["CommissionItem"]) -> None:
-    payload = [item.model_dump() for item in commissions_items]
-    file_path.write_text(
-        json.dumps(payload, default=str, ensure_ascii=False, indent=2),
-        encoding="utf-8",
-    )
+COLONNES_COMMISSIONS_CSV = [
+    "collecteur_id",
+    "collecteur_nom",
+    "montant_collecte",
+    "commission_montant",
+    "commission_pourcentage",
+    "statut_paiement",
+]
 
 
-def _write_commissions_csv(file_path: Path, commissions_items: list["CommissionItem"]) -> None:
-    headers = [
-        "collecteur_id",
-        "collecteur_nom",
-        "montant_collecte",
-        "commission_montant",
-        "commission_pourcentage",
-        "statut_paiement",
-    ]
+@contextmanager
+def _ecrivain_commissions_json(file_path: Path, jour: date):
+    """Tableau JSON écrit élément par élément"""
+    with file_path.open("w", encoding="utf-8") as buffer:
+        buffer.write("[")
+        premier = True
+
+        def ecrire(item: CommissionItem) -> None:
+            nonlocal premier
+            buffer.write("\n  " if premier else ",\n  ")
+            buffer.write(json.dumps(item.model_dump(), default=str, ensure_ascii=False))
+            premier = False
+
+        yield ecrire
+        buffer.write("]" if premier else "\n]")
+
+
+@contextmanager
+def _ecrivain_commissions_csv(file_path: Path, jour: date):
     with file_path.open("w", newline="", encoding="utf-8") as buffer:
         writer = csv.writer(buffer, delimiter=";")
-        writer.writerow(headers)
-        for item in commissions_items:
+        writer.writerow(COLONNES_COMMISSIONS_CSV)
+
+        def ecrire(item: CommissionItem) -> None:
             writer.writerow(
                 [
                     item.collecteur_id,
@@ -86,8 +120,11 @@ def _write_commissions_csv(file_path: Path, commissions_items: list["CommissionI
                 ]
             )
 
+        yield ecrire
+
 
-def _write_commissions_pdf(file_path: Path, commissions_items: list["CommissionItem"], jour: date) -> None:
+@contextmanager
+def _ecrivain_commissions_pdf(file_path: Path, jour: date):
     from reportlab.lib.pagesizes import A4
     from reportlab.lib.units import mm
     from reportlab.pdfgen import canvas
@@ -112,9 +149,10 @@ def _write_commissions_pdf(file_path: Path, commissions_items: list["CommissionI
     c.drawString(130 * mm, y, headers[3])
     c.drawString(150 * mm, y, headers[4])
     y -= line_height
-
     c.setFont("Helvetica", 10)
-    for item in commissions_items:
+
+    def ecrire(item: CommissionItem) -> None:
+        nonlocal y
         if y < 30 * mm:
             c.showPage()
             y = height - 30 * mm
@@ -128,83 +166,147 @@ def _write_commissions_pdf(file_path: Path, commissions_items: list["CommissionI
         c.drawString(150 * mm, y, item.statut_paiement.upper())
         y -= line_height
 
+    yield ecrire
     c.showPage()
     c.save()
 
 
-def compute_journal_stats(db: Session, target_date: date) -> dict:
-    collectes_query = db.query(InfoCollecte).filter(
-        func.date(InfoCollecte.date_collecte) == target_date,
-        InfoCollecte.statut == StatutCollecteEnum.COMPLETED,
-        InfoCollecte.annule == False,
-    )
+ECRIVAINS_COMMISSIONS = {
+    "json": _ecrivain_commissions_json,
+    "csv": _ecrivain_commissions_csv,
+    "pdf": _ecrivain_commissions_pdf,
+}
 
-    nb_collectes = collectes_query.count()
-    montant_collectes = _compute_decimal(
-        collectes_query.with_entities(func.coalesce(func.sum(InfoCollecte.montant), 0)).scalar()
-    )
 
-    operations_query = db.query(OperationCaisse).filter(
-        func.date(OperationCaisse.date_operation) == target_date
-    )
-    nb_operations = operations_query.count()
+def compute_journal_stats(db: Session, target_date: date) -> dict:
+    """
+    Chiffres de la journée en une seule instruction : une CTE par source
+    (collectes, opérations de caisse, relances, impayés réglés, caisses ouvertes),
+    chacune restreinte à la journée par des bornes compatibles avec les index.
+    """
+    debut, fin = bornes_jour(target_date)
 
-    total_entrees = _compute_decimal(
-        operations_query.filter(
-            OperationCaisse.type_operation.in_(
-                [TypeOperationCaisseEnum.ENTREE.value, TypeOperationCaisseEnum.OUVERTURE.value]
-            )
+    collectes = (
+        select(
+            func.count().label("nb"),
+            func.coalesce(func.sum(InfoCollecte.montant), 0).label("montant"),
         )
-        .with_entities(func.coalesce(func.sum(OperationCaisse.montant), 0))
-        .scalar()
+        .where(
+            InfoCollecte.date_collecte >= debut,
+            InfoCollecte.date_collecte < fin,
+            InfoCollecte.statut == StatutCollecteEnum.COMPLETED,
+            InfoCollecte.annule == False,  # noqa: E712
+        )
+        .cte("collectes")
     )
-    total_sorties = _compute_decimal(
-        operations_query.filter(
-            OperationCaisse.type_operation.in_(
-                [TypeOperationCaisseEnum.SORTIE.value, TypeOperationCaisseEnum.FERMETURE.value]
-            )
+    operations = (
+        select(
+            func.count().label("nb"),
+            func.coalesce(
+                func.sum(OperationCaisse.montant).filter(
+                    OperationCaisse.type_operation.in_(
+                        [TypeOperationCaisseEnum.ENTREE.value, TypeOperationCaisseEnum.OUVERTURE.value]
+                    )
+                ),
+                0,
+            ).label("entrees"),
+            func.coalesce(
+                func.sum(OperationCaisse.montant).filter(
+                    OperationCaisse.type_operation.in_(
+                        [TypeOperationCaisseEnum.SORTIE.value, TypeOperationCaisseEnum.FERMETURE.value]
+                    )
+                ),
+                0,
+            ).label("sorties"),
         )
-        .with_entities(func.coalesce(func.sum(OperationCaisse.montant), 0))
-        .scalar()
+        .where(OperationCaisse.date_operation >= debut, OperationCaisse.date_operation < fin)
+        .cte("operations")
     )
-
-    relances_envoyees = db.query(func.count(Relance.id)).filter(
-        func.date(Relance.created_at) == target_date
-    ).scalar() or 0
-
-    impayes_regles = db.query(func.count(DossierImpaye.id)).filter(
-        func.date(DossierImpaye.date_cloture) == target_date
-    ).scalar() or 0
-
-    caisses_ouvertes = (
-        db.query(func.count(Caisse.id))
-        .filter(Caisse.etat == EtatCaisseEnum.OUVERTE.value)
-        .scalar()
-        or 0
+    relances = (
+        select(func.count().label("nb"))
+        .where(Relance.created_at >= debut, Relance.created_at < fin)
+        .cte("relances")
+    )
+    impayes = (
+        select(func.count().label("nb"))
+        .where(DossierImpaye.date_cloture >= debut, DossierImpaye.date_cloture < fin)
+        .cte("impayes")
+    )
+    caisses = (
+        select(func.count().label("nb"))
+        .where(Caisse.etat == EtatCaisseEnum.OUVERTE.value)
+        .cte("caisses")
     )
 
+    ligne = db.execute(
+        select(
+            collectes.c.nb.label("nb_collectes"),
+            collectes.c.montant.label("montant_collectes"),
+            operations.c.nb.label("nb_operations"),
+            operations.c.entrees.label("total_entrees"),
+            operations.c.sorties.label("total_sorties"),
+            relances.c.nb.label("relances_envoyees"),
+            impayes.c.nb.label("impayes_regles"),
+            caisses.c.nb.label("caisses_ouvertes"),
+        ).select_from(
+            collectes
+            .join(operations, true())
+            .join(relances, true())
+            .join(impayes, true())
+            .join(caisses, true())
+        )
+    ).one()
+
+    caisses_ouvertes = ligne.caisses_ouvertes or 0
     return {
         "date_jour": target_date,
         "statut": StatutJournalEnum.EN_COURS.value,
-        "nb_collectes": nb_collectes,
-        "montant_collectes": montant_collectes,
-        "nb_operations_caisse": nb_operations,
-        "total_entrees_caisse": total_entrees,
-        "total_sorties_caisse": total_sorties,
-        "relances_envoyees": relances_envoyees,
-        "impayes_regles": impayes_regles,
+        "nb_collectes": ligne.nb_collectes or 0,
+        "montant_collectes": _compute_decimal(ligne.montant_collectes),
+        "nb_operations_caisse": ligne.nb_operations or 0,
+        "total_entrees_caisse": _compute_decimal(ligne.total_entrees),
+        "total_sorties_caisse": _compute_decimal(ligne.total_sorties),
+        "relances_envoyees": ligne.relances_envoyees or 0,
+        "impayes_regles": ligne.impayes_regles or 0,
         "caisses_ouvertes": caisses_ouvertes,
         "toutes_caisses_fermees": caisses_ouvertes == 0,
     }
 
 
+@cached_report("journal", ttl=JOURNAL_CACHE_TTL)
+def _journal_jour_ouvert(db: Session, jour: date) -> dict:
+    """Chiffres d'une journée non clôturée, gardés quelques secondes (rafraîchissements du tableau de bord)"""
+    return compute_journal_stats(db, jour)
+
+
+def _journal_cloture(record: JournalTravaux) -> dict:
+    """Chiffres figés à la clôture (la clôture exige que toutes les caisses soient fermées)"""
+    return {
+        "date_jour": record.date_jour,
+        "statut": record.statut.value,
+        "nb_collectes": record.nb_collectes or 0,
+        "montant_collectes": _compute_decimal(record.montant_collectes),
+        "nb_operations_caisse": record.nb_operations_caisse or 0,
+        "total_entrees_caisse": _compute_decimal(record.total_entrees_caisse),
+        "total_sorties_caisse": _compute_decimal(record.total_sorties_caisse),
+        "relances_envoyees": record.relances_envoyees or 0,
+        "impayes_regles": record.impayes_regles or 0,
+        "remarque": record.remarque,
+        "caisses_ouvertes": 0,
+        "toutes_caisses_fermees": True,
+    }
+
+
 @router.get("/travaux/current", response_model=JournalComputedResponse)
 def get_current_journal(
     jour: date = Query(default=date.today()),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
-    stats = compute_journal_stats(db, jour)
     stored = db.query(JournalTravaux).filter(JournalTravaux.date_jour == jour).first()
+    if stored and stored.statut == StatutJournalEnum.CLOTURE:
+        return JournalComputedResponse(**_journal_cloture(stored))
+
+    stats = dict(_journal_jour_ouvert(db, jour))  # copie : l'entrée du cache n'est pas modifiée
     if stored:
         stats["statut"] = stored.statut.value
         stats["remarque"] = stored.remarque
@@ -214,7 +316,7 @@ def get_current_journal(
 
 
 @router.get("/travaux/{jour}", response_model=JournalTravauxResponse)
-def get_journal(jour: date, db: Session = Depends(get_db)):
+def get_journal(jour: date, db: Session = Depends(get_read_db)):
     record = db.query(JournalTravaux).filter(JournalTravaux.date_jour == jour).first()
     if not record:
         raise HTTPException(status_code=404, detail="Journal introuvable pour cette date")
@@ -259,7 +361,7 @@ def cloturer_journee(
 
 
 @router.get("/commissions/files", response_model=list[CommissionFichierResponse])
-def list_commission_files(db: Session = Depends(get_db)):
+def list_commission_files(db: Session = Depends(get_read_db)):
     files = db.query(CommissionFichier).order_by(CommissionFichier.created_at.desc()).limit(50).all()
     return files
 
@@ -268,6 +370,7 @@ def list_commission_files(db: Session = Depends(get_db)):
 def generer_commissions(
     jour: date = Query(default=date.today()),
     format_fichier: str = Query(default="json", description="json, csv ou pdf"),
+    asynchrone: bool = Query(False, description="Exécuter en arrière-plan et répondre 202 avec la tâche (GET /api/jobs/{id})"),
     db: Session = Depends(get_db),
     current_user=Depends(get_current_active_user),
 ):
@@ -275,88 +378,134 @@ def generer_commissions(
     if format_fichier not in {"json", "csv", "pdf"}:
         raise HTTPException(status_code=400, detail="Format de fichier non supporté (json, csv, pdf)")
 
-    # Supprimer les commissions existantes pour cette date
-    db.query(CommissionJournaliere).filter(CommissionJournaliere.date_jour == jour).delete()
+    if asynchrone:
+        utilisateur_id = getattr(current_user, "id", None)
+        job = soumettre_job(
+            db,
+            "generation_commissions",
+            {"jour": jour.isoformat(), "format_fichier": format_fichier, "created_by": utilisateur_id},
+            utilisateur_id,
+        )
+        return reponse_job_acceptee(job)
+
+    return _produire_commissions(db, jour, format_fichier, getattr(current_user, "id", None))
+
+
+@tache_job("generation_commissions")
+def _job_generation_commissions(db: Session, parametres: dict, progression) -> dict:
+    """Génération du fichier de commissions en arrière-plan (?asynchrone=true)"""
+    progression(10, "Calcul des commissions")
+    reponse = _produire_commissions(
+        db,
+        date.fromisoformat(parametres["jour"]),
+        parametres.get("format_fichier", "json"),
+        parametres.get("created_by"),
+    )
+    return {
+        "fichier_id": reponse.fichier.id,
+        "chemin": reponse.fichier.chemin,
+        "url": f"/uploads/{reponse.fichier.chemin}",
+        "total_collecteurs": len(reponse.commissions),
+    }
+
 
+def _produire_commissions(
+    db: Session, jour: date, format_fichier: str, created_by: Optional[int]
+) -> CommissionGenerationResponse:
+    """
+    Calcule les commissions du jour, écrit le fichier au fil de la lecture et
+    enregistre le fichier et ses lignes dans une seule transaction : en cas
+    d'échec, rien n'est enregistré et le fichier écrit est supprimé.
+    """
     collectes = (
-        db.query(
+        select(
             InfoCollecte.collecteur_id,
+            Collecteur.nom,
+            Collecteur.prenom,
             func.coalesce(func.sum(InfoCollecte.montant), 0).label("total_collecte"),
             func.coalesce(func.sum(InfoCollecte.commission), 0).label("commission"),
         )
-        .filter(
-            func.date(InfoCollecte.date_collecte) == jour,
+        .outerjoin(Collecteur, Collecteur.id == InfoCollecte.collecteur_id)
+        .where(
+            filtre_jour(InfoCollecte.date_collecte, jour),
             InfoCollecte.statut == StatutCollecteEnum.COMPLETED,
             InfoCollecte.annule == False,
         )
-        .group_by(InfoCollecte.collecteur_id)
-        .all()
+        .group_by(InfoCollecte.collecteur_id, Collecteur.nom, Collecteur.prenom)
+        .order_by(InfoCollecte.collecteur_id)
+        .execution_options(yield_per=TAILLE_LOT_COMMISSIONS)
     )
 
-    if not collectes:
-        raise HTTPException(status_code=400, detail="Aucune collecte validée pour cette date")
-
-    commissions_items: list[CommissionItem] = []
-    for ligne in collectes:
-        collecteur = db.query(Collecteur).filter(Collecteur.id == ligne.collecteur_id).first()
-        commission_percent = (
-            (Decimal(ligne.commission or 0) / Decimal(ligne.total_collecte or 1) * 100)
-            if ligne.total_collecte
-            else Decimal("0.00")
-        )
-        commissions_items.append(
-            CommissionItem(
-                collecteur_id=ligne.collecteur_id,
-                collecteur_nom=f"{collecteur.nom} {collecteur.prenom}" if collecteur else None,
-                montant_collecte=_compute_decimal(ligne.total_collecte),
-                commission_montant=_compute_decimal(ligne.commission),
-                commission_pourcentage=commission_percent.quantize(Decimal("0.01")),
-                statut_paiement=StatutCommissionEnum.EN_ATTENTE.value,
-            )
-        )
-
     # Créer le fichier dans uploads/commissions
-    uploads_dir = Path(__file__).resolve().parent.parent / "uploads" / "commissions"
+    uploads_root = Path(__file__).resolve().parent.parent / "uploads"
+    uploads_dir = uploads_root / "commissions"
     uploads_dir.mkdir(parents=True, exist_ok=True)
     filename = f"commission_{jour.isoformat()}_{int(datetime.utcnow().timestamp())}.{format_fichier}"
     file_path = uploads_dir / filename
-    if format_fichier == "json":
-        _write_commissions_json(file_path, commissions_items)
-    elif format_fichier == "csv":
-        _write_commissions_csv(file_path, commissions_items)
-    else:
-        _write_commissions_pdf(file_path, commissions_items, jour)
-
-    fichier = CommissionFichier(
-        date_jour=jour,
-        chemin=str(file_path.relative_to(Path(__file__).resolve().parent.parent / "uploads")),
-        type_fichier=format_fichier,
-        statut=StatutCommissionEnum.EN_ATTENTE,
-        created_by=getattr(current_user, "id", None),
-        file_metadata={
-            "total_collecteurs": len(commissions_items),
-            "format": format_fichier,
-        },
-    )
-    db.add(fichier)
-    db.commit()
-    db.refresh(fichier)
 
-    for item in commissions_items:
-        db.add(
-            CommissionJournaliere(
-                date_jour=jour,
-                collecteur_id=item.collecteur_id,
-                montant_collecte=item.montant_collecte,
-                commission_montant=item.commission_montant,
-                commission_pourcentage=item.commission_pourcentage,
-                statut_paiement=StatutCommissionEnum.EN_ATTENTE,
-                fichier_id=fichier.id,
-            )
+    commissions_items: list[CommissionItem] = []
+    try:
+        # Supprimer les commissions existantes pour cette date
+        db.query(CommissionJournaliere).filter(CommissionJournaliere.date_jour == jour).delete()
+
+        with ECRIVAINS_COMMISSIONS[format_fichier](file_path, jour) as ecrire:
+            for ligne in db.execute(collectes):
+                commission_percent = (
+                    (Decimal(ligne.commission or 0) / Decimal(ligne.total_collecte or 1) * 100)
+                    if ligne.total_collecte
+                    else Decimal("0.00")
+                )
+                item = CommissionItem(
+                    collecteur_id=ligne.collecteur_id,
+                    collecteur_nom=f"{ligne.nom} {ligne.prenom}" if ligne.nom is not None else None,
+                    montant_collecte=_compute_decimal(ligne.total_collecte),
+                    commission_montant=_compute_decimal(ligne.commission),
+                    commission_pourcentage=commission_percent.quantize(Decimal("0.01")),
+                    statut_paiement=StatutCommissionEnum.EN_ATTENTE.value,
+                )
+                ecrire(item)
+                commissions_items.append(item)
+
+        if not commissions_items:
+            raise HTTPException(status_code=400, detail="Aucune collecte validée pour cette date")
+
+        fichier = CommissionFichier(
+            date_jour=jour,
+            chemin=str(file_path.relative_to(uploads_root)),
+            type_fichier=format_fichier,
+            statut=StatutCommissionEnum.EN_ATTENTE,
+            created_by=created_by,
+            file_metadata={
+                "total_collecteurs": len(commissions_items),
+                "format": format_fichier,
+            },
         )
+        db.add(fichier)
+        db.flush()
+
+        # Toutes les lignes en une seule instruction (executemany)
+        db.execute(
+            insert(CommissionJournaliere),
+            [
+                {
+                    "date_jour": jour,
+                    "collecteur_id": item.collecteur_id,
+                    "montant_collecte": item.montant_collecte,
+                    "commission_montant": item.commission_montant,
+                    "commission_pourcentage": item.commission_pourcentage,
+                    "statut_paiement": StatutCommissionEnum.EN_ATTENTE,
+                    "fichier_id": fichier.id,
+                }
+                for item in commissions_items
+            ],
+        )
+        db.commit()
+    except BaseException:
+        db.rollback()
+        file_path.unlink(missing_ok=True)
+        raise
 
-    db.commit()
-
+    db.refresh(fichier)
     return CommissionGenerationResponse(
         fichier=fichier,
         commissions=commissions_items,
@@ -371,7 +520,7 @@ def list_commissions(
     statut: Optional[StatutCommissionEnum] = Query(default=None),
     skip: int = Query(default=0, ge=0),
     limit: int = Query(default=500, ge=1, le=1000),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     query = (
         db.query(CommissionJournaliere, Collecteur)
@@ -427,13 +576,13 @@ def list_commissions(
 @router.get("/travaux/{jour}/collectes", response_model=list[InfoCollecteResponse])
 def get_collectes_jour(
     jour: date,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """Récupère toutes les collectes validées pour une date donnée"""
     collectes = (
         db.query(InfoCollecte)
         .filter(
-            func.date(InfoCollecte.date_collecte) == jour,
+            filtre_jour(InfoCollecte.date_collecte, jour),
             InfoCollecte.statut == StatutCollecteEnum.COMPLETED,
             InfoCollecte.annule == False,
         )
@@ -446,27 +595,49 @@ def get_collectes_jour(
 @router.get("/travaux/{jour}/operations", response_model=list[OperationCaisseResponse])
 def get_operations_jour(
     jour: date,
-    db: Session = Depends(get_db),
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=5000, description="Taille de page (toutes les opérations si absent)"),
+    apres: Optional[str] = Query(None, description="Curseur de pagination (en-tête X-Curseur-Suivant de la page précédente)"),
+    format_export: Optional[str] = Query(None, alias="format", description="Export en flux : ndjson ou csv"),
+    db: Session = Depends(get_read_db),
 ):
-    """Récupère toutes les opérations de caisse pour une date donnée"""
-    operations = (
-        db.query(OperationCaisse)
-        .filter(func.date(OperationCaisse.date_operation) == jour)
-        .order_by(OperationCaisse.date_operation.desc())
-        .all()
-    )
+    """Récupère les opérations de caisse pour une date donnée (pagination par curseur ou export en flux)"""
+    criteres = [filtre_jour(OperationCaisse.date_operation, jour)]
+    if apres:
+        try:
+            criteres.append(filtre_apres(apres))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    if format_export:
+        if format_export not in FORMATS_EXPORT:
+            raise HTTPException(status_code=400, detail=f"Format invalide. Valeurs acceptées: {list(FORMATS_EXPORT)}")
+        return StreamingResponse(
+            flux_operations(criteres, format_export),
+            media_type=media_type(format_export),
+            headers={"Content-Disposition": f'attachment; filename="operations_{jour.isoformat()}.{format_export}"'}
+        )
+    
+    query = db.query(OperationCaisse).filter(*criteres).order_by(*ordre_registre())
+    if limit:
+        query = query.limit(limit)
+    operations = query.all()
+    
+    suivant = curseur_suivant(operations, limit)
+    if suivant:
+        response.headers[ENTETE_CURSEUR_SUIVANT] = suivant
     return operations
 
 
 @router.get("/travaux/{jour}/relances", response_model=list)
 def get_relances_jour(
     jour: date,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """Récupère toutes les relances envoyées pour une date donnée"""
     relances = (
         db.query(Relance)
-        .filter(func.date(Relance.created_at) == jour)
+        .filter(filtre_jour(Relance.created_at, jour))
         .order_by(Relance.created_at.desc())
         .all()
     )
@@ -487,7 +658,7 @@ def get_relances_jour(
 @router.get("/commissions/{jour}/details", response_model=list[CommissionItem])
 def get_commissions_details(
     jour: date,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """Récupère le détail des commissions journalières pour une date donnée"""
     commissions = (
@@ -3,8 +3,10 @@ Routes pour la gestion des notifications
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database.database import get_db
+from database.database import get_async_db, get_db
 from database.models import NotificationToken, Notification, Utilisateur
 from schemas.notifications import (
     TokenRegister,
@@ -132,17 +134,19 @@ def delete_notification(
 
 
 @router.get("/count", response_model=NotificationCountResponse)
-def get_unread_count(
-    db: Session = Depends(get_db),
+async def get_unread_count(
+    db: AsyncSession = Depends(get_async_db),
     current_user: Utilisateur = Depends(get_current_active_user),
 ):
     """
     Obtenir le nombre de notifications non lues
     """
-    count = db.query(Notification).filter(
-        Notification.user_id == current_user.id,
-        Notification.read == False  # noqa: E712
-    ).count()
+    count = await db.scalar(
+        select(func.count(Notification.id)).where(
+            Notification.user_id == current_user.id,
+            Notification.read == False  # noqa: E712
+        )
+    )
     
     return {"count": count}
 
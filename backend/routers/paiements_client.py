@@ -12,6 +12,8 @@ from database.database import get_db
 from database.models import Taxe, TransactionBambooPay, StatutTransactionEnum, AffectationTaxe, Contribuable
 from schemas.transaction import TransactionCreate, TransactionResponse, TransactionStatusResponse, CallbackData
 from services.bamboopay import bamboopay_service
+from services.collecte_hooks import collectes_modifiees
+from services.plages_dates import filtre_jour
 from datetime import datetime
 import uuid
 import logging
@@ -208,7 +210,7 @@ async def callback_bamboopay(
                 existing_collecte = db.query(InfoCollecte).filter(
                     InfoCollecte.contribuable_id == transaction.contribuable_id,
                     InfoCollecte.taxe_id == transaction.taxe_id,
-                    func.date(InfoCollecte.date_collecte) == datetime.utcnow().date()
+                    filtre_jour(InfoCollecte.date_collecte, datetime.utcnow().date())
                 ).first()
                 
                 if not existing_collecte:
@@ -223,6 +225,7 @@ async def callback_bamboopay(
                         date_collecte=datetime.utcnow()
                     )
                     db.add(collecte)
+                    collectes_modifiees(db, [collecte])
     elif statut_bp.lower() in ["failed", "error"]:
         transaction.statut = StatutTransactionEnum.FAILED
     elif statut_bp.lower() in ["cancelled", "canceled"]:
@@ -3,8 +3,10 @@ Routes pour la gestion des QR codes
 """
 
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from database.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer, joinedload
+from database.database import get_async_db
 from database.models import Contribuable, InfoCollecte
 from schemas.qr_code import ContribuableQRResponse, CollecteQRResponse
 from auth.security import get_current_active_user
@@ -19,17 +21,19 @@ router = APIRouter(
 
 
 @router.get("/contribuables/qr/{qr_code}", response_model=ContribuableQRResponse)
-def get_contribuable_by_qr(
+async def get_contribuable_by_qr(
     qr_code: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Récupérer un contribuable par son QR code
     """
-    contribuable = db.query(Contribuable).filter(
-        Contribuable.qr_code == qr_code,
-        Contribuable.actif == True  # noqa: E712
-    ).first()
+    contribuable = (await db.execute(
+        select(Contribuable).options(defer(Contribuable.geom)).where(
+            Contribuable.qr_code == qr_code,
+            Contribuable.actif == True  # noqa: E712
+        )
+    )).scalars().first()
     
     if not contribuable:
         raise HTTPException(status_code=404, detail="Contribuable non trouvé pour ce QR code")
@@ -38,9 +42,9 @@ def get_contribuable_by_qr(
 
 
 @router.get("/collectes/qr/{qr_code}", response_model=CollecteQRResponse)
-def verify_receipt_qr(
+async def verify_receipt_qr(
     qr_code: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """
     Vérifier un reçu par QR code
@@ -66,12 +70,19 @@ def verify_receipt_qr(
             raise HTTPException(status_code=400, detail="QR code incomplet")
         
         # Récupérer la collecte
-        from database.models import StatutCollecteEnum
-        collecte = db.query(InfoCollecte).filter(
-            InfoCollecte.id == collecte_id,
-            InfoCollecte.reference == reference,
-            InfoCollecte.statut == StatutCollecteEnum.COMPLETED
-        ).first()
+        # (relations chargées dans la même requête : pas de chargement différé en asynchrone)
+        from database.models import Collecteur, StatutCollecteEnum
+        collecte = (await db.execute(
+            select(InfoCollecte).options(
+                joinedload(InfoCollecte.contribuable).defer(Contribuable.geom),
+                joinedload(InfoCollecte.taxe),
+                joinedload(InfoCollecte.collecteur).defer(Collecteur.geom),
+            ).where(
+                InfoCollecte.id == collecte_id,
+                InfoCollecte.reference == reference,
+                InfoCollecte.statut == StatutCollecteEnum.COMPLETED
+            )
+        )).scalars().first()
         
         if not collecte:
             raise HTTPException(status_code=404, detail="Reçu non trouvé pour ce QR code")
@@ -5,10 +5,15 @@ Routes pour les rapports et statistiques
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
-from typing import Optional, List
-from database.database import get_db
-from database.models import InfoCollecte, Collecteur, Taxe, StatutCollecteEnum
+from sqlalchemy import and_, extract, func, select
+from typing import Callable, Optional, List
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+from dataclasses import dataclass
+import os
+import uuid
+from database.database import get_db, get_read_db, session_lecture
+from database.models import Collecteur, Taxe
 from datetime import datetime, date, timedelta
 from decimal import Decimal
 from pydantic import BaseModel
@@ -16,6 +21,11 @@ from auth.security import get_current_active_user
 from schemas.statistiques_collecteur import StatistiquesCollecteurResponse
 from services.statistiques_collecteur import compute_statistiques_collecteur
 from services.export_rapport import generate_csv_rapport, generate_pdf_rapport
+from services.rollup_collectes import rollup_source
+from services.sql_profiler import profiler_sql
+from services.report_cache import cached_report, get_cache_stats
+from services.jobs import DOSSIER_FICHIERS_JOBS, chemin_fichier_job, soumettre_job, tache_job
+from routers.jobs import reponse_job_acceptee
 
 router = APIRouter(
     prefix="/api/rapports",
@@ -74,82 +84,85 @@ class RapportComplet(BaseModel):
     evolution_temporelle: List[EvolutionTemporelle]
 
 
+def _calculer_statistiques_generales(
+    db: Session,
+    date_debut: Optional[date] = None,
+    date_fin: Optional[date] = None,
+    collecteur_id: Optional[int] = None,
+    taxe_id: Optional[int] = None
+) -> StatistiquesGenerales:
+    """
+    Calcule les statistiques générales en une seule requête : les trois périodes
+    (filtre demandé, aujourd'hui, mois en cours) sont des agrégats conditionnels
+    (FILTER) sur un même parcours du cumul journalier, et les nombres de
+    collecteurs / taxes actifs des sous-requêtes scalaires.
+    """
+    aujourd_hui = date.today()
+    premier_jour_mois = aujourd_hui.replace(day=1)
+
+    # Le parcours doit couvrir à la fois la période demandée et le mois en cours
+    # (sans borne de fin, comme auparavant)
+    debut_source = min(date_debut, premier_jour_mois) if date_debut else None
+    source = rollup_source(debut_source, None, collecteur_id, taxe_id)
+
+    periode = []
+    if date_debut:
+        periode.append(source.c.jour >= date_debut)
+    if date_fin:
+        periode.append(source.c.jour <= date_fin)
+
+    def _somme(colonne, *conditions):
+        agregat = func.sum(colonne)
+        if conditions:
+            agregat = agregat.filter(and_(*conditions))
+        return func.coalesce(agregat, 0)
+
+    row = db.query(
+        _somme(source.c.montant_total, *periode).label('total_collecte'),
+        _somme(source.c.nombre_transactions, *periode).label('nombre_transactions'),
+        _somme(source.c.montant_total, source.c.jour == aujourd_hui).label('collecte_aujourd_hui'),
+        _somme(source.c.nombre_transactions, source.c.jour == aujourd_hui).label('transactions_aujourd_hui'),
+        _somme(source.c.montant_total, source.c.jour >= premier_jour_mois).label('collecte_ce_mois'),
+        _somme(source.c.nombre_transactions, source.c.jour >= premier_jour_mois).label('transactions_ce_mois'),
+        select(func.count(Collecteur.id)).where(Collecteur.actif == True).scalar_subquery().label('nombre_collecteurs_actifs'),
+        select(func.count(Taxe.id)).where(Taxe.actif == True).scalar_subquery().label('nombre_taxes_actives')
+    ).one()
+
+    total_collecte = Decimal(row.total_collecte or 0)
+    nombre_transactions = int(row.nombre_transactions or 0)
+    moyenne_par_transaction = total_collecte / nombre_transactions if nombre_transactions > 0 else Decimal('0')
+
+    return StatistiquesGenerales(
+        total_collecte=total_collecte,
+        nombre_transactions=nombre_transactions,
+        moyenne_par_transaction=moyenne_par_transaction,
+        nombre_collecteurs_actifs=row.nombre_collecteurs_actifs or 0,
+        nombre_taxes_actives=row.nombre_taxes_actives or 0,
+        transactions_aujourd_hui=int(row.transactions_aujourd_hui or 0),
+        collecte_aujourd_hui=Decimal(row.collecte_aujourd_hui or 0),
+        transactions_ce_mois=int(row.transactions_ce_mois or 0),
+        collecte_ce_mois=Decimal(row.collecte_ce_mois or 0)
+    )
+
+
 @router.get("/statistiques-generales")
+@cached_report("rapports", ignorer_si=lambda params: params.get("profile"))
 def get_statistiques_generales(
     date_debut: Optional[date] = Query(None, description="Date de début du rapport"),
     date_fin: Optional[date] = Query(None, description="Date de fin du rapport"),
     collecteur_id: Optional[int] = Query(None, description="ID du collecteur pour filtrer"),
     taxe_id: Optional[int] = Query(None, description="ID de la taxe pour filtrer"),
-    db: Session = Depends(get_db)
+    profile: bool = Query(False, description="Débogage : ajoute le nombre de requêtes SQL et leur durée"),
+    db: Session = Depends(get_read_db)
 ):
     """Récupère les statistiques générales des collectes"""
     try:
-        # Query de base pour les collectes validées
-        query = db.query(InfoCollecte).filter(
-            InfoCollecte.statut == StatutCollecteEnum.COMPLETED,
-            InfoCollecte.annule == False
-        )
-        
-        # Appliquer les filtres
-        if date_debut:
-            query = query.filter(InfoCollecte.date_collecte >= datetime.combine(date_debut, datetime.min.time()))
-        if date_fin:
-            query = query.filter(InfoCollecte.date_collecte <= datetime.combine(date_fin, datetime.max.time()))
-        if collecteur_id:
-            query = query.filter(InfoCollecte.collecteur_id == collecteur_id)
-        if taxe_id:
-            query = query.filter(InfoCollecte.taxe_id == taxe_id)
-        
-        # Statistiques globales
-        total_collecte = query.with_entities(func.sum(InfoCollecte.montant)).scalar() or Decimal('0')
-        nombre_transactions = query.count()
-        moyenne_par_transaction = total_collecte / nombre_transactions if nombre_transactions > 0 else Decimal('0')
-        
-        # Statistiques pour aujourd'hui
-        aujourd_hui = date.today()
-        query_aujourd_hui = db.query(InfoCollecte).filter(
-            InfoCollecte.statut == StatutCollecteEnum.COMPLETED,
-            InfoCollecte.annule == False,
-            func.date(InfoCollecte.date_collecte) == aujourd_hui
-        )
-        if collecteur_id:
-            query_aujourd_hui = query_aujourd_hui.filter(InfoCollecte.collecteur_id == collecteur_id)
-        if taxe_id:
-            query_aujourd_hui = query_aujourd_hui.filter(InfoCollecte.taxe_id == taxe_id)
-        
-        transactions_aujourd_hui = query_aujourd_hui.count()
-        collecte_aujourd_hui = query_aujourd_hui.with_entities(func.sum(InfoCollecte.montant)).scalar() or Decimal('0')
-        
-        # Statistiques pour ce mois
-        premier_jour_mois = date.today().replace(day=1)
-        query_ce_mois = db.query(InfoCollecte).filter(
-            InfoCollecte.statut == StatutCollecteEnum.COMPLETED,
-            InfoCollecte.annule == False,
-            InfoCollecte.date_collecte >= datetime.combine(premier_jour_mois, datetime.min.time())
-        )
-        if collecteur_id:
-            query_ce_mois = query_ce_mois.filter(InfoCollecte.collecteur_id == collecteur_id)
-        if taxe_id:
-            query_ce_mois = query_ce_mois.filter(InfoCollecte.taxe_id == taxe_id)
-        
-        transactions_ce_mois = query_ce_mois.count()
-        collecte_ce_mois = query_ce_mois.with_entities(func.sum(InfoCollecte.montant)).scalar() or Decimal('0')
-        
-        # Nombre de collecteurs et taxes actifs
-        nombre_collecteurs_actifs = db.query(Collecteur).filter(Collecteur.actif == True).count()
-        nombre_taxes_actives = db.query(Taxe).filter(Taxe.actif == True).count()
-        
-        return StatistiquesGenerales(
-            total_collecte=total_collecte,
-            nombre_transactions=nombre_transactions,
-            moyenne_par_transaction=moyenne_par_transaction,
-            nombre_collecteurs_actifs=nombre_collecteurs_actifs,
-            nombre_taxes_actives=nombre_taxes_actives,
-            transactions_aujourd_hui=transactions_aujourd_hui,
-            collecte_aujourd_hui=collecte_aujourd_hui,
-            transactions_ce_mois=transactions_ce_mois,
-            collecte_ce_mois=collecte_ce_mois
-        )
+        if not profile:
+            return _calculer_statistiques_generales(db, date_debut, date_fin, collecteur_id, taxe_id)
+
+        with profiler_sql(db) as profil:
+            stats = _calculer_statistiques_generales(db, date_debut, date_fin, collecteur_id, taxe_id)
+        return {**stats.model_dump(), "profile": profil.as_dict()}
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -157,34 +170,22 @@ def get_statistiques_generales(
 
 
 @router.get("/collecte-par-moyen")
+@cached_report("rapports")
 def get_collecte_par_moyen(
     date_debut: Optional[date] = Query(None),
     date_fin: Optional[date] = Query(None),
     collecteur_id: Optional[int] = Query(None),
     taxe_id: Optional[int] = Query(None),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Récupère la répartition des collectes par moyen de paiement"""
     try:
-        query = db.query(
-            InfoCollecte.type_paiement,
-            func.sum(InfoCollecte.montant).label('montant_total'),
-            func.count(InfoCollecte.id).label('nombre_transactions')
-        ).filter(
-            InfoCollecte.statut == StatutCollecteEnum.COMPLETED,
-            InfoCollecte.annule == False
-        )
-        
-        if date_debut:
-            query = query.filter(InfoCollecte.date_collecte >= datetime.combine(date_debut, datetime.min.time()))
-        if date_fin:
-            query = query.filter(InfoCollecte.date_collecte <= datetime.combine(date_fin, datetime.max.time()))
-        if collecteur_id:
-            query = query.filter(InfoCollecte.collecteur_id == collecteur_id)
-        if taxe_id:
-            query = query.filter(InfoCollecte.taxe_id == taxe_id)
-        
-        results = query.group_by(InfoCollecte.type_paiement).all()
+        source = rollup_source(date_debut, date_fin, collecteur_id, taxe_id)
+        results = db.query(
+            source.c.type_paiement,
+            func.sum(source.c.montant_total).label('montant_total'),
+            func.sum(source.c.nombre_transactions).label('nombre_transactions')
+        ).group_by(source.c.type_paiement).all()
         
         # Calculer le total pour les pourcentages
         total = sum(row.montant_total for row in results) or Decimal('1')
@@ -195,7 +196,7 @@ def get_collecte_par_moyen(
             collecte_par_moyen.append(CollecteParMoyen(
                 moyen_paiement=row.type_paiement or 'autre',
                 montant_total=row.montant_total or Decimal('0'),
-                nombre_transactions=row.nombre_transactions or 0,
+                nombre_transactions=int(row.nombre_transactions or 0),
                 pourcentage=pourcentage
             ))
         
@@ -207,42 +208,33 @@ def get_collecte_par_moyen(
 
 
 @router.get("/top-collecteurs")
+@cached_report("rapports")
 def get_top_collecteurs(
     limit: int = Query(10, ge=1, le=50, description="Nombre de collecteurs à retourner"),
     date_debut: Optional[date] = Query(None),
     date_fin: Optional[date] = Query(None),
     taxe_id: Optional[int] = Query(None),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Récupère les meilleurs collecteurs par montant collecté"""
     try:
-        query = db.query(
-            InfoCollecte.collecteur_id,
+        source = rollup_source(date_debut, date_fin, None, taxe_id)
+        results = db.query(
+            source.c.collecteur_id,
             Collecteur.nom,
             Collecteur.prenom,
-            func.sum(InfoCollecte.montant).label('montant_total'),
-            func.count(InfoCollecte.id).label('nombre_transactions')
+            func.sum(source.c.montant_total).label('montant_total'),
+            func.sum(source.c.nombre_transactions).label('nombre_transactions')
         ).join(
-            Collecteur, InfoCollecte.collecteur_id == Collecteur.id
+            Collecteur, source.c.collecteur_id == Collecteur.id
         ).filter(
-            InfoCollecte.statut == StatutCollecteEnum.COMPLETED,
-            InfoCollecte.annule == False,
             Collecteur.actif == True
-        )
-        
-        if date_debut:
-            query = query.filter(InfoCollecte.date_collecte >= datetime.combine(date_debut, datetime.min.time()))
-        if date_fin:
-            query = query.filter(InfoCollecte.date_collecte <= datetime.combine(date_fin, datetime.max.time()))
-        if taxe_id:
-            query = query.filter(InfoCollecte.taxe_id == taxe_id)
-        
-        results = query.group_by(
-            InfoCollecte.collecteur_id,
+        ).group_by(
+            source.c.collecteur_id,
             Collecteur.nom,
             Collecteur.prenom
         ).order_by(
-            func.sum(InfoCollecte.montant).desc()
+            func.sum(source.c.montant_total).desc()
         ).limit(limit).all()
         
         return [
@@ -251,7 +243,7 @@ def get_top_collecteurs(
                 collecteur_nom=row.nom or '',
                 collecteur_prenom=row.prenom or '',
                 montant_total=row.montant_total or Decimal('0'),
-                nombre_transactions=row.nombre_transactions or 0
+                nombre_transactions=int(row.nombre_transactions or 0)
             )
             for row in results
         ]
@@ -262,42 +254,33 @@ def get_top_collecteurs(
 
 
 @router.get("/top-taxes")
+@cached_report("rapports")
 def get_top_taxes(
     limit: int = Query(10, ge=1, le=50, description="Nombre de taxes à retourner"),
     date_debut: Optional[date] = Query(None),
     date_fin: Optional[date] = Query(None),
     collecteur_id: Optional[int] = Query(None),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Récupère les meilleures taxes par montant collecté"""
     try:
-        query = db.query(
-            InfoCollecte.taxe_id,
+        source = rollup_source(date_debut, date_fin, collecteur_id, None)
+        results = db.query(
+            source.c.taxe_id,
             Taxe.nom,
             Taxe.code,
-            func.sum(InfoCollecte.montant).label('montant_total'),
-            func.count(InfoCollecte.id).label('nombre_transactions')
+            func.sum(source.c.montant_total).label('montant_total'),
+            func.sum(source.c.nombre_transactions).label('nombre_transactions')
         ).join(
-            Taxe, InfoCollecte.taxe_id == Taxe.id
+            Taxe, source.c.taxe_id == Taxe.id
         ).filter(
-            InfoCollecte.statut == StatutCollecteEnum.COMPLETED,
-            InfoCollecte.annule == False,
             Taxe.actif == True
-        )
-        
-        if date_debut:
-            query = query.filter(InfoCollecte.date_collecte >= datetime.combine(date_debut, datetime.min.time()))
-        if date_fin:
-            query = query.filter(InfoCollecte.date_collecte <= datetime.combine(date_fin, datetime.max.time()))
-        if collecteur_id:
-            query = query.filter(InfoCollecte.collecteur_id == collecteur_id)
-        
-        results = query.group_by(
-            InfoCollecte.taxe_id,
+        ).group_by(
+            source.c.taxe_id,
             Taxe.nom,
             Taxe.code
         ).order_by(
-            func.sum(InfoCollecte.montant).desc()
+            func.sum(source.c.montant_total).desc()
         ).limit(limit).all()
         
         return [
@@ -306,7 +289,7 @@ def get_top_taxes(
                 taxe_nom=row.nom or '',
                 taxe_code=row.code or '',
                 montant_total=row.montant_total or Decimal('0'),
-                nombre_transactions=row.nombre_transactions or 0
+                nombre_transactions=int(row.nombre_transactions or 0)
             )
             for row in results
         ]
@@ -317,13 +300,14 @@ def get_top_taxes(
 
 
 @router.get("/evolution-temporelle")
+@cached_report("rapports")
 def get_evolution_temporelle(
     date_debut: Optional[date] = Query(None),
     date_fin: Optional[date] = Query(None),
     collecteur_id: Optional[int] = Query(None),
     taxe_id: Optional[int] = Query(None),
     periode: str = Query('jour', regex='^(jour|semaine|mois)$', description="Période d'agrégation"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Récupère l'évolution temporelle des collectes"""
     try:
@@ -337,43 +321,33 @@ def get_evolution_temporelle(
             else:
                 date_debut = date_fin - timedelta(days=30)  # 30 jours
         
+        source = rollup_source(date_debut, date_fin, collecteur_id, taxe_id)
         query = db.query(
-            func.date(InfoCollecte.date_collecte).label('date_collecte'),
-            func.sum(InfoCollecte.montant).label('montant_total'),
-            func.count(InfoCollecte.id).label('nombre_transactions')
-        ).filter(
-            InfoCollecte.statut == StatutCollecteEnum.COMPLETED,
-            InfoCollecte.annule == False,
-            InfoCollecte.date_collecte >= datetime.combine(date_debut, datetime.min.time()),
-            InfoCollecte.date_collecte <= datetime.combine(date_fin, datetime.max.time())
+            func.min(source.c.jour).label('date_collecte'),
+            func.sum(source.c.montant_total).label('montant_total'),
+            func.sum(source.c.nombre_transactions).label('nombre_transactions')
         )
         
-        if collecteur_id:
-            query = query.filter(InfoCollecte.collecteur_id == collecteur_id)
-        if taxe_id:
-            query = query.filter(InfoCollecte.taxe_id == taxe_id)
-        
         if periode == 'mois':
             query = query.group_by(
-                extract('year', InfoCollecte.date_collecte),
-                extract('month', InfoCollecte.date_collecte)
+                extract('year', source.c.jour),
+                extract('month', source.c.jour)
             )
         elif periode == 'semaine':
             query = query.group_by(
-                extract('year', InfoCollecte.date_collecte),
-                extract('week', InfoCollecte.date_collecte)
+                extract('year', source.c.jour),
+                extract('week', source.c.jour)
             )
         else:  # jour
-                query = query.group_by(func.date(InfoCollecte.date_collecte))
+            query = query.group_by(source.c.jour)
         
-        results = query.all()
+        results = query.order_by(func.min(source.c.jour)).all()
         
         evolution = []
         for row in results:
-            # Format de sortie selon le type de requête
-            date_collecte = row[0] if isinstance(row, tuple) else (row.date_collecte if hasattr(row, 'date_collecte') else None)
-            montant_total = row[1] if isinstance(row, tuple) else (row.montant_total if hasattr(row, 'montant_total') else Decimal('0'))
-            nb_transactions = row[2] if isinstance(row, tuple) else (row.nombre_transactions if hasattr(row, 'nombre_transactions') else 0)
+            date_collecte = row.date_collecte
+            montant_total = row.montant_total
+            nb_transactions = int(row.nombre_transactions or 0)
             
             # Formater la période selon le type d'agrégation
             if periode == 'mois':
@@ -409,39 +383,93 @@ def get_evolution_temporelle(
         raise HTTPException(status_code=500, detail=f"Erreur lors du calcul: {str(e)}")
 
 
+@dataclass(frozen=True)
+class FiltresRapport:
+    """Filtres communs à toutes les sections du rapport complet"""
+    date_debut: Optional[date] = None
+    date_fin: Optional[date] = None
+    collecteur_id: Optional[int] = None
+    taxe_id: Optional[int] = None
+    top_limit: int = 10
+
+
+# Pool partagé par toutes les requêtes : borne le nombre de connexions prises par les rapports
+_sections_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("RAPPORT_SECTIONS_WORKERS", "5")),
+    thread_name_prefix="rapport-section"
+)
+
+
+def _executer_section(calcul: Callable[[Session], object]):
+    """Exécute une section du rapport sur sa propre session (réplica en lecture si disponible)"""
+    db = session_lecture()
+    try:
+        return calcul(db)
+    finally:
+        db.close()
+
+
+@cached_report("rapports")
+def _assembler_rapport_complet(filtres: FiltresRapport) -> RapportComplet:
+    """
+    Calcule les cinq sections en parallèle, chacune sur une connexion distincte :
+    la durée totale est celle de la section la plus lente et non plus leur somme.
+    """
+    f = filtres
+    sections = {
+        "statistiques_generales": lambda db: _calculer_statistiques_generales(
+            db, f.date_debut, f.date_fin, f.collecteur_id, f.taxe_id
+        ),
+        "collecte_par_moyen": lambda db: get_collecte_par_moyen(
+            f.date_debut, f.date_fin, f.collecteur_id, f.taxe_id, db
+        ),
+        "top_collecteurs": lambda db: get_top_collecteurs(
+            f.top_limit, f.date_debut, f.date_fin, f.taxe_id, db
+        ),
+        "top_taxes": lambda db: get_top_taxes(
+            f.top_limit, f.date_debut, f.date_fin, f.collecteur_id, db
+        ),
+        "evolution_temporelle": lambda db: get_evolution_temporelle(
+            f.date_debut, f.date_fin, f.collecteur_id, f.taxe_id, 'jour', db
+        ),
+    }
+    # Le contexte est recopié dans chaque thread (lectures_sur_principale, cf. report_cache)
+    futures = {
+        nom: _sections_executor.submit(contextvars.copy_context().run, _executer_section, calcul)
+        for nom, calcul in sections.items()
+    }
+    return RapportComplet(**{nom: future.result() for nom, future in futures.items()})
+
+
 @router.get("/complet")
 def get_rapport_complet(
     date_debut: Optional[date] = Query(None),
     date_fin: Optional[date] = Query(None),
     collecteur_id: Optional[int] = Query(None),
     taxe_id: Optional[int] = Query(None),
-    top_limit: int = Query(10, ge=1, le=50),
-    db: Session = Depends(get_db)
+    top_limit: int = Query(10, ge=1, le=50)
 ):
     """Récupère un rapport complet avec toutes les statistiques"""
     try:
-        # Calculer toutes les statistiques en parallèle serait mieux, mais on fait séquentiel pour simplifier
-        stats_gen = get_statistiques_generales(date_debut, date_fin, collecteur_id, taxe_id, db)
-        collecte_moyen = get_collecte_par_moyen(date_debut, date_fin, collecteur_id, taxe_id, db)
-        top_collecteurs = get_top_collecteurs(top_limit, date_debut, date_fin, taxe_id, db)
-        top_taxes = get_top_taxes(top_limit, date_debut, date_fin, collecteur_id, db)
-        evolution = get_evolution_temporelle(date_debut, date_fin, collecteur_id, taxe_id, 'jour', db)
-        
-        return RapportComplet(
-            statistiques_generales=stats_gen,
-            collecte_par_moyen=collecte_moyen,
-            top_collecteurs=top_collecteurs,
-            top_taxes=top_taxes,
-            evolution_temporelle=evolution
+        return _assembler_rapport_complet(
+            FiltresRapport(date_debut, date_fin, collecteur_id, taxe_id, top_limit)
         )
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Erreur lors de la génération du rapport: {str(e)}")
 
 
+@router.get("/cache/stats")
+def get_rapports_cache_stats():
+    """Compteurs du cache des rapports et de la cartographie (succès, échecs, version)"""
+    return get_cache_stats()
+
+
 @router.get("/collecteur/{collecteur_id}", response_model=StatistiquesCollecteurResponse)
-def get_collecteur_stats_via_rapports(collecteur_id: int, db: Session = Depends(get_db)):
+def get_collecteur_stats_via_rapports(collecteur_id: int, db: Session = Depends(get_read_db)):
     """Expose /api/rapports/collecteur/{collecteur_id} pour l'app mobile"""
     stats = compute_statistiques_collecteur(db, collecteur_id)
     if not stats:
@@ -449,6 +477,50 @@ def get_collecteur_stats_via_rapports(collecteur_id: int, db: Session = Depends(
     return stats
 
 
+def _rapport_pour_export(filtres: FiltresRapport) -> dict:
+    """Rapport complet sous forme de dictionnaire, avec les dates de filtrage formatées"""
+    # Récupérer le rapport complet
+    rapport_complet = _assembler_rapport_complet(filtres)
+    
+    # Convertir en dictionnaire
+    rapport_dict = rapport_complet.model_dump() if hasattr(rapport_complet, 'model_dump') else rapport_complet.dict()
+    
+    # Ajouter les dates de filtrage si disponibles
+    if filtres.date_debut:
+        rapport_dict['date_debut'] = filtres.date_debut.strftime('%d/%m/%Y')
+    if filtres.date_fin:
+        rapport_dict['date_fin'] = filtres.date_fin.strftime('%d/%m/%Y')
+    return rapport_dict
+
+
+@tache_job("export_rapport")
+def _job_export_rapport(db: Session, parametres: dict, progression) -> dict:
+    """
+    Export CSV / PDF en arrière-plan (?asynchrone=true). Le fichier est déposé
+    hors de uploads (servi sans authentification) et se télécharge via
+    GET /api/jobs/{id}/fichier.
+    """
+    format_export = parametres.get("format", "pdf")
+    filtres = FiltresRapport(
+        date.fromisoformat(parametres["date_debut"]) if parametres.get("date_debut") else None,
+        date.fromisoformat(parametres["date_fin"]) if parametres.get("date_fin") else None,
+        parametres.get("collecteur_id"),
+        parametres.get("taxe_id"),
+        int(parametres.get("top_limit", 10)),
+    )
+    progression(10, "Calcul du rapport")
+    rapport_dict = _rapport_pour_export(filtres)
+    
+    progression(60, f"Génération du fichier {format_export.upper()}")
+    buffer = generate_pdf_rapport(rapport_dict) if format_export == "pdf" else generate_csv_rapport(rapport_dict)
+    
+    DOSSIER_FICHIERS_JOBS.mkdir(parents=True, exist_ok=True)
+    filename = f"rapport_collecte_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex}.{format_export}"
+    chemin_fichier_job(filename).write_bytes(buffer.getvalue())
+    
+    return {"format": format_export, "fichier": filename}
+
+
 @router.get("/export/csv")
 def export_rapport_csv(
     date_debut: Optional[date] = Query(None, description="Date de début du rapport"),
@@ -456,21 +528,25 @@ def export_rapport_csv(
     collecteur_id: Optional[int] = Query(None, description="ID du collecteur pour filtrer"),
     taxe_id: Optional[int] = Query(None, description="ID de la taxe pour filtrer"),
     top_limit: int = Query(10, ge=1, le=50),
+    asynchrone: bool = Query(False, description="Générer le fichier en arrière-plan et répondre 202 avec la tâche (GET /api/jobs/{id})"),
     db: Session = Depends(get_db)
 ):
     """Exporte le rapport complet en format CSV"""
+    if asynchrone:
+        job = soumettre_job(db, "export_rapport", {
+            "format": "csv",
+            "date_debut": date_debut.isoformat() if date_debut else None,
+            "date_fin": date_fin.isoformat() if date_fin else None,
+            "collecteur_id": collecteur_id,
+            "taxe_id": taxe_id,
+            "top_limit": top_limit,
+        })
+        return reponse_job_acceptee(job)
+    
     try:
-        # Récupérer le rapport complet
-        rapport_complet = get_rapport_complet(date_debut, date_fin, collecteur_id, taxe_id, top_limit, db)
-        
-        # Convertir en dictionnaire
-        rapport_dict = rapport_complet.model_dump() if hasattr(rapport_complet, 'model_dump') else rapport_complet.dict()
-        
-        # Ajouter les dates de filtrage si disponibles
-        if date_debut:
-            rapport_dict['date_debut'] = date_debut.strftime('%d/%m/%Y') if isinstance(date_debut, date) else str(date_debut)
-        if date_fin:
-            rapport_dict['date_fin'] = date_fin.strftime('%d/%m/%Y') if isinstance(date_fin, date) else str(date_fin)
+        rapport_dict = _rapport_pour_export(
+            FiltresRapport(date_debut, date_fin, collecteur_id, taxe_id, top_limit)
+        )
         
         # Générer le CSV
         csv_buffer = generate_csv_rapport(rapport_dict)
@@ -500,21 +576,25 @@ def export_rapport_pdf(
     collecteur_id: Optional[int] = Query(None, description="ID du collecteur pour filtrer"),
     taxe_id: Optional[int] = Query(None, description="ID de la taxe pour filtrer"),
     top_limit: int = Query(10, ge=1, le=50),
+    asynchrone: bool = Query(False, description="Générer le fichier en arrière-plan et répondre 202 avec la tâche (GET /api/jobs/{id})"),
     db: Session = Depends(get_db)
 ):
     """Exporte le rapport complet en format PDF avec logo"""
+    if asynchrone:
+        job = soumettre_job(db, "export_rapport", {
+            "format": "pdf",
+            "date_debut": date_debut.isoformat() if date_debut else None,
+            "date_fin": date_fin.isoformat() if date_fin else None,
+            "collecteur_id": collecteur_id,
+            "taxe_id": taxe_id,
+            "top_limit": top_limit,
+        })
+        return reponse_job_acceptee(job)
+    
     try:
-        # Récupérer le rapport complet
-        rapport_complet = get_rapport_complet(date_debut, date_fin, collecteur_id, taxe_id, top_limit, db)
-        
-        # Convertir en dictionnaire
-        rapport_dict = rapport_complet.model_dump() if hasattr(rapport_complet, 'model_dump') else rapport_complet.dict()
-        
-        # Ajouter les dates de filtrage si disponibles
-        if date_debut:
-            rapport_dict['date_debut'] = date_debut.strftime('%d/%m/%Y') if isinstance(date_debut, date) else str(date_debut)
-        if date_fin:
-            rapport_dict['date_fin'] = date_fin.strftime('%d/%m/%Y') if isinstance(date_fin, date) else str(date_fin)
+        rapport_dict = _rapport_pour_export(
+            FiltresRapport(date_debut, date_fin, collecteur_id, taxe_id, top_limit)
+        )
         
         # Générer le PDF
         pdf_buffer = generate_pdf_rapport(rapport_dict)
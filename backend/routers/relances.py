@@ -5,10 +5,9 @@ Routes pour la gestion des relances
 import os
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, and_, or_
 from typing import List, Optional
 from database.database import get_db
-from database.models import Relance, Contribuable, AffectationTaxe, InfoCollecte, StatutCollecteEnum, TypeRelanceEnum, StatutRelanceEnum
+from database.models import Relance, Contribuable, AffectationTaxe, TypeRelanceEnum, StatutRelanceEnum
 from schemas.relance import (
     RelanceCreate,
     RelanceUpdate,
@@ -16,12 +15,19 @@ from schemas.relance import (
     RelanceListResponse,
     RelanceManuelleRequest,
 )
-from datetime import datetime, date, timedelta
-from decimal import Decimal
+from datetime import datetime, date
 from services.ventis_messaging import ventis_messaging_service
+from services.relances_automatiques import creer_relances_automatiques
+from services.envoi_relances import enregistrer_resultats, envoyer_sms_hors_boucle, preparer_envois
+from services.jobs import soumettre_job, tache_job
+from routers.jobs import reponse_job_acceptee
 
 router = APIRouter(prefix="/api/relances", tags=["relances"])
 VENTIS_DEFAULT_SENDER = os.getenv("VENTIS_MESSAGING_SENDER", "VENTIS")
+# Relances générées dans la requête HTTP ; au-delà, passer par une tâche (asynchrone=true)
+LIMITE_SYNCHRONE = 500
+# Limite appliquée aux appels synchrones qui n'en précisent pas
+LIMITE_PAR_DEFAUT = 50
 
 
 @router.get("/", response_model=RelanceListResponse)
@@ -230,11 +236,19 @@ async def envoyer_relance(relance_id: int, db: Session = Depends(get_db)):
 
 
 @router.post("/generer-automatique", response_model=List[RelanceResponse])
-async def generer_relances_automatiques(
+def generer_relances_automatiques(
     jours_retard_min: int = Query(7, ge=0, description="Nombre minimum de jours de retard"),
     type_relance: str = Query("sms", description="Type de relance à générer"),
-    limite: int = Query(50, ge=1, le=500, description="Nombre maximum de relances à générer"),
+    limite: Optional[int] = Query(
+        None,
+        ge=1,
+        description=(
+            f"Nombre maximum de relances à générer ({LIMITE_PAR_DEFAUT} par défaut, au plus {LIMITE_SYNCHRONE} "
+            "sans asynchrone ; sans limite en asynchrone si non précisé)"
+        ),
+    ),
     envoyer_automatiquement: bool = Query(False, description="Envoyer automatiquement les SMS après génération"),
+    asynchrone: bool = Query(False, description="Exécuter en arrière-plan et répondre 202 avec la tâche (GET /api/jobs/{id})"),
     db: Session = Depends(get_db)
 ):
     """Génère automatiquement des relances pour les contribuables en retard"""
@@ -243,127 +257,39 @@ async def generer_relances_automatiques(
     except ValueError:
         raise HTTPException(status_code=400, detail="Type de relance invalide")
     
-    # Date limite : aujourd'hui - jours_retard_min
-    date_limite = datetime.utcnow() - timedelta(days=jours_retard_min)
-    
-    # Trouver les affectations de taxes avec échéance dépassée et pas encore payées
-    affectations_en_retard = db.query(AffectationTaxe).filter(
-        AffectationTaxe.actif == True,
-        AffectationTaxe.date_debut <= date_limite,
-        or_(
-            AffectationTaxe.date_fin.is_(None),
-            AffectationTaxe.date_fin >= date_limite
+    if asynchrone:
+        job = soumettre_job(db, "generation_relances", {
+            "jours_retard_min": jours_retard_min,
+            "type_relance": type_enum.value,
+            "limite": limite,
+            "envoyer_automatiquement": envoyer_automatiquement,
+        })
+        return reponse_job_acceptee(job)
+    if limite is None:
+        limite = LIMITE_PAR_DEFAUT
+    if limite > LIMITE_SYNCHRONE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Au-delà de {LIMITE_SYNCHRONE} relances, utiliser asynchrone=true",
         )
-    ).limit(limite).all()
-    
-    relances_creees = []
-    
-    for affectation in affectations_en_retard:
-        # Vérifier si une collecte complète existe pour cette affectation
-        collecte_complete = db.query(InfoCollecte).filter(
-            InfoCollecte.contribuable_id == affectation.contribuable_id,
-            InfoCollecte.taxe_id == affectation.taxe_id,
-            InfoCollecte.statut == StatutCollecteEnum.COMPLETED,
-            InfoCollecte.annule == False,
-            InfoCollecte.date_collecte >= affectation.date_debut
-        ).first()
-        
-        # Si pas de collecte complète, créer une relance
-        if not collecte_complete:
-            # Vérifier si une relance récente existe déjà (moins de 7 jours)
-            relance_recente = db.query(Relance).filter(
-                Relance.affectation_taxe_id == affectation.id,
-                Relance.date_planifiee >= datetime.utcnow() - timedelta(days=7)
-            ).first()
-            
-            if not relance_recente:
-                # Calculer le montant dû
-                montant_due = affectation.montant_custom if affectation.montant_custom else affectation.taxe.montant
-                
-                # Calculer la date d'échéance (date_debut + période selon périodicité)
-                date_echeance = affectation.date_debut
-                if affectation.taxe.periodicite == "mensuelle":
-                    date_echeance = affectation.date_debut + timedelta(days=30)
-                elif affectation.taxe.periodicite == "hebdomadaire":
-                    date_echeance = affectation.date_debut + timedelta(days=7)
-                elif affectation.taxe.periodicite == "trimestrielle":
-                    date_echeance = affectation.date_debut + timedelta(days=90)
-                
-                # Créer la relance
-                nouvelle_relance = Relance(
-                    contribuable_id=affectation.contribuable_id,
-                    affectation_taxe_id=affectation.id,
-                    type_relance=type_enum,
-                    montant_due=montant_due,
-                    date_echeance=date_echeance,
-                    date_planifiee=datetime.utcnow(),
-                    message=f"Rappel : Vous avez une taxe de {montant_due} FCFA à payer. Échéance : {date_echeance.strftime('%d/%m/%Y')}",
-                    canal_envoi=affectation.contribuable.telephone if type_enum == TypeRelanceEnum.SMS else affectation.contribuable.email
-                )
-                db.add(nouvelle_relance)
-                relances_creees.append(nouvelle_relance)
     
-    db.commit()
+    # Sélection des affectations en retard (sans paiement ni relance récente) et création en masse
+    relances_ids = creer_relances_automatiques(db, type_enum, jours_retard_min, limite)
     
     # Recharger avec les relations
-    relances_ids = [r.id for r in relances_creees]
     relances_chargees = db.query(Relance).options(
         joinedload(Relance.contribuable),
         joinedload(Relance.affectation_taxe)
     ).filter(Relance.id.in_(relances_ids)).all()
     
-    # Si envoyer_automatiquement est True, envoyer les SMS
+    # Si envoyer_automatiquement est True, envoyer les SMS (en parallèle, cf. services/envoi_relances.py)
     if envoyer_automatiquement and type_enum == TypeRelanceEnum.SMS:
-        for relance in relances_chargees:
-            if relance.contribuable and relance.contribuable.telephone:
-                try:
-                    # Formater le numéro de téléphone
-                    phone = ventis_messaging_service.format_phone_number(relance.contribuable.telephone)
-                    
-                    # Construire le message
-                    message = relance.message or f"Rappel: Vous avez une taxe de {relance.montant_due} FCFA à payer."
-                    if relance.date_echeance:
-                        message += f" Échéance: {relance.date_echeance.strftime('%d/%m/%Y')}"
-                    
-                    # Envoyer le SMS
-                    result = await ventis_messaging_service.send_message(
-                        to=phone,
-                        message=message,
-                        sender=VENTIS_DEFAULT_SENDER,
-                        is_otp=False
-                    )
-                    
-                    if result.get('success'):
-                        # Mettre à jour le statut de la relance
-                        relance.statut = StatutRelanceEnum.ENVOYEE
-                        relance.date_envoi = datetime.utcnow()
-                        relance.canal_envoi = phone
-                        relance.notes = f"SMS envoyé via Ventis. UUID: {result.get('data', {}).get('uuid', 'N/A')}"
-                    else:
-                        # Erreur lors de l'envoi
-                        relance.statut = StatutRelanceEnum.ECHEC
-                        relance.notes = f"Erreur envoi SMS: {result.get('detail', 'Erreur inconnue')}"
-                    
-                    relance.updated_at = datetime.utcnow()
-                    
-                    # Mettre à jour le nombre de relances dans le dossier d'impayé si existe
-                    if relance.affectation_taxe_id:
-                        from database.models import DossierImpaye
-                        dossier = db.query(DossierImpaye).filter(
-                            DossierImpaye.affectation_taxe_id == relance.affectation_taxe_id,
-                            DossierImpaye.statut == "en_cours"
-                        ).first()
-                        if dossier:
-                            dossier.nombre_relances += 1
-                            dossier.dernier_contact = datetime.utcnow()
-                    
-                except Exception as e:
-                    # En cas d'erreur, marquer comme échec
-                    relance.statut = StatutRelanceEnum.ECHEC
-                    relance.notes = f"Exception lors de l'envoi: {str(e)}"
-                    relance.updated_at = datetime.utcnow()
-        
+        envois = preparer_envois(relances_chargees)
+        # Ne pas garder de transaction ouverte pendant les appels à Ventis
         db.commit()
+        resultats = envoyer_sms_hors_boucle(envois)
+        enregistrer_resultats(db, resultats)
+        
         # Recharger les relances après mise à jour
         relances_chargees = db.query(Relance).options(
             joinedload(Relance.contribuable),
@@ -373,6 +299,34 @@ async def generer_relances_automatiques(
     return [RelanceResponse.model_validate(relance, from_attributes=True) for relance in relances_chargees]
 
 
+@tache_job("generation_relances", reprenable=False)
+def _job_generation_relances(db: Session, parametres: dict, progression) -> dict:
+    """
+    Génération (et envoi) des relances en arrière-plan (?asynchrone=true). Non
+    reprenable : relancée après un arrêt en cours d'envoi, elle renverrait des SMS.
+    """
+    type_enum = TypeRelanceEnum(parametres.get("type_relance", "sms"))
+    progression(10, "Sélection des affectations en retard")
+    relances_ids = creer_relances_automatiques(
+        db, type_enum, int(parametres.get("jours_retard_min", 7)), parametres.get("limite")
+    )
+    resultat = {"relances_creees": len(relances_ids), "sms_envoyes": 0, "sms_en_echec": 0}
+    
+    if parametres.get("envoyer_automatiquement") and type_enum == TypeRelanceEnum.SMS and relances_ids:
+        progression(40, f"Envoi de {len(relances_ids)} SMS")
+        relances = db.query(Relance).options(
+            joinedload(Relance.contribuable)
+        ).filter(Relance.id.in_(relances_ids)).all()
+        envois = preparer_envois(relances)
+        db.commit()
+        resultats = envoyer_sms_hors_boucle(envois)
+        progression(90, "Enregistrement des résultats d'envoi")
+        enregistrer_resultats(db, resultats)
+        resultat["sms_envoyes"] = sum(1 for r in resultats if r.succes)
+        resultat["sms_en_echec"] = len(resultats) - resultat["sms_envoyes"]
+    return resultat
+
+
 @router.get("/contribuable/{contribuable_id}/historique", response_model=List[RelanceResponse])
 def get_historique_relances_contribuable(
     contribuable_id: int,
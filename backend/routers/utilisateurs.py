@@ -15,6 +15,7 @@ from routers.parametrage import RoleParametrage
 from auth.security import (
     get_current_active_user,
     get_password_hash,
+    invalidate_principal_cache,
     require_role
 )
 from auth.schemas import (
@@ -256,6 +257,7 @@ def update_utilisateur(
     
     utilisateur.updated_at = datetime.utcnow()
     db.commit()
+    invalidate_principal_cache(user_id)
     db.refresh(utilisateur)
     
     return utilisateur
@@ -290,6 +292,7 @@ def delete_utilisateur(
     
     db.delete(utilisateur)
     db.commit()
+    invalidate_principal_cache(user_id)
     
     return None
 
@@ -317,6 +320,7 @@ def activate_utilisateur(
     utilisateur.actif = True
     utilisateur.updated_at = datetime.utcnow()
     db.commit()
+    invalidate_principal_cache(user_id)
     db.refresh(utilisateur)
     
     return utilisateur
@@ -352,6 +356,7 @@ def deactivate_utilisateur(
     utilisateur.actif = False
     utilisateur.updated_at = datetime.utcnow()
     db.commit()
+    invalidate_principal_cache(user_id)
     db.refresh(utilisateur)
     
     return utilisateur
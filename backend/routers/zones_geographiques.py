@@ -149,119 +149,10 @@ def get_contribuables_for_map(
     Récupère les contribuables avec leurs coordonnées GPS pour affichage sur carte
     Inclut le statut de paiement (a_paye) basé sur les collectes complétées
     """
-    from database.models import Contribuable, AffectationTaxe, InfoCollecte, StatutCollecteEnum
-    from sqlalchemy.orm import joinedload
-    from datetime import datetime
-    
-    query = db.query(Contribuable).options(
-        joinedload(Contribuable.type_contribuable),
-        joinedload(Contribuable.quartier),
-        joinedload(Contribuable.collecteur)
-    )
-    
-    if actif is not None:
-        query = query.filter(Contribuable.actif == actif)
-    
-    # Filtrer uniquement ceux qui ont des coordonnées GPS
-    query = query.filter(
-        Contribuable.latitude.isnot(None),
-        Contribuable.longitude.isnot(None)
-    )
-    
-    contribuables = query.all()
-    
-    print(f"📊 Récupération de {len(contribuables)} contribuables depuis la base de données")
-    
-    result = []
-    for contrib in contribuables:
-        # Déterminer le statut de paiement
-        # Récupérer les taxes affectées actives avec la relation taxe chargée
-        from sqlalchemy.orm import joinedload
-        affectations = db.query(AffectationTaxe).options(
-            joinedload(AffectationTaxe.taxe)
-        ).filter(
-            AffectationTaxe.contribuable_id == contrib.id,
-            AffectationTaxe.actif == True,
-            # Vérifier que la date de début est passée et que date_fin est NULL ou future
-            AffectationTaxe.date_debut <= datetime.utcnow(),
-            (
-                (AffectationTaxe.date_fin.is_(None)) |
-                (AffectationTaxe.date_fin >= datetime.utcnow())
-            )
-        ).all()
-        
-        a_paye = True  # Par défaut, considéré comme ayant payé
-        taxes_impayees = []
-        total_collecte = 0
-        nombre_collectes = 0
-        derniere_collecte = None
-        
-        if affectations:
-            # Pour chaque taxe affectée, vérifier s'il y a une collecte complétée récente
-            for affectation in affectations:
-                # Chercher une collecte complétée pour cette taxe dans les 30 derniers jours
-                # ou depuis la date de début de l'affectation
-                date_reference = max(affectation.date_debut, datetime.utcnow().replace(day=1))
-                
-                collecte = db.query(InfoCollecte).filter(
-                    InfoCollecte.contribuable_id == contrib.id,
-                    InfoCollecte.taxe_id == affectation.taxe_id,
-                    InfoCollecte.statut == StatutCollecteEnum.COMPLETED,
-                    InfoCollecte.annule == False,
-                    InfoCollecte.date_collecte >= date_reference
-                ).order_by(InfoCollecte.date_collecte.desc()).first()
-                
-                if not collecte:
-                    a_paye = False
-                    # Récupérer le nom de la taxe
-                    taxe_nom = affectation.taxe.nom if affectation.taxe else f"Taxe #{affectation.taxe_id}"
-                    taxes_impayees.append(taxe_nom)
-        else:
-            # Si pas d'affectation, vérifier s'il y a des collectes récentes (mois en cours)
-            collectes_recentes = db.query(InfoCollecte).filter(
-                InfoCollecte.contribuable_id == contrib.id,
-                InfoCollecte.statut == StatutCollecteEnum.COMPLETED,
-                InfoCollecte.annule == False,
-                InfoCollecte.date_collecte >= datetime.utcnow().replace(day=1)
-            ).all()
-            
-            if not collectes_recentes:
-                a_paye = False
-        
-        # Calculer les statistiques de collecte
-        collectes_completes = db.query(InfoCollecte).filter(
-            InfoCollecte.contribuable_id == contrib.id,
-            InfoCollecte.statut == StatutCollecteEnum.COMPLETED,
-            InfoCollecte.annule == False
-        ).order_by(InfoCollecte.date_collecte.desc()).all()
-        
-        if collectes_completes:
-            nombre_collectes = len(collectes_completes)
-            total_collecte = sum(float(c.montant) for c in collectes_completes)
-            derniere_collecte = collectes_completes[0].date_collecte.isoformat() if collectes_completes[0].date_collecte else None
-        
-        result.append({
-            "id": contrib.id,
-            "nom": contrib.nom,
-            "prenom": contrib.prenom,
-            "nom_activite": contrib.nom_activite,
-            "telephone": contrib.telephone,
-            "adresse": contrib.adresse,
-            "latitude": float(contrib.latitude) if contrib.latitude else None,
-            "longitude": float(contrib.longitude) if contrib.longitude else None,
-            "photo_url": contrib.photo_url,
-            "type_contribuable": contrib.type_contribuable.nom if contrib.type_contribuable else None,
-            "quartier": contrib.quartier.nom if contrib.quartier else None,
-            "zone": contrib.quartier.zone.nom if contrib.quartier and contrib.quartier.zone else None,
-            "collecteur": contrib.collecteur.nom + " " + contrib.collecteur.prenom if contrib.collecteur else None,
-            "actif": contrib.actif,
-            "a_paye": a_paye,
-            "taxes_impayees": taxes_impayees,
-            "total_collecte": total_collecte,
-            "nombre_collectes": nombre_collectes,
-            "derniere_collecte": derniere_collecte
-        })
-    
+    from services.carte_contribuables import compute_contribuables_carte
+
+    result = compute_contribuables_carte(db, actif)
+    print(f"📊 Récupération de {len(result)} contribuables depuis la base de données")
     return result
 
 
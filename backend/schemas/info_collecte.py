@@ -3,12 +3,13 @@ Schémas Pydantic pour les collectes
 """
 
 from pydantic import BaseModel, Field, field_validator
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from decimal import Decimal
 from schemas.contribuable import ContribuableBase
 from schemas.taxe import TaxeBase
 from schemas.collecteur import CollecteurBase
+from schemas.geolocalisation import LocationCreate
 
 
 class InfoCollecteBase(BaseModel):
@@ -54,7 +55,34 @@ class InfoCollecteBase(BaseModel):
 
 
 class InfoCollecteCreate(InfoCollecteBase):
-    pass
+    # Référence pré-réservée (POST /api/collectes/references) pour les saisies hors ligne
+    reference: Optional[str] = Field(None, max_length=50)
+
+
+class InfoCollecteBatchItem(InfoCollecteCreate):
+    """Collecte saisie hors ligne, rejouée par lot"""
+    cle_idempotence: Optional[str] = Field(None, max_length=100, description="Clé unique générée par le terminal")
+    location: Optional[LocationCreate] = None
+
+
+class InfoCollecteBatchRequest(BaseModel):
+    collectes: List[InfoCollecteBatchItem] = Field(..., min_length=1, max_length=500)
+
+
+class InfoCollecteBatchResultat(BaseModel):
+    index: int  # Position de la collecte dans le lot
+    statut: str  # "creee", "existante", "erreur"
+    id: Optional[int] = None
+    reference: Optional[str] = None
+    cle_idempotence: Optional[str] = None
+    erreur: Optional[str] = None
+
+
+class InfoCollecteBatchResponse(BaseModel):
+    creees: int
+    existantes: int
+    erreurs: int
+    resultats: List[InfoCollecteBatchResultat]
 
 
 class InfoCollecteUpdate(BaseModel):
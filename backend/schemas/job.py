@@ -0,0 +1,27 @@
+"""
+Schémas Pydantic pour les tâches en arrière-plan
+"""
+
+from datetime import datetime
+from typing import Any, Optional
+from pydantic import BaseModel
+
+
+class JobResponse(BaseModel):
+    id: int
+    type: str
+    statut: str  # en_attente, en_cours, termine, echec
+    parametres: Optional[Any] = None
+    progression: int = 0
+    message: Optional[str] = None
+    resultat: Optional[Any] = None
+    erreur: Optional[str] = None
+    tentatives: int = 0
+    created_by: Optional[int] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,116 @@
+"""
+Compare la latence par appel d'un client HTTP créé à chaque appel (ancien
+comportement des services Ventis et BambooPay) et du client partagé
+(services/clients_http.py), contre un serveur local.
+
+Usage :
+    python scripts/benchmark_clients_http.py
+
+Options :
+    --appels N      : nombre d'appels par mode (défaut 200)
+    --latence MS    : latence simulée du serveur en millisecondes (défaut 0)
+    --url URL       : serveur à interroger à la place du serveur local (ex. un endpoint HTTPS de test)
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Permet d'exécuter le script depuis n'importe où
+CURRENT_DIR = Path(__file__).resolve().parent
+BACKEND_ROOT = CURRENT_DIR.parent
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.append(str(BACKEND_ROOT))
+
+import httpx
+
+from services.clients_http import client_partage, fermer_clients
+
+
+def demarrer_serveur_local(latence: float) -> ThreadingHTTPServer:
+    class Bouchon(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if latence:
+                time.sleep(latence)
+            corps = b"+SUCCESS|00000000-0000-0000-0000-000000000000|0"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(corps)))
+            self.end_headers()
+            self.wfile.write(corps)
+
+    serveur = ThreadingHTTPServer(("127.0.0.1", 0), Bouchon)
+    serveur.daemon_threads = True
+    threading.Thread(target=serveur.serve_forever, daemon=True).start()
+    return serveur
+
+
+async def mesurer(url: str, appels: int) -> dict:
+    payload = {"to": "24100000000", "sender": "VENTIS", "isOTP": False, "message": "benchmark"}
+
+    # Avant : un client (et une connexion) par appel
+    avant = []
+    for _ in range(appels):
+        debut = time.perf_counter()
+        async with httpx.AsyncClient() as client:
+            await client.post(url, json=payload, timeout=30.0)
+        avant.append(time.perf_counter() - debut)
+
+    # Après : client partagé, connexion réutilisée
+    partage = client_partage("benchmark")
+    apres = []
+    for _ in range(appels):
+        debut = time.perf_counter()
+        async with partage.client() as client:
+            await client.post(url, json=payload, timeout=30.0)
+        apres.append(time.perf_counter() - debut)
+    await fermer_clients()
+    return {"avant": avant, "apres": apres}
+
+
+def _resume(nom: str, durees: list) -> str:
+    durees_ms = sorted(d * 1000 for d in durees)
+    p95 = durees_ms[int(len(durees_ms) * 0.95) - 1]
+    return f"{nom:<28} moyenne {statistics.mean(durees_ms):7.2f} ms   médiane {statistics.median(durees_ms):7.2f} ms   p95 {p95:7.2f} ms"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Latence par appel : client par appel vs client partagé")
+    parser.add_argument("--appels", type=int, default=200)
+    parser.add_argument("--latence", type=float, default=0, help="Latence simulée (ms)")
+    parser.add_argument("--url", default=None)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    serveur = None
+    url = args.url
+    if not url:
+        serveur = demarrer_serveur_local(args.latence / 1000)
+        url = f"http://127.0.0.1:{serveur.server_address[1]}/messaging/api/v1/message"
+
+    resultats = asyncio.run(mesurer(url, max(1, args.appels)))
+    if serveur:
+        serveur.shutdown()
+
+    print(f"🌐 {url} — {args.appels} appels par mode")
+    print(_resume("Client créé à chaque appel", resultats["avant"]))
+    print(_resume("Client partagé", resultats["apres"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Mesure le débit de l'envoi des relances SMS contre un faux serveur Ventis local
+(jeton Keycloak + endpoint /message), sans base de données ni vrai envoi.
+
+Usage :
+    python scripts/benchmark_envoi_relances.py
+
+Options :
+    --messages N        : nombre de SMS à envoyer (défaut 200)
+    --latence MS        : latence simulée du serveur en millisecondes (défaut 100)
+    --taux-erreur X     : part des requêtes en erreur 503, entre 0 et 1 (défaut 0.05)
+    --concurrence N     : envois simultanés (défaut RELANCES_SMS_CONCURRENCE)
+    --debit X           : messages par seconde, 0 = illimité (défaut 0)
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Permet d'exécuter le script depuis n'importe où
+CURRENT_DIR = Path(__file__).resolve().parent
+BACKEND_ROOT = CURRENT_DIR.parent
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.append(str(BACKEND_ROOT))
+
+
+def demarrer_faux_ventis(latence: float, taux_erreur: float) -> ThreadingHTTPServer:
+    class FauxVentis(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, comme le vrai serveur
+
+        def log_message(self, *args):
+            pass
+
+        def _repondre(self, code: int, corps: str, type_contenu: str = "text/plain"):
+            donnees = corps.encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", type_contenu)
+            self.send_header("Content-Length", str(len(donnees)))
+            self.end_headers()
+            self.wfile.write(donnees)
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if self.path.endswith("/protocol/openid-connect/token"):
+                self._repondre(200, json.dumps({"access_token": "faux-jeton", "expires_in": 3600}), "application/json")
+                return
+            time.sleep(latence)
+            if random.random() < taux_erreur:
+                self._repondre(503, "Service indisponible")
+                return
+            self._repondre(200, f"+SUCCESS|{uuid.uuid4()}|{int(time.time())}")
+
+    serveur = ThreadingHTTPServer(("127.0.0.1", 0), FauxVentis)
+    serveur.daemon_threads = True
+    threading.Thread(target=serveur.serve_forever, daemon=True).start()
+    return serveur
+
+
+async def _envoyer(envoi_relances, envois, concurrence: int, debit: float):
+    from services.clients_http import fermer_clients
+
+    try:
+        return await envoi_relances.envoyer_sms(envois, concurrence=concurrence, debit_max=debit)
+    finally:
+        await fermer_clients()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Mesure le débit de l'envoi des relances SMS")
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--latence", type=float, default=100, help="Latence simulée (ms)")
+    parser.add_argument("--taux-erreur", dest="taux_erreur", type=float, default=0.05)
+    parser.add_argument("--concurrence", type=int, default=None)
+    parser.add_argument("--debit", type=float, default=0)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    serveur = demarrer_faux_ventis(args.latence / 1000, args.taux_erreur)
+    url = f"http://127.0.0.1:{serveur.server_address[1]}"
+
+    # Le service Ventis lit sa configuration à l'import
+    os.environ["VENTIS_MESSAGING_URL"] = f"{url}/messaging/api/v1"
+    os.environ["KEYCLOAK_MESSAGING_HOST"] = url
+    os.environ.setdefault("KEYCLOAK_MESSAGING_CLIENT_SECRET", "benchmark")
+    os.environ.setdefault("RELANCES_SMS_DELAI_BASE", "0.05")
+
+    from services import envoi_relances
+
+    envois = [
+        envoi_relances.EnvoiRelance(
+            relance_id=i, affectation_taxe_id=i, telephone=f"2410{i:07d}", message="Rappel de test"
+        )
+        for i in range(args.messages)
+    ]
+    concurrence = args.concurrence or envoi_relances.ENVOI_CONCURRENCE
+
+    debut = time.perf_counter()
+    resultats = asyncio.run(_envoyer(envoi_relances, envois, concurrence, args.debit))
+    duree = time.perf_counter() - debut
+    serveur.shutdown()
+
+    reussis = sum(1 for r in resultats if r.succes)
+    tentatives = sum(r.tentatives for r in resultats)
+    print(f"📨 {len(resultats)} SMS en {duree:.2f}s ({len(resultats) / duree:.1f} SMS/s), concurrence {concurrence}")
+    print(f"✅ {reussis} envoyés, ❌ {len(resultats) - reussis} en échec, {tentatives} requêtes au total")
+
+
+if __name__ == "__main__":
+    main()
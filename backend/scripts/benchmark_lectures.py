@@ -0,0 +1,126 @@
+"""
+Test de charge des routes de lecture les plus sollicitées par l'application
+mobile (liste des collectes et des contribuables, lecture des QR codes,
+compteur de notifications) contre une API lancée séparément.
+
+À lancer avec le même nombre de workers uvicorn avant et après un changement
+(ex. session synchrone / session asynchrone) pour comparer les requêtes par
+seconde et la latence :
+
+    uvicorn main:app --workers 2 --port 8000
+    python scripts/benchmark_lectures.py --email admin@mairie.ga --password ...
+
+Options :
+    --url URL           : adresse de l'API (défaut http://127.0.0.1:8000)
+    --email / --password: compte utilisé pour obtenir un token (ou --token)
+    --token JWT         : token déjà obtenu
+    --duree S           : durée de la mesure par route en secondes (défaut 20)
+    --concurrence N     : requêtes simultanées (défaut 50)
+    --qr CODE           : QR code de contribuable à rechercher (sinon route ignorée)
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Permet d'exécuter le script depuis n'importe où
+CURRENT_DIR = Path(__file__).resolve().parent
+BACKEND_ROOT = CURRENT_DIR.parent
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.append(str(BACKEND_ROOT))
+
+import httpx
+
+
+def routes_a_mesurer(qr: str | None) -> list[str]:
+    routes = [
+        "/api/collectes/?limit=50",
+        "/api/contribuables/?limit=50",
+        "/api/notifications/count",
+    ]
+    if qr:
+        routes.append(f"/api/contribuables/qr/{qr}")
+    return routes
+
+
+async def obtenir_token(client: httpx.AsyncClient, email: str, password: str) -> str:
+    response = await client.post("/api/auth/login", data={"username": email, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def mesurer(client: httpx.AsyncClient, route: str, duree: float, concurrence: int) -> dict:
+    latences: list[float] = []
+    erreurs = 0
+    fin = time.perf_counter() + duree
+
+    async def boucle():
+        nonlocal erreurs
+        while time.perf_counter() < fin:
+            debut = time.perf_counter()
+            try:
+                response = await client.get(route)
+                if response.status_code != 200:
+                    erreurs += 1
+            except httpx.HTTPError:
+                erreurs += 1
+            latences.append(time.perf_counter() - debut)
+
+    debut = time.perf_counter()
+    await asyncio.gather(*(boucle() for _ in range(concurrence)))
+    ecoule = time.perf_counter() - debut
+    latences.sort()
+    return {
+        "route": route,
+        "requetes": len(latences),
+        "rps": len(latences) / ecoule,
+        "p50": statistics.median(latences) * 1000 if latences else 0.0,
+        "p95": latences[int(len(latences) * 0.95) - 1] * 1000 if latences else 0.0,
+        "erreurs": erreurs,
+    }
+
+
+async def executer(args: argparse.Namespace) -> None:
+    limites = httpx.Limits(max_connections=args.concurrence, max_keepalive_connections=args.concurrence)
+    async with httpx.AsyncClient(base_url=args.url, limits=limites, timeout=60.0) as client:
+        token = args.token or await obtenir_token(client, args.email, args.password)
+        client.headers["Authorization"] = f"Bearer {token}"
+        # Échauffement (pools de connexions, caches)
+        for route in routes_a_mesurer(args.qr):
+            await client.get(route)
+
+        print(f"{'Route':<40} {'Requêtes':>9} {'Req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'Erreurs':>8}")
+        for route in routes_a_mesurer(args.qr):
+            r = await mesurer(client, route, args.duree, args.concurrence)
+            print(
+                f"{r['route']:<40} {r['requetes']:>9} {r['rps']:>8.1f} "
+                f"{r['p50']:>8.1f} {r['p95']:>8.1f} {r['erreurs']:>8}"
+            )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Test de charge des routes de lecture")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--email")
+    parser.add_argument("--password")
+    parser.add_argument("--token")
+    parser.add_argument("--duree", type=float, default=20)
+    parser.add_argument("--concurrence", type=int, default=50)
+    parser.add_argument("--qr")
+    args = parser.parse_args()
+    if not args.token and not (args.email and args.password):
+        parser.error("--token ou --email et --password sont requis")
+    return args
+
+
+def main():
+    asyncio.run(executer(parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Exécute les tâches en arrière-plan (table job) dans des processus dédiés, à la
+place ou en plus des workers intégrés à l'API (variable JOBS_WORKERS).
+
+Usage :
+    python scripts/job_worker.py
+
+Options :
+    --processus N   : nombre de processus workers (défaut 2)
+    --threads N     : threads par processus (défaut 1)
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import multiprocessing
+import signal
+import sys
+from pathlib import Path
+
+# Permet d'exécuter le script depuis n'importe où
+CURRENT_DIR = Path(__file__).resolve().parent
+BACKEND_ROOT = CURRENT_DIR.parent
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.append(str(BACKEND_ROOT))
+
+
+def executer_worker(threads: int) -> None:
+    # Les routers déclarent les tâches (@tache_job) à l'import
+    from routers import impayes, journal, rapports, relances  # noqa: F401
+    from services.jobs import demarrer_workers
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(processName)s %(levelname)s %(message)s")
+    arret = demarrer_workers(threads)
+    signal.signal(signal.SIGTERM, lambda *_: arret.set())
+    try:
+        while not arret.wait(1):
+            pass
+    except KeyboardInterrupt:
+        arret.set()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Workers des tâches en arrière-plan")
+    parser.add_argument("--processus", type=int, default=2, help="Nombre de processus workers")
+    parser.add_argument("--threads", type=int, default=1, help="Threads par processus")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    processus = [
+        multiprocessing.Process(target=executer_worker, args=(args.threads,), name=f"job-worker-{index}")
+        for index in range(max(1, args.processus))
+    ]
+    for p in processus:
+        p.start()
+    print(f"✅ {len(processus)} processus workers démarrés ({args.threads} thread(s) chacun)")
+    try:
+        for p in processus:
+            p.join()
+    except KeyboardInterrupt:
+        for p in processus:
+            p.terminate()
+            p.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Reconstruit le cumul journalier des collectes (table collecte_daily_rollup).
+
+Usage :
+    python scripts/rebuild_collecte_rollup.py
+
+Options :
+    --depuis YYYY-MM-DD     : ne reconstruit qu'à partir de cette date
+    --jusqu-a YYYY-MM-DD    : ne reconstruit que jusqu'à cette date (incluse)
+    --verifier              : compare seulement le cumul aux collectes, sans le
+                              reconstruire (code de sortie 1 en cas d'écart)
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from datetime import date
+from pathlib import Path
+
+# Permet d'exécuter le script depuis n'importe où
+CURRENT_DIR = Path(__file__).resolve().parent
+BACKEND_ROOT = CURRENT_DIR.parent
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.append(str(BACKEND_ROOT))
+
+from database.database import SessionLocal
+from services.rollup_collectes import comparer_rollup, rebuild_rollup
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Reconstruit le cumul journalier des collectes")
+    parser.add_argument("--depuis", type=date.fromisoformat, default=None, help="Date de début (incluse)")
+    parser.add_argument("--jusqu-a", dest="jusqu_a", type=date.fromisoformat, default=None, help="Date de fin (incluse)")
+    parser.add_argument("--verifier", action="store_true", help="Compare le cumul aux collectes sans le reconstruire")
+    return parser.parse_args()
+
+
+def verifier(session, args: argparse.Namespace) -> None:
+    ecarts = comparer_rollup(session, depuis=args.depuis, jusqu_a=args.jusqu_a)
+    for ecart in ecarts:
+        print(
+            f"❌ {ecart.jour} collecteur {ecart.collecteur_id} taxe {ecart.taxe_id} {ecart.type_paiement} : "
+            f"cumul {ecart.montant_total}/{ecart.nombre_transactions}, "
+            f"collectes {ecart.montant_total_brut}/{ecart.nombre_transactions_brut}"
+        )
+    if ecarts:
+        sys.exit(1)
+    print("✅ Cumul journalier identique aux collectes")
+
+
+def main():
+    args = parse_args()
+    session = SessionLocal()
+    try:
+        if args.verifier:
+            verifier(session, args)
+            return
+        lignes = rebuild_rollup(session, depuis=args.depuis, jusqu_a=args.jusqu_a)
+        print(f"✅ Cumul journalier reconstruit : {lignes} lignes")
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
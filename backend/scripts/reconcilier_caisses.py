@@ -0,0 +1,63 @@
+"""
+Vérifie les cumuls des caisses (total des entrées, des sorties, nombre
+d'opérations) par rapport au registre des opérations de caisse.
+
+Usage :
+    python scripts/reconcilier_caisses.py
+
+Options :
+    --caisse ID     : ne vérifie que cette caisse
+    --corriger      : remplace les cumuls en écart par ceux du registre
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+# Permet d'exécuter le script depuis n'importe où
+CURRENT_DIR = Path(__file__).resolve().parent
+BACKEND_ROOT = CURRENT_DIR.parent
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.append(str(BACKEND_ROOT))
+
+from database.database import SessionLocal
+from services.soldes_caisse import reconcilier_cumuls
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Vérifie les cumuls des caisses par rapport aux opérations")
+    parser.add_argument("--caisse", type=int, default=None, help="Identifiant de la caisse")
+    parser.add_argument("--corriger", action="store_true", help="Corrige les cumuls en écart")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    session = SessionLocal()
+    try:
+        ecarts = reconcilier_cumuls(session, caisse_id=args.caisse, corriger=args.corriger)
+        for e in ecarts:
+            print(
+                f"❌ Caisse {e.code} (#{e.caisse_id}) : "
+                f"entrées {e.total_entrees} / registre {e.total_entrees_registre}, "
+                f"sorties {e.total_sorties} / registre {e.total_sorties_registre}, "
+                f"opérations {e.nombre_operations} / registre {e.nombre_operations_registre}"
+            )
+        if not ecarts:
+            print("✅ Cumuls des caisses conformes au registre des opérations")
+        elif args.corriger:
+            print(f"✅ {len(ecarts)} caisse(s) corrigée(s)")
+        else:
+            print(f"⚠️ {len(ecarts)} caisse(s) en écart (relancer avec --corriger pour les rétablir)")
+            sys.exit(1)
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Test de charge des opérations de caisse concurrentes : envoie des centaines
+d'entrées et de sorties simultanées sur une même caisse (comme le mobile et le
+back-office en même temps), puis vérifie que le registre des opérations et le
+solde de la caisse concordent.
+
+Le script crée une caisse de test (code STRESS-...) pour le premier collecteur
+actif et la supprime à la fin, sauf avec --conserver.
+
+Usage :
+    python scripts/stress_operations_caisse.py
+
+Options :
+    --operations N      : nombre d'opérations envoyées (défaut 500)
+    --concurrence N     : opérations simultanées (défaut 20)
+    --solde-initial X   : solde à l'ouverture de la caisse de test (défaut 10000)
+    --conserver         : garde la caisse de test et ses opérations
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from pathlib import Path
+
+# Permet d'exécuter le script depuis n'importe où
+CURRENT_DIR = Path(__file__).resolve().parent
+BACKEND_ROOT = CURRENT_DIR.parent
+if str(BACKEND_ROOT) not in sys.path:
+    sys.path.append(str(BACKEND_ROOT))
+
+from fastapi import HTTPException
+
+from database.database import SessionLocal
+from database.models import Caisse, Collecteur, OperationCaisse, TypeCaisseEnum
+from routers.caisses import create_operation_caisse, ouvrir_caisse
+from schemas.caisse import OperationCaisseCreate
+from services.soldes_caisse import reconcilier_cumuls
+
+
+def creer_caisse_test(solde_initial: Decimal) -> int:
+    db = SessionLocal()
+    try:
+        collecteur = db.query(Collecteur).filter(Collecteur.actif == True).first()  # noqa: E712
+        if collecteur is None:
+            raise SystemExit("❌ Aucun collecteur actif pour rattacher la caisse de test")
+        caisse = Caisse(
+            collecteur_id=collecteur.id,
+            type_caisse=TypeCaisseEnum.PHYSIQUE.value,
+            code=f"STRESS-{uuid.uuid4().hex[:8]}",
+            nom="Caisse de test de charge",
+        )
+        db.add(caisse)
+        db.commit()
+        ouvrir_caisse(caisse.id, solde_initial=solde_initial, db=db)
+        return caisse.id
+    finally:
+        db.close()
+
+
+def envoyer_operation(caisse_id: int, type_operation: str, montant: Decimal) -> bool:
+    """Une opération dans sa propre session ; False si elle a été refusée (solde insuffisant)"""
+    db = SessionLocal()
+    try:
+        create_operation_caisse(
+            caisse_id,
+            OperationCaisseCreate(
+                caisse_id=caisse_id,
+                type_operation=type_operation,
+                montant=montant,
+                libelle=f"Test de charge - {type_operation}",
+            ),
+            db=db,
+        )
+        return True
+    except HTTPException:
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+
+def verifier(caisse_id: int) -> list[str]:
+    """Contrôles de cohérence entre la caisse et son registre"""
+    erreurs = []
+    db = SessionLocal()
+    try:
+        caisse = db.query(Caisse).filter(Caisse.id == caisse_id).one()
+        operations = (
+            db.query(OperationCaisse)
+            .filter(OperationCaisse.caisse_id == caisse_id)
+            .order_by(OperationCaisse.id)
+            .all()
+        )
+        # Chaque opération part du solde laissé par la précédente
+        precedente = None
+        for op in operations:
+            if precedente is not None and op.solde_avant != precedente.solde_apres:
+                erreurs.append(
+                    f"opération {op.id} : solde avant {op.solde_avant}, "
+                    f"solde après l'opération {precedente.id} {precedente.solde_apres}"
+                )
+            precedente = op
+        if precedente is not None and precedente.solde_apres != caisse.solde_actuel:
+            erreurs.append(f"solde de la caisse {caisse.solde_actuel}, dernier solde du registre {precedente.solde_apres}")
+        # Le solde est aussi la somme des mouvements depuis l'ouverture
+        attendu = caisse.solde_initial + sum(
+            op.montant if op.type_operation == "entree" else -op.montant
+            for op in operations if op.type_operation in ("entree", "sortie")
+        )
+        if attendu != caisse.solde_actuel:
+            erreurs.append(f"solde de la caisse {caisse.solde_actuel}, somme des mouvements {attendu}")
+        if caisse.solde_actuel < 0:
+            erreurs.append(f"solde négatif : {caisse.solde_actuel}")
+        for ecart in reconcilier_cumuls(db, caisse_id=caisse_id):
+            erreurs.append(
+                f"cumuls en écart : entrées {ecart.total_entrees}/{ecart.total_entrees_registre}, "
+                f"sorties {ecart.total_sorties}/{ecart.total_sorties_registre}, "
+                f"opérations {ecart.nombre_operations}/{ecart.nombre_operations_registre}"
+            )
+    finally:
+        db.close()
+    return erreurs
+
+
+def supprimer_caisse_test(caisse_id: int) -> None:
+    db = SessionLocal()
+    try:
+        db.query(OperationCaisse).filter(OperationCaisse.caisse_id == caisse_id).delete(synchronize_session=False)
+        db.query(Caisse).filter(Caisse.id == caisse_id).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Test de charge des opérations de caisse concurrentes")
+    parser.add_argument("--operations", type=int, default=500)
+    parser.add_argument("--concurrence", type=int, default=20)
+    parser.add_argument("--solde-initial", dest="solde_initial", type=Decimal, default=Decimal("10000"))
+    parser.add_argument("--conserver", action="store_true")
+    return parser.parse_args()
+
+
+def lancer(nombre: int, concurrence: int, solde_initial: Decimal, conserver: bool = False) -> list[str]:
+    """
+    Crée la caisse de test, envoie les opérations en parallèle et retourne les
+    incohérences constatées (liste vide si le registre et le solde concordent).
+    Utilisé aussi par tests/test_stress_operations_caisse.py.
+    """
+    caisse_id = creer_caisse_test(solde_initial)
+    # Sorties fréquentes pour tester aussi le refus des soldes insuffisants sous concurrence
+    operations = [
+        (random.choice(("entree", "sortie")), Decimal(random.randint(1, 500) * 100))
+        for _ in range(nombre)
+    ]
+    try:
+        debut = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrence) as executor:
+            acceptees = list(executor.map(lambda op: envoyer_operation(caisse_id, *op), operations))
+        duree = time.perf_counter() - debut
+        print(
+            f"⏱️ {len(operations)} opérations en {duree:.2f}s ({len(operations) / duree:.1f} op/s), "
+            f"{sum(acceptees)} acceptées, {len(acceptees) - sum(acceptees)} refusées (solde insuffisant)"
+        )
+        return verifier(caisse_id)
+    finally:
+        if not conserver:
+            supprimer_caisse_test(caisse_id)
+
+
+def main():
+    args = parse_args()
+    erreurs = lancer(args.operations, args.concurrence, args.solde_initial, args.conserver)
+    for erreur in erreurs:
+        print(f"❌ {erreur}")
+    if erreurs:
+        sys.exit(1)
+    print("✅ Registre des opérations et solde de la caisse concordants")
+
+
+if __name__ == "__main__":
+    main()
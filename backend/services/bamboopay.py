@@ -8,6 +8,7 @@ import httpx
 import logging
 from typing import Optional, Dict, Any
 from datetime import datetime
+from services.clients_http import client_partage
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +26,9 @@ class BambooPayService:
         self.merchant_username = os.getenv("BAMBOOPAY_MERCHANT_USERNAME", self.merchant_id)
         self.debug_mode = os.getenv("BAMBOOPAY_DEBUG", "false").lower() == "true"
         
+        # Client HTTP partagé (connexions réutilisées entre les appels)
+        self._http = client_partage("bamboopay")
+        
         # Version correcte (celle du repo)
         if (not os.getenv("BAMBOOPAY_MERCHANT_ID") or not os.getenv("BAMBOOPAY_MERCHANT_SECRET")):
             logger.warning("⚠️ Identifiants BambooPay non fournis dans l'environnement, utilisation des valeurs ITAXE par défaut.")
@@ -79,11 +83,12 @@ class BambooPayService:
             logger.debug(f"Payload: {payload}")
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with self._http.client() as client:
                 response = await client.post(
                     url,
                     json=payload,
-                    headers=self._get_headers()
+                    headers=self._get_headers(),
+                    timeout=30.0
                 )
                 
                 if response.status_code == 200:
@@ -155,11 +160,12 @@ class BambooPayService:
             logger.debug(f"Payload: {payload}")
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with self._http.client() as client:
                 response = await client.post(
                     url,
                     json=payload,
-                    headers=self._get_headers()
+                    headers=self._get_headers(),
+                    timeout=30.0
                 )
                 
                 if response.status_code == 202:
@@ -212,10 +218,11 @@ class BambooPayService:
             logger.info(f"🌐 Appel BambooPay /check-status: {url}")
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            async with self._http.client() as client:
                 response = await client.post(
                     url,
-                    headers=self._get_headers()
+                    headers=self._get_headers(),
+                    timeout=30.0
                 )
                 
                 if response.status_code == 200:
@@ -0,0 +1,173 @@
+"""
+Calcul ensembliste des données contribuables pour la carte
+(statut de paiement, taxes impayées et statistiques de collecte)
+"""
+
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, joinedload
+
+from database.models import (
+    AffectationTaxe,
+    Contribuable,
+    InfoCollecte,
+    Quartier,
+    StatutCollecteEnum,
+    Taxe,
+)
+
+
+def _collectes_par_contribuable_taxe(db: Session, contribuable_ids) -> Dict[Tuple[int, int], tuple]:
+    """
+    Agrège en une seule requête les collectes complétées non annulées
+    par (contribuable, taxe) : nombre, montant total et date de la dernière collecte.
+    """
+    rows = db.query(
+        InfoCollecte.contribuable_id,
+        InfoCollecte.taxe_id,
+        func.count(InfoCollecte.id).label("nombre"),
+        func.coalesce(func.sum(InfoCollecte.montant), 0).label("total"),
+        func.max(InfoCollecte.date_collecte).label("derniere"),
+    ).filter(
+        InfoCollecte.contribuable_id.in_(contribuable_ids),
+        InfoCollecte.statut == StatutCollecteEnum.COMPLETED,
+        InfoCollecte.annule == False
+    ).group_by(
+        InfoCollecte.contribuable_id,
+        InfoCollecte.taxe_id
+    ).all()
+
+    return {(row.contribuable_id, row.taxe_id): (row.nombre, row.total, row.derniere) for row in rows}
+
+
+def _affectations_actives(db: Session, contribuable_ids, maintenant: datetime) -> Dict[int, list]:
+    """Charge en une requête les affectations en cours avec le nom de la taxe"""
+    rows = db.query(
+        AffectationTaxe.contribuable_id,
+        AffectationTaxe.taxe_id,
+        AffectationTaxe.date_debut,
+        Taxe.nom.label("taxe_nom"),
+    ).outerjoin(
+        Taxe, Taxe.id == AffectationTaxe.taxe_id
+    ).filter(
+        AffectationTaxe.contribuable_id.in_(contribuable_ids),
+        AffectationTaxe.actif == True,
+        AffectationTaxe.date_debut <= maintenant,
+        (
+            (AffectationTaxe.date_fin.is_(None)) |
+            (AffectationTaxe.date_fin >= maintenant)
+        )
+    ).order_by(AffectationTaxe.id).all()
+
+    affectations: Dict[int, list] = defaultdict(list)
+    for row in rows:
+        affectations[row.contribuable_id].append(row)
+    return affectations
+
+
+def statut_paiement(affectations_contrib: list, stats_taxes: Dict[int, tuple], debut_mois: datetime) -> Tuple[bool, List[str]]:
+    """
+    Statut de paiement d'un contribuable à partir de ses affectations en cours et
+    de ses collectes agrégées par taxe ({taxe_id: (nombre, total, derniere)}).
+    """
+    a_paye = True  # Par défaut, considéré comme ayant payé
+    taxes_impayees = []
+
+    if affectations_contrib:
+        for affectation in affectations_contrib:
+            date_reference = max(affectation.date_debut, debut_mois)
+            stats = stats_taxes.get(affectation.taxe_id)
+            if not stats or stats[2] is None or stats[2] < date_reference:
+                a_paye = False
+                taxes_impayees.append(affectation.taxe_nom or f"Taxe #{affectation.taxe_id}")
+    else:
+        # Sans affectation, vérifier s'il y a des collectes ce mois-ci
+        if not any(stats[2] is not None and stats[2] >= debut_mois for stats in stats_taxes.values()):
+            a_paye = False
+
+    return a_paye, taxes_impayees
+
+
+def totaux_collectes(stats_taxes: Dict[int, tuple]) -> Tuple[float, int, Optional[str]]:
+    """Total collecté, nombre de collectes et date de la dernière collecte (ISO)"""
+    if not stats_taxes:
+        return 0, 0, None
+    nombre_collectes = sum(stats[0] for stats in stats_taxes.values())
+    total_collecte = float(sum(stats[1] for stats in stats_taxes.values()))
+    dates = [stats[2] for stats in stats_taxes.values() if stats[2] is not None]
+    derniere_collecte = max(dates).isoformat() if dates else None
+    return total_collecte, nombre_collectes, derniere_collecte
+
+
+def compute_contribuables_carte(db: Session, actif: Optional[bool] = True) -> List[dict]:
+    """
+    Construit la liste des contribuables géolocalisés pour la carte.
+
+    Le statut de paiement est évalué comme dans l'ancienne boucle par contribuable :
+    une taxe affectée est considérée payée si une collecte complétée existe depuis
+    max(date_debut de l'affectation, début du mois courant) ; sans affectation, le
+    contribuable a payé s'il a une collecte complétée ce mois-ci. Les agrégats sont
+    calculés en trois requêtes au total, quel que soit le nombre de contribuables.
+    """
+    maintenant = datetime.utcnow()
+    debut_mois = maintenant.replace(day=1)
+
+    # Filtrer uniquement ceux qui ont des coordonnées GPS
+    filtres = [
+        Contribuable.latitude.isnot(None),
+        Contribuable.longitude.isnot(None)
+    ]
+    if actif is not None:
+        filtres.append(Contribuable.actif == actif)
+
+    contribuables = db.query(Contribuable).options(
+        joinedload(Contribuable.type_contribuable),
+        joinedload(Contribuable.quartier).joinedload(Quartier.zone),
+        joinedload(Contribuable.collecteur)
+    ).filter(*filtres).all()
+    if not contribuables:
+        return []
+
+    # Sous-requête plutôt qu'une liste d'IDs pour ne pas transmettre des dizaines de milliers de paramètres
+    ids = select(Contribuable.id).where(*filtres)
+
+    collectes = _collectes_par_contribuable_taxe(db, ids)
+    affectations = _affectations_actives(db, ids, maintenant)
+
+    # Regrouper les agrégats par contribuable
+    par_contribuable: Dict[int, Dict[int, tuple]] = defaultdict(dict)
+    for (contribuable_id, taxe_id), stats in collectes.items():
+        par_contribuable[contribuable_id][taxe_id] = stats
+
+    result = []
+    for contrib in contribuables:
+        stats_taxes = par_contribuable.get(contrib.id, {})
+        a_paye, taxes_impayees = statut_paiement(affectations.get(contrib.id, []), stats_taxes, debut_mois)
+        total_collecte, nombre_collectes, derniere_collecte = totaux_collectes(stats_taxes)
+
+        result.append({
+            "id": contrib.id,
+            "nom": contrib.nom,
+            "prenom": contrib.prenom,
+            "nom_activite": contrib.nom_activite,
+            "telephone": contrib.telephone,
+            "adresse": contrib.adresse,
+            "latitude": float(contrib.latitude) if contrib.latitude else None,
+            "longitude": float(contrib.longitude) if contrib.longitude else None,
+            "photo_url": contrib.photo_url,
+            "type_contribuable": contrib.type_contribuable.nom if contrib.type_contribuable else None,
+            "quartier": contrib.quartier.nom if contrib.quartier else None,
+            "zone": contrib.quartier.zone.nom if contrib.quartier and contrib.quartier.zone else None,
+            "collecteur": contrib.collecteur.nom + " " + contrib.collecteur.prenom if contrib.collecteur else None,
+            "actif": contrib.actif,
+            "a_paye": a_paye,
+            "taxes_impayees": taxes_impayees,
+            "total_collecte": total_collecte,
+            "nombre_collectes": nombre_collectes,
+            "derniere_collecte": derniere_collecte
+        })
+
+    return result
@@ -0,0 +1,148 @@
+"""
+Maintenance de la table cartographie_contribuable_stats
+(agrégats de collecte précalculés lus par cartographie_contribuable_view)
+"""
+
+import asyncio
+import logging
+import os
+from typing import Iterable
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# Intervalle de reconstruction complète (secondes), 0 pour désactiver
+REBUILD_INTERVAL_SECONDS = int(os.getenv("CARTOGRAPHIE_REBUILD_INTERVAL", "3600"))
+
+# Clé de verrou consultatif pour éviter deux reconstructions simultanées (plusieurs workers)
+_REBUILD_LOCK_KEY = 720_001
+# Espace des verrous consultatifs par contribuable (pg_advisory_xact_lock(espace, id))
+_CONTRIBUABLE_LOCK_SPACE = 720_002
+# Contribuables recalculés par transaction lors de la reconstruction complète
+TAILLE_LOT_REBUILD = 500
+
+# Sous-requête triée : les verrous sont toujours pris dans l'ordre des identifiants
+_VERROUS_SQL = """
+    SELECT pg_advisory_xact_lock(:espace, s.id)
+    FROM (SELECT DISTINCT unnest(CAST(:ids AS integer[])) AS id ORDER BY 1) s
+"""
+
+_AGGREGATS_SQL = """
+    SELECT
+        ic.contribuable_id,
+        COUNT(*) AS nombre_collectes,
+        COALESCE(SUM(ic.montant), 0)::numeric(12,2) AS total_collecte,
+        MAX(ic.date_collecte) AS derniere_collecte
+    FROM info_collecte ic
+    WHERE ic.statut = 'completed'
+      AND ic.annule = FALSE
+      {filtre}
+    GROUP BY ic.contribuable_id
+"""
+
+_UPSERT_SQL = """
+    INSERT INTO cartographie_contribuable_stats
+        (contribuable_id, nombre_collectes, total_collecte, derniere_collecte, updated_at)
+    SELECT
+        c.id,
+        COALESCE(a.nombre_collectes, 0),
+        COALESCE(a.total_collecte, 0),
+        a.derniere_collecte,
+        now()
+    FROM contribuable c
+    LEFT JOIN ({aggregats}) a ON a.contribuable_id = c.id
+    {filtre}
+    ON CONFLICT (contribuable_id) DO UPDATE SET
+        nombre_collectes = EXCLUDED.nombre_collectes,
+        total_collecte = EXCLUDED.total_collecte,
+        derniere_collecte = EXCLUDED.derniere_collecte,
+        updated_at = EXCLUDED.updated_at
+"""
+
+
+def _verrouiller_contribuables(db: Session, ids: list) -> None:
+    """
+    Verrou par contribuable jusqu'à la fin de la transaction. Une transaction
+    concurrente sur le même contribuable attend ici le commit de la première,
+    puis recalcule avec un instantané qui voit ses collectes : aucun recalcul
+    ne peut écraser un agrégat plus récent.
+    """
+    db.execute(text(_VERROUS_SQL), {"espace": _CONTRIBUABLE_LOCK_SPACE, "ids": ids}).all()
+
+
+def refresh_contribuable_stats(db: Session, contribuable_ids: Iterable[int]) -> None:
+    """
+    Recalcule les agrégats des contribuables donnés dans la transaction courante.
+    À appeler avant le commit de toute écriture qui change le statut d'une collecte.
+    """
+    ids = sorted({cid for cid in contribuable_ids if cid is not None})
+    if not ids:
+        return
+
+    db.flush()
+    _verrouiller_contribuables(db, ids)
+    sql = _UPSERT_SQL.format(
+        aggregats=_AGGREGATS_SQL.format(filtre="AND ic.contribuable_id = ANY(:ids)"),
+        filtre="WHERE c.id = ANY(:ids)",
+    )
+    db.execute(text(sql), {"ids": ids})
+
+
+def rebuild_cartographie_stats(db: Session) -> bool:
+    """
+    Reconstruit entièrement la table à partir de info_collecte, par lots de
+    contribuables validés un à un. Chaque lot prend les mêmes verrous que
+    refresh_contribuable_stats, une collecte écrite pendant la reconstruction
+    n'est donc jamais écrasée par des agrégats plus anciens.
+    Retourne False si une autre reconstruction est déjà en cours.
+    """
+    sql = _UPSERT_SQL.format(
+        aggregats=_AGGREGATS_SQL.format(filtre="AND ic.contribuable_id = ANY(:ids)"),
+        filtre="WHERE c.id = ANY(:ids)",
+    )
+    dernier_id = 0
+    while True:
+        acquired = db.execute(
+            text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": _REBUILD_LOCK_KEY}
+        ).scalar()
+        if not acquired:
+            db.rollback()
+            return False
+
+        ids = db.execute(
+            text("SELECT id FROM contribuable WHERE id > :apres ORDER BY id LIMIT :taille"),
+            {"apres": dernier_id, "taille": TAILLE_LOT_REBUILD},
+        ).scalars().all()
+        if not ids:
+            db.commit()
+            return True
+
+        _verrouiller_contribuables(db, ids)
+        db.execute(text(sql), {"ids": ids})
+        db.commit()
+        dernier_id = ids[-1]
+
+
+def _rebuild_once() -> None:
+    from database.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        if rebuild_cartographie_stats(db):
+            logger.info("Statistiques de cartographie reconstruites")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Erreur lors de la reconstruction des statistiques de cartographie: {e}")
+    finally:
+        db.close()
+
+
+async def periodic_rebuild() -> None:
+    """Boucle de reconstruction complète périodique, lancée au démarrage de l'application"""
+    if REBUILD_INTERVAL_SECONDS <= 0:
+        return
+    while True:
+        await asyncio.to_thread(_rebuild_once)
+        await asyncio.sleep(REBUILD_INTERVAL_SECONDS)
@@ -0,0 +1,101 @@
+"""
+Clients HTTP partagés pour les API externes (Ventis, Keycloak, BambooPay)
+
+Chaque service garde un httpx.AsyncClient de longue durée au lieu d'en créer un
+par appel : les connexions (et leur poignée de main TLS) sont réutilisées grâce
+au keep-alive, le nombre de connexions simultanées est borné et HTTP/2 est
+utilisé si le paquet h2 est installé.
+
+Un client httpx est lié à la boucle asyncio qui l'utilise : il y en a donc un par
+boucle (celle de l'API, et celles des tâches en arrière-plan qui lancent
+asyncio.run). Les clients de la boucle de l'API sont ouverts au démarrage et
+fermés à l'arrêt de l'application (demarrer_clients / fermer_clients).
+"""
+
+import asyncio
+import logging
+import os
+import weakref
+from contextlib import asynccontextmanager
+from typing import List
+
+import httpx
+
+try:
+    import h2  # noqa: F401
+    HTTP2_DISPONIBLE = True
+except ImportError:  # dépendance optionnelle (pip install httpx[http2])
+    HTTP2_DISPONIBLE = False
+
+logger = logging.getLogger(__name__)
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_CLIENT_MAX_CONNECTIONS", "50"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_CLIENT_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_CLIENT_KEEPALIVE_EXPIRY", "30"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CLIENT_CONNECT_TIMEOUT", "5"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_CLIENT_TIMEOUT", "30"))
+
+
+class ClientHTTPPartage:
+    """httpx.AsyncClient réutilisé par un service, un par boucle asyncio"""
+
+    def __init__(self, nom: str, **options):
+        self.nom = nom
+        self._options = options
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def get(self) -> httpx.AsyncClient:
+        boucle = asyncio.get_running_loop()
+        client = self._clients.get(boucle)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                http2=HTTP2_DISPONIBLE,
+                limits=httpx.Limits(
+                    max_connections=HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                    keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+                ),
+                timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+                **self._options,
+            )
+            self._clients[boucle] = client
+        return client
+
+    @asynccontextmanager
+    async def client(self):
+        """`async with ... as client` sur le client partagé, qui n'est pas fermé en sortie"""
+        yield self.get()
+
+    async def fermer(self) -> None:
+        """Ferme le client de la boucle courante"""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None and not client.is_closed:
+            await client.aclose()
+
+
+_clients: List[ClientHTTPPartage] = []
+
+
+def client_partage(nom: str, **options) -> ClientHTTPPartage:
+    """Déclare un client partagé (options transmises à httpx.AsyncClient, ex. verify)"""
+    partage = ClientHTTPPartage(nom, **options)
+    _clients.append(partage)
+    return partage
+
+
+async def demarrer_clients() -> None:
+    """Ouvre les clients de la boucle courante (démarrage de l'application)"""
+    for partage in _clients:
+        partage.get()
+    logger.info(f"Clients HTTP ouverts: {', '.join(p.nom for p in _clients)} (HTTP/2: {HTTP2_DISPONIBLE})")
+
+
+async def fermer_clients() -> None:
+    """Ferme les clients de la boucle courante (arrêt de l'application, fin d'une tâche)"""
+    for partage in _clients:
+        try:
+            await partage.fermer()
+        except Exception as e:
+            logger.warning(f"Fermeture du client HTTP {partage.nom} impossible: {e}")
@@ -0,0 +1,30 @@
+"""
+Mise à jour des agrégats dérivés lorsqu'une collecte change d'état
+"""
+
+from typing import Iterable
+
+from sqlalchemy.orm import Session
+
+from database.models import InfoCollecte
+from services.cartographie_stats import refresh_contribuable_stats
+from services.report_cache import invalider_apres_commit
+from services.rollup_collectes import refresh_rollup_keys, rollup_key
+
+
+def collectes_modifiees(db: Session, collectes: Iterable[InfoCollecte]) -> None:
+    """
+    À appeler avant le commit de toute création, validation, annulation ou suppression
+    de collectes : met à jour les statistiques de cartographie et le cumul journalier
+    dans la même transaction, et invalide le cache des rapports après le commit.
+    """
+    collectes = list(collectes)
+    if not collectes:
+        return
+    # Les clés sont lues avant le flush (une collecte supprimée n'est plus rechargeable ensuite)
+    keys = [rollup_key(collecte) for collecte in collectes]
+    contribuable_ids = [collecte.contribuable_id for collecte in collectes]
+
+    refresh_contribuable_stats(db, contribuable_ids)
+    refresh_rollup_keys(db, keys)
+    invalider_apres_commit(db)
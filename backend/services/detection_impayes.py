@@ -0,0 +1,266 @@
+"""
+Détection des impayés en masse (POST /api/impayes/detecter-impayes)
+
+Le calcul (échéance, montant payé, restant, pénalités, priorité) est fait par
+PostgreSQL pour toutes les affectations à la fois : une table temporaire reçoit
+le résultat d'une seule requête groupée, puis les dossiers ouverts sont mis à
+jour et les nouveaux créés en deux instructions. Les règles sont celles de la
+détection unitaire d'origine :
+
+- échéance = date de début + 30 / 7 / 90 jours (mensuelle / hebdomadaire /
+  trimestrielle), date de début sinon ;
+- montant payé = collectes complétées non annulées depuis la date de début ;
+- pénalités = restant × taux / 100 × jours de retard ;
+- priorité : urgente (> 90 j), elevee (> 60 j), normale (> 30 j), faible.
+
+En mode incrémental, seules les affectations touchées depuis la dernière
+exécution (affectation ou taxe modifiée, collecte enregistrée ou modifiée,
+échéance franchie entre-temps) sont recalculées ; pour les autres dossiers
+ouverts, seuls les jours de retard, pénalités et priorité sont actualisés, à
+partir du montant restant déjà connu.
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from database.models import DetectionImpayesExecution
+
+# Clé de verrou consultatif : une seule détection à la fois (plusieurs workers)
+_DETECTION_LOCK_KEY = 720_011
+
+# Décalage maximal entre date de début et échéance (trimestrielle)
+_DELAI_ECHEANCE_MAX_JOURS = 90
+
+# Marge appliquée au point de reprise, pour les écritures dont la transaction
+# a commencé avant l'exécution précédente mais a été validée après
+MARGE_REPRISE = timedelta(minutes=5)
+
+_STATUTS_OUVERTS = "('en_cours', 'partiellement_paye')"
+
+_PRIORITE_SQL = """CASE
+            WHEN {jours} > 90 THEN 'urgente'
+            WHEN {jours} > 60 THEN 'elevee'
+            WHEN {jours} > 30 THEN 'normale'
+            ELSE 'faible'
+        END"""
+
+_FILTRE_INCREMENTAL_SQL = """
+          AND (
+              a.updated_at >= :depuis
+              OR t.updated_at >= :depuis
+              OR a.date_debut > :depuis_echeance
+              OR (a.contribuable_id, a.taxe_id) IN (
+                  SELECT ic.contribuable_id, ic.taxe_id
+                  FROM info_collecte ic
+                  WHERE ic.updated_at >= :depuis
+              )
+          )"""
+
+_CALCUL_SQL = """
+    CREATE TEMP TABLE impayes_calcul ON COMMIT DROP AS
+    WITH affectations AS (
+        SELECT
+            a.id AS affectation_id,
+            a.contribuable_id,
+            a.taxe_id,
+            a.date_debut,
+            a.date_debut + CASE t.periodicite
+                WHEN 'mensuelle' THEN INTERVAL '30 days'
+                WHEN 'hebdomadaire' THEN INTERVAL '7 days'
+                WHEN 'trimestrielle' THEN INTERVAL '90 days'
+                ELSE INTERVAL '0 days'
+            END AS date_echeance,
+            COALESCE(NULLIF(a.montant_custom, 0), t.montant) AS montant_initial
+        FROM affectation_taxe a
+        JOIN taxe t ON t.id = a.taxe_id
+        WHERE a.actif = TRUE
+          AND a.date_debut <= :date_limite
+          {filtre}
+    ),
+    paiements AS (
+        SELECT af.affectation_id, COALESCE(SUM(ic.montant), 0) AS montant_paye
+        FROM affectations af
+        LEFT JOIN info_collecte ic
+               ON ic.contribuable_id = af.contribuable_id
+              AND ic.taxe_id = af.taxe_id
+              AND ic.statut = 'completed'
+              AND ic.annule = FALSE
+              AND ic.date_collecte >= af.date_debut
+        GROUP BY af.affectation_id
+    )
+    SELECT
+        af.affectation_id,
+        af.contribuable_id,
+        af.date_echeance,
+        af.montant_initial,
+        p.montant_paye,
+        af.montant_initial - p.montant_paye AS montant_restant,
+        GREATEST(FLOOR(EXTRACT(EPOCH FROM (CAST(:maintenant AS timestamp) - af.date_echeance)) / 86400), 0)::int
+            AS jours_retard,
+        (af.date_echeance < :maintenant AND p.montant_paye < af.montant_initial) AS impaye
+    FROM affectations af
+    JOIN paiements p ON p.affectation_id = af.affectation_id
+"""
+
+_MISE_A_JOUR_SQL = f"""
+    UPDATE dossier_impaye d SET
+        montant_paye = c.montant_paye,
+        montant_restant = c.montant_restant,
+        penalites = c.montant_restant * :taux / 100 * c.jours_retard,
+        jours_retard = c.jours_retard,
+        priorite = {_PRIORITE_SQL.format(jours="c.jours_retard")},
+        updated_at = :maintenant
+    FROM impayes_calcul c
+    WHERE c.impaye
+      AND d.affectation_taxe_id = c.affectation_id
+      AND d.statut IN {_STATUTS_OUVERTS}
+    RETURNING d.id
+"""
+
+_CREATION_SQL = f"""
+    INSERT INTO dossier_impaye (
+        contribuable_id, affectation_taxe_id, montant_initial, montant_paye,
+        montant_restant, penalites, date_echeance, jours_retard, statut, priorite,
+        nombre_relances, created_at, updated_at
+    )
+    SELECT
+        c.contribuable_id,
+        c.affectation_id,
+        c.montant_initial,
+        c.montant_paye,
+        c.montant_restant,
+        c.montant_restant * :taux / 100 * c.jours_retard,
+        c.date_echeance,
+        c.jours_retard,
+        'en_cours',
+        {_PRIORITE_SQL.format(jours="c.jours_retard")},
+        0,
+        :maintenant,
+        :maintenant
+    FROM impayes_calcul c
+    WHERE c.impaye
+      AND NOT EXISTS (
+          SELECT 1 FROM dossier_impaye d
+          WHERE d.affectation_taxe_id = c.affectation_id
+            AND d.statut IN {_STATUTS_OUVERTS}
+      )
+    RETURNING id
+"""
+
+# Mode incrémental : actualisation des dossiers ouverts non recalculés
+# (seules les lignes dont les jours de retard ou les pénalités changent sont écrites)
+_ACTUALISATION_SQL = f"""
+    UPDATE dossier_impaye d SET
+        jours_retard = r.jours_retard,
+        penalites = r.penalites,
+        priorite = {_PRIORITE_SQL.format(jours="r.jours_retard")},
+        updated_at = :maintenant
+    FROM (
+        SELECT
+            d2.id,
+            r2.jours_retard,
+            CAST(d2.montant_restant * :taux / 100 * r2.jours_retard AS NUMERIC(12, 2)) AS penalites
+        FROM dossier_impaye d2
+        JOIN affectation_taxe a ON a.id = d2.affectation_taxe_id
+        CROSS JOIN LATERAL (
+            SELECT GREATEST(
+                FLOOR(EXTRACT(EPOCH FROM (CAST(:maintenant AS timestamp) - d2.date_echeance)) / 86400), 0
+            )::int AS jours_retard
+        ) r2
+        WHERE d2.statut IN {_STATUTS_OUVERTS}
+          AND a.actif = TRUE
+          AND a.date_debut <= :date_limite
+          AND d2.date_echeance < :maintenant
+          AND NOT EXISTS (SELECT 1 FROM impayes_calcul c WHERE c.affectation_id = d2.affectation_taxe_id)
+    ) r
+    WHERE d.id = r.id
+      AND (d.jours_retard IS DISTINCT FROM r.jours_retard OR d.penalites IS DISTINCT FROM r.penalites)
+"""
+
+
+@dataclass
+class ResultatDetection:
+    """Bilan d'une détection : dossiers créés et dossiers recalculés"""
+    incremental: bool
+    affectations_revues: int = 0
+    dossiers_crees: List[int] = field(default_factory=list)
+    dossiers_mis_a_jour: List[int] = field(default_factory=list)
+    dossiers_actualises: int = 0
+
+    @property
+    def dossiers_ids(self) -> List[int]:
+        return self.dossiers_crees + self.dossiers_mis_a_jour
+
+
+def _point_de_reprise(db: Session, jours_retard_min: int, taux_penalite: Decimal) -> Optional[datetime]:
+    """Début de la dernière exécution terminée avec les mêmes paramètres"""
+    derniere = db.query(DetectionImpayesExecution.date_debut).filter(
+        DetectionImpayesExecution.date_fin.isnot(None),
+        DetectionImpayesExecution.jours_retard_min == jours_retard_min,
+        DetectionImpayesExecution.taux_penalite == taux_penalite,
+    ).order_by(DetectionImpayesExecution.date_debut.desc()).first()
+    return derniere.date_debut if derniere else None
+
+
+def detecter_impayes_en_masse(
+    db: Session,
+    jours_retard_min: int = 7,
+    taux_penalite: Decimal = Decimal("0.5"),
+    incremental: bool = False,
+) -> Optional[ResultatDetection]:
+    """
+    Crée ou met à jour les dossiers d'impayés et valide la transaction.
+
+    Sans exécution précédente comparable, une demande incrémentale est traitée
+    comme une détection complète. Retourne None si une autre détection est déjà
+    en cours.
+    """
+    acquired = db.execute(
+        text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": _DETECTION_LOCK_KEY}
+    ).scalar()
+    if not acquired:
+        return None
+
+    maintenant = datetime.utcnow()
+    params = {
+        "maintenant": maintenant,
+        "date_limite": maintenant - timedelta(days=jours_retard_min),
+        "taux": taux_penalite,
+    }
+
+    depuis = _point_de_reprise(db, jours_retard_min, taux_penalite) if incremental else None
+    filtre = ""
+    if depuis is not None:
+        depuis -= MARGE_REPRISE
+        filtre = _FILTRE_INCREMENTAL_SQL
+        params["depuis"] = depuis
+        # Affectations dont l'échéance ou le seuil de retard a pu être franchi depuis
+        params["depuis_echeance"] = depuis - timedelta(days=max(_DELAI_ECHEANCE_MAX_JOURS, jours_retard_min))
+
+    execution = DetectionImpayesExecution(
+        date_debut=maintenant,
+        incremental=depuis is not None,
+        jours_retard_min=jours_retard_min,
+        taux_penalite=taux_penalite,
+    )
+    db.add(execution)
+    db.flush()
+
+    resultat = ResultatDetection(incremental=depuis is not None)
+    resultat.affectations_revues = db.execute(text(_CALCUL_SQL.format(filtre=filtre)), params).rowcount
+    resultat.dossiers_mis_a_jour = list(db.execute(text(_MISE_A_JOUR_SQL), params).scalars())
+    resultat.dossiers_crees = list(db.execute(text(_CREATION_SQL), params).scalars())
+    if resultat.incremental:
+        resultat.dossiers_actualises = db.execute(text(_ACTUALISATION_SQL), params).rowcount
+
+    execution.affectations_revues = resultat.affectations_revues
+    execution.dossiers_crees = len(resultat.dossiers_crees)
+    execution.dossiers_mis_a_jour = len(resultat.dossiers_mis_a_jour)
+    execution.date_fin = datetime.utcnow()
+    db.commit()
+    return resultat
@@ -0,0 +1,222 @@
+"""
+Envoi des relances SMS par lot (POST /api/relances/generer-automatique)
+
+Les SMS partent en parallèle, avec un nombre maximal d'envois simultanés et un
+débit maximal (messages par seconde) pour rester dans les limites de l'API
+Ventis. Les échecs transitoires (timeout, 429, 5xx, connexion) sont retentés
+avec un délai exponentiel. Les envois ne touchent pas à la base : le résultat
+de chaque relance est ensuite enregistré en une seule fois, compteurs des
+dossiers d'impayés compris.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import text, update
+from sqlalchemy.orm import Session
+
+from database.models import Relance, StatutRelanceEnum
+from services.clients_http import fermer_clients
+from services.ventis_messaging import ventis_messaging_service
+
+logger = logging.getLogger(__name__)
+
+ENVOI_CONCURRENCE = int(os.getenv("RELANCES_SMS_CONCURRENCE", "10"))
+ENVOI_DEBIT_MAX = float(os.getenv("RELANCES_SMS_DEBIT_MAX", "20"))  # messages / seconde, 0 = illimité
+ENVOI_TENTATIVES = int(os.getenv("RELANCES_SMS_TENTATIVES", "3"))
+ENVOI_DELAI_BASE = float(os.getenv("RELANCES_SMS_DELAI_BASE", "1"))  # secondes, doublé à chaque tentative
+
+VENTIS_DEFAULT_SENDER = os.getenv("VENTIS_MESSAGING_SENDER", "VENTIS")
+
+# Codes renvoyés par send_message qui justifient une nouvelle tentative
+_CODES_TRANSITOIRES = {408, 429, 500, 502, 503, 504}
+
+
+@dataclass
+class EnvoiRelance:
+    """Données d'une relance à envoyer, détachées de la session"""
+    relance_id: int
+    affectation_taxe_id: Optional[int]
+    telephone: str
+    message: str
+
+
+@dataclass
+class ResultatEnvoi:
+    relance_id: int
+    affectation_taxe_id: Optional[int]
+    succes: bool
+    telephone: str
+    notes: str
+    tentatives: int
+    date_envoi: Optional[datetime] = None
+
+
+def construire_message(relance: Relance) -> str:
+    """Texte du SMS d'une relance (message enregistré ou message par défaut + échéance)"""
+    message = relance.message or f"Rappel: Vous avez une taxe de {relance.montant_due} FCFA à payer."
+    if relance.date_echeance:
+        message += f" Échéance: {relance.date_echeance.strftime('%d/%m/%Y')}"
+    return message
+
+
+def preparer_envois(relances: Iterable[Relance]) -> List[EnvoiRelance]:
+    """Relances SMS envoyables (contribuable avec un téléphone)"""
+    return [
+        EnvoiRelance(
+            relance_id=relance.id,
+            affectation_taxe_id=relance.affectation_taxe_id,
+            telephone=ventis_messaging_service.format_phone_number(relance.contribuable.telephone),
+            message=construire_message(relance),
+        )
+        for relance in relances
+        if relance.contribuable and relance.contribuable.telephone
+    ]
+
+
+class LimiteurDebit:
+    """Espace les départs pour ne pas dépasser `debit` envois par seconde"""
+
+    def __init__(self, debit: float):
+        self.intervalle = 1.0 / debit if debit > 0 else 0.0
+        self._prochain = 0.0
+        self._lock = asyncio.Lock()
+
+    async def attendre(self) -> None:
+        if not self.intervalle:
+            return
+        async with self._lock:
+            maintenant = time.monotonic()
+            if self._prochain > maintenant:
+                await asyncio.sleep(self._prochain - maintenant)
+                maintenant = self._prochain
+            self._prochain = maintenant + self.intervalle
+
+
+def _est_transitoire(result: Dict) -> bool:
+    return result.get("status_code") in _CODES_TRANSITOIRES or result.get("error") == "CONNECTION_ERROR"
+
+
+async def _envoyer_un(
+    envoi: EnvoiRelance, semaphore: asyncio.Semaphore, limiteur: LimiteurDebit, tentatives_max: int
+) -> ResultatEnvoi:
+    async with semaphore:
+        result: Dict = {}
+        for tentative in range(1, tentatives_max + 1):
+            await limiteur.attendre()
+            try:
+                result = await ventis_messaging_service.send_message(
+                    to=envoi.telephone,
+                    message=envoi.message,
+                    sender=VENTIS_DEFAULT_SENDER,
+                    is_otp=False
+                )
+            except Exception as e:
+                result = {"success": False, "error": "CONNECTION_ERROR", "detail": str(e)}
+
+            if result.get("success"):
+                return ResultatEnvoi(
+                    relance_id=envoi.relance_id,
+                    affectation_taxe_id=envoi.affectation_taxe_id,
+                    succes=True,
+                    telephone=envoi.telephone,
+                    notes=f"SMS envoyé via Ventis. UUID: {result.get('data', {}).get('uuid', 'N/A')}",
+                    tentatives=tentative,
+                    date_envoi=datetime.utcnow(),
+                )
+            if tentative < tentatives_max and _est_transitoire(result):
+                delai = ENVOI_DELAI_BASE * (2 ** (tentative - 1))
+                await asyncio.sleep(delai + random.uniform(0, delai / 2))
+                continue
+            break
+
+        logger.error(f"Erreur envoi SMS pour relance {envoi.relance_id}: {result.get('detail', 'Erreur inconnue')}")
+        return ResultatEnvoi(
+            relance_id=envoi.relance_id,
+            affectation_taxe_id=envoi.affectation_taxe_id,
+            succes=False,
+            telephone=envoi.telephone,
+            notes=f"Erreur envoi SMS: {result.get('detail', 'Erreur inconnue')}",
+            tentatives=tentative,
+        )
+
+
+async def envoyer_sms(
+    envois: List[EnvoiRelance],
+    concurrence: int = ENVOI_CONCURRENCE,
+    debit_max: float = ENVOI_DEBIT_MAX,
+    tentatives_max: int = ENVOI_TENTATIVES,
+) -> List[ResultatEnvoi]:
+    """Envoie les SMS en parallèle (concurrence et débit bornés) ; résultats dans l'ordre des envois"""
+    if not envois:
+        return []
+    semaphore = asyncio.Semaphore(max(1, concurrence))
+    limiteur = LimiteurDebit(debit_max)
+    return await asyncio.gather(
+        *(_envoyer_un(envoi, semaphore, limiteur, max(1, tentatives_max)) for envoi in envois)
+    )
+
+
+def envoyer_sms_hors_boucle(envois: List[EnvoiRelance]) -> List[ResultatEnvoi]:
+    """
+    Variante synchrone pour les tâches en arrière-plan : envoie dans une boucle
+    dédiée et ferme ensuite les clients HTTP ouverts pour cette boucle.
+    """
+
+    async def _envoyer():
+        try:
+            return await envoyer_sms(envois)
+        finally:
+            await fermer_clients()
+
+    return asyncio.run(_envoyer())
+
+
+def enregistrer_resultats(db: Session, resultats: List[ResultatEnvoi]) -> None:
+    """
+    Enregistre le statut de chaque relance (une instruction UPDATE groupée) et
+    incrémente les compteurs des dossiers d'impayés en cours pour les SMS
+    effectivement envoyés ; valide la transaction.
+    """
+    if not resultats:
+        return
+    maintenant = datetime.utcnow()
+    lignes = []
+    for resultat in resultats:
+        ligne = {
+            "id": resultat.relance_id,
+            "statut": StatutRelanceEnum.ENVOYEE if resultat.succes else StatutRelanceEnum.ECHEC,
+            "notes": resultat.notes,
+            "updated_at": maintenant,
+        }
+        if resultat.succes:
+            ligne["date_envoi"] = resultat.date_envoi
+            ligne["canal_envoi"] = resultat.telephone
+        lignes.append(ligne)
+    db.execute(update(Relance), lignes)
+
+    affectations = [r.affectation_taxe_id for r in resultats if r.succes and r.affectation_taxe_id]
+    if affectations:
+        db.execute(
+            text("""
+                UPDATE dossier_impaye d SET
+                    nombre_relances = COALESCE(d.nombre_relances, 0) + e.nombre,
+                    dernier_contact = :maintenant,
+                    updated_at = :maintenant
+                FROM (
+                    SELECT affectation_taxe_id, COUNT(*) AS nombre
+                    FROM unnest(CAST(:affectations AS integer[])) AS affectation_taxe_id
+                    GROUP BY affectation_taxe_id
+                ) e
+                WHERE d.affectation_taxe_id = e.affectation_taxe_id
+                  AND d.statut = 'en_cours'
+            """),
+            {"affectations": affectations, "maintenant": maintenant},
+        )
+    db.commit()
@@ -0,0 +1,189 @@
+"""
+Enregistrement par lot des collectes saisies hors ligne (POST /api/collectes/batch)
+"""
+
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List
+
+from sqlalchemy import or_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from database.models import CollecteLocation, Collecteur, Contribuable, InfoCollecte, StatutCollecteEnum, Taxe
+from schemas.info_collecte import InfoCollecteBatchItem, InfoCollecteBatchResultat
+from services.collecte_hooks import collectes_modifiees
+from services.references_collecte import (
+    dernier_numero_attribue,
+    est_reference_attribuee,
+    est_reference_valide,
+    reserver_references,
+)
+
+
+def _commission(montant: Decimal, pourcentage) -> Decimal:
+    # Même calcul que la création unitaire
+    return Decimal(str(float(montant) * (float(pourcentage or 0) / 100)))
+
+
+def ingerer_collectes(db: Session, items: List[InfoCollecteBatchItem]) -> List[InfoCollecteBatchResultat]:
+    """
+    Enregistre un lot de collectes dans une seule transaction (validée par cet appel).
+
+    Une collecte déjà reçue (même clé d'idempotence, ou même référence pré-réservée)
+    n'est pas recréée : elle est renvoyée avec le statut "existante", ce qui permet
+    au terminal de rejouer un lot sans créer de doublon. Les autres erreurs (taxe,
+    contribuable ou collecteur inconnu, référence invalide ou non réservée) sont rapportées collecte par collecte sans
+    bloquer le reste du lot.
+    """
+    resultats: Dict[int, InfoCollecteBatchResultat] = {}
+
+    def _erreur(index: int, item: InfoCollecteBatchItem, message: str):
+        resultats[index] = InfoCollecteBatchResultat(
+            index=index, statut="erreur", reference=item.reference,
+            cle_idempotence=item.cle_idempotence, erreur=message
+        )
+
+    # Collectes déjà enregistrées lors d'un envoi précédent
+    cles = {item.cle_idempotence for item in items if item.cle_idempotence}
+    references = {item.reference for item in items if item.reference}
+    existantes_par_cle: Dict[str, tuple] = {}
+    existantes_par_reference: Dict[str, tuple] = {}
+    if cles or references:
+        for row in db.query(InfoCollecte.id, InfoCollecte.reference, InfoCollecte.cle_idempotence).filter(
+            or_(InfoCollecte.cle_idempotence.in_(cles), InfoCollecte.reference.in_(references))
+        ):
+            if row.cle_idempotence:
+                existantes_par_cle[row.cle_idempotence] = (row.id, row.reference)
+            existantes_par_reference[row.reference] = (row.id, row.reference)
+
+    # Commission : une seule requête pour toutes les taxes du lot
+    taxe_ids = {item.taxe_id for item in items}
+    commissions = dict(
+        db.query(Taxe.id, Taxe.commission_pourcentage).filter(Taxe.id.in_(taxe_ids)).all()
+    )
+    # Contribuables et collecteurs existants : un identifiant inconnu ferait échouer
+    # l'INSERT du lot entier sur la clé étrangère
+    contribuables = {
+        row.id for row in
+        db.query(Contribuable.id).filter(Contribuable.id.in_({item.contribuable_id for item in items}))
+    }
+    collecteurs = {
+        row.id for row in
+        db.query(Collecteur.id).filter(Collecteur.id.in_({item.collecteur_id for item in items}))
+    }
+
+    dernier_numero = dernier_numero_attribue(db) if references else 0
+
+    a_creer: List[int] = []
+    vus_cles, vus_references = set(), set()
+    for index, item in enumerate(items):
+        existante = (
+            existantes_par_cle.get(item.cle_idempotence) if item.cle_idempotence else None
+        ) or (existantes_par_reference.get(item.reference) if item.reference else None)
+        if existante:
+            resultats[index] = InfoCollecteBatchResultat(
+                index=index, statut="existante", id=existante[0], reference=existante[1],
+                cle_idempotence=item.cle_idempotence
+            )
+            continue
+        if item.taxe_id not in commissions:
+            _erreur(index, item, "Taxe non trouvée")
+            continue
+        if item.contribuable_id not in contribuables:
+            _erreur(index, item, "Contribuable non trouvé")
+            continue
+        if item.collecteur_id not in collecteurs:
+            _erreur(index, item, "Collecteur non trouvé")
+            continue
+        if item.reference and not est_reference_valide(item.reference):
+            _erreur(index, item, "Format de référence invalide")
+            continue
+        if item.reference and not est_reference_attribuee(item.reference, dernier_numero):
+            _erreur(index, item, "Référence non réservée")
+            continue
+        if (item.cle_idempotence and item.cle_idempotence in vus_cles) or (
+            item.reference and item.reference in vus_references
+        ):
+            _erreur(index, item, "Collecte en double dans le lot")
+            continue
+        if item.cle_idempotence:
+            vus_cles.add(item.cle_idempotence)
+        if item.reference:
+            vus_references.add(item.reference)
+        a_creer.append(index)
+
+    if a_creer:
+        sans_reference = [index for index in a_creer if not items[index].reference]
+        nouvelles_references = iter(reserver_references(db, len(sans_reference))) if sans_reference else iter(())
+
+        maintenant = datetime.utcnow()
+        lignes = []
+        for index in a_creer:
+            item = items[index]
+            lignes.append({
+                **item.dict(exclude={"reference", "cle_idempotence", "location"}),
+                "reference": item.reference or next(nouvelles_references),
+                "cle_idempotence": item.cle_idempotence,
+                "commission": _commission(item.montant, commissions[item.taxe_id]),
+                "statut": StatutCollecteEnum.PENDING,
+                "created_at": maintenant,
+                "updated_at": maintenant,
+            })
+
+        # Une seule instruction INSERT ... RETURNING ; un conflit d'unicité (envoi
+        # concurrent du même lot) laisse la ligne existante en place
+        stmt = insert(InfoCollecte).on_conflict_do_nothing().returning(
+            InfoCollecte.id, InfoCollecte.reference
+        )
+        ids_par_reference = {row.reference: row.id for row in db.execute(stmt, lignes)}
+
+        # Lignes écartées par un conflit : retrouver la collecte enregistrée entre-temps
+        ecartees = [ligne for ligne in lignes if ligne["reference"] not in ids_par_reference]
+        concurrentes: Dict[str, tuple] = {}
+        if ecartees:
+            cles_ecartees = {ligne["cle_idempotence"] for ligne in ecartees if ligne["cle_idempotence"]}
+            references_ecartees = {ligne["reference"] for ligne in ecartees}
+            for row in db.query(InfoCollecte.id, InfoCollecte.reference, InfoCollecte.cle_idempotence).filter(
+                or_(InfoCollecte.cle_idempotence.in_(cles_ecartees), InfoCollecte.reference.in_(references_ecartees))
+            ):
+                if row.cle_idempotence:
+                    concurrentes[row.cle_idempotence] = (row.id, row.reference)
+                concurrentes[row.reference] = (row.id, row.reference)
+
+        locations = []
+        creees = []
+        for index, ligne in zip(a_creer, lignes):
+            item = items[index]
+            collecte_id = ids_par_reference.get(ligne["reference"])
+            if collecte_id is None:
+                existante = concurrentes.get(ligne["cle_idempotence"]) or concurrentes.get(ligne["reference"])
+                resultats[index] = InfoCollecteBatchResultat(
+                    index=index, statut="existante",
+                    id=existante[0] if existante else None,
+                    reference=existante[1] if existante else ligne["reference"],
+                    cle_idempotence=item.cle_idempotence
+                )
+                continue
+            resultats[index] = InfoCollecteBatchResultat(
+                index=index, statut="creee", id=collecte_id, reference=ligne["reference"],
+                cle_idempotence=item.cle_idempotence
+            )
+            creees.append(InfoCollecte(**ligne))
+            if item.location:
+                locations.append({
+                    **item.location.dict(),
+                    "collecte_id": collecte_id,
+                    "timestamp": item.location.timestamp or maintenant,
+                    "created_at": maintenant,
+                    "updated_at": maintenant,
+                })
+
+        if locations:
+            db.execute(insert(CollecteLocation), locations)
+
+        # Objets non attachés à la session : seules leurs clés de cumul sont lues
+        collectes_modifiees(db, creees)
+
+    db.commit()
+    return [resultats[index] for index in range(len(items))]
@@ -0,0 +1,259 @@
+"""
+Tâches longues exécutées en arrière-plan (table job)
+
+Un endpoint enregistre la tâche (soumettre_job) et répond immédiatement avec son
+identifiant ; l'avancement et le résultat se consultent via GET /api/jobs/{id}.
+
+Les tâches sont prises en charge par des workers qui interrogent la table et
+réservent une tâche à la fois avec FOR UPDATE SKIP LOCKED, ce qui permet d'en
+faire tourner plusieurs (threads du processus API, ou processus séparés lancés
+par scripts/job_worker.py) sans qu'une tâche soit exécutée deux fois. Une tâche
+dont le worker a disparu (plus de battement depuis JOBS_DELAI_ABANDON secondes)
+est reprise par un autre worker, dans la limite de JOBS_TENTATIVES_MAX ; au-delà,
+ou si son type n'est pas reprenable (@tache_job(..., reprenable=False), pour les
+tâches aux effets externes comme l'envoi de SMS), elle passe en échec.
+
+Les fichiers produits par les tâches (exports) sont déposés dans
+DOSSIER_FICHIERS_JOBS, hors du dossier uploads servi sans authentification, et
+se téléchargent via GET /api/jobs/{id}/fichier.
+
+Les fonctions d'exécution sont déclarées à côté du code qu'elles appellent avec
+le décorateur @tache_job("type") : elles reçoivent une session, les paramètres
+(JSON) et une fonction d'avancement, et retournent le résultat (JSON).
+"""
+
+import logging
+import os
+import socket
+import threading
+import traceback
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from database.database import SessionLocal
+from database.models import Job
+
+logger = logging.getLogger(__name__)
+
+# Workers lancés dans chaque processus API (0 = uniquement des workers séparés)
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "2"))
+JOBS_POLL_INTERVAL = float(os.getenv("JOBS_POLL_INTERVAL", "2"))
+JOBS_DELAI_ABANDON = int(os.getenv("JOBS_DELAI_ABANDON", "900"))
+JOBS_TENTATIVES_MAX = int(os.getenv("JOBS_TENTATIVES_MAX", "3"))
+
+# Fichiers produits par les tâches (téléchargés via GET /api/jobs/{id}/fichier)
+DOSSIER_FICHIERS_JOBS = Path(__file__).resolve().parent.parent / "exports"
+
+# Intervalle des battements d'une tâche en cours (bien inférieur au délai d'abandon)
+_INTERVALLE_BATTEMENT = max(5, JOBS_DELAI_ABANDON // 10)
+
+STATUT_EN_ATTENTE = "en_attente"
+STATUT_EN_COURS = "en_cours"
+STATUT_TERMINE = "termine"
+STATUT_ECHEC = "echec"
+
+Progression = Callable[..., None]
+_taches: Dict[str, Callable[[Session, Dict[str, Any], Progression], Any]] = {}
+# Types dont une exécution interrompue ne doit pas être relancée
+_non_reprenables: set = set()
+
+_RESERVATION_SQL = """
+    UPDATE job SET
+        statut = 'en_cours',
+        started_at = :maintenant,
+        heartbeat_at = :maintenant,
+        tentatives = COALESCE(tentatives, 0) + 1,
+        worker = :worker,
+        updated_at = :maintenant
+    WHERE id = (
+        SELECT id FROM job
+        WHERE type = ANY(:types)
+          AND (
+              statut = 'en_attente'
+              OR (
+                  statut = 'en_cours' AND heartbeat_at < :abandon
+                  AND COALESCE(tentatives, 0) < :tentatives_max
+                  AND NOT (type = ANY(:non_reprenables))
+              )
+          )
+        ORDER BY created_at, id
+        FOR UPDATE SKIP LOCKED
+        LIMIT 1
+    )
+    RETURNING id, type, parametres
+"""
+
+# Tâches abandonnées qui ne seront plus reprises : en échec, pour que leur suivi se termine
+_ABANDON_SQL = """
+    UPDATE job SET
+        statut = 'echec',
+        erreur = 'abandonné',
+        finished_at = :maintenant,
+        updated_at = :maintenant
+    WHERE statut = 'en_cours'
+      AND heartbeat_at < :abandon
+      AND (COALESCE(tentatives, 0) >= :tentatives_max OR type = ANY(:non_reprenables))
+"""
+
+
+def tache_job(type_job: str, reprenable: bool = True):
+    """
+    Déclare la fonction qui exécute les tâches d'un type donné. Avec
+    reprenable=False, une exécution interrompue (worker disparu) passe en
+    échec au lieu d'être relancée.
+    """
+
+    def decorator(func):
+        _taches[type_job] = func
+        if not reprenable:
+            _non_reprenables.add(type_job)
+        return func
+
+    return decorator
+
+
+def types_enregistres() -> List[str]:
+    return sorted(_taches)
+
+
+def soumettre_job(
+    db: Session, type_job: str, parametres: Optional[Dict[str, Any]] = None, utilisateur_id: Optional[int] = None
+) -> Job:
+    """Enregistre une tâche en attente et valide la transaction"""
+    if type_job not in _taches:
+        raise ValueError(f"Type de tâche inconnu: {type_job}")
+    job = Job(
+        type=type_job,
+        statut=STATUT_EN_ATTENTE,
+        parametres=parametres or {},
+        progression=0,
+        created_by=utilisateur_id,
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def _mettre_a_jour(job_id: int, **valeurs) -> None:
+    """Écrit l'état d'une tâche dans sa propre transaction (visible immédiatement)"""
+    db = SessionLocal()
+    try:
+        valeurs["updated_at"] = datetime.utcnow()
+        db.query(Job).filter(Job.id == job_id).update(valeurs, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _progression(job_id: int) -> Progression:
+    def signaler(pourcentage: int, message: Optional[str] = None) -> None:
+        valeurs = {"progression": max(0, min(100, int(pourcentage))), "heartbeat_at": datetime.utcnow()}
+        if message is not None:
+            valeurs["message"] = message[:255]
+        try:
+            _mettre_a_jour(job_id, **valeurs)
+        except Exception as e:
+            logger.warning(f"Impossible d'enregistrer l'avancement de la tâche {job_id}: {e}")
+
+    return signaler
+
+
+def _battements(job_id: int, arret: threading.Event) -> None:
+    while not arret.wait(_INTERVALLE_BATTEMENT):
+        try:
+            _mettre_a_jour(job_id, heartbeat_at=datetime.utcnow())
+        except Exception as e:
+            logger.warning(f"Battement de la tâche {job_id} impossible: {e}")
+
+
+def _reserver(worker: str):
+    db = SessionLocal()
+    try:
+        maintenant = datetime.utcnow()
+        parametres = {
+            "maintenant": maintenant,
+            "abandon": maintenant - timedelta(seconds=JOBS_DELAI_ABANDON),
+            "tentatives_max": JOBS_TENTATIVES_MAX,
+            "non_reprenables": sorted(_non_reprenables),
+        }
+        abandonnees = db.execute(text(_ABANDON_SQL), parametres).rowcount
+        if abandonnees:
+            logger.warning(f"{abandonnees} tâche(s) abandonnée(s) passée(s) en échec")
+        ligne = db.execute(text(_RESERVATION_SQL), {
+            **parametres,
+            "types": types_enregistres(),
+            "worker": worker,
+        }).first()
+        db.commit()
+        return ligne
+    finally:
+        db.close()
+
+
+def chemin_fichier_job(nom: str) -> Path:
+    """Chemin d'un fichier de DOSSIER_FICHIERS_JOBS ; ValueError si le nom en sort"""
+    chemin = (DOSSIER_FICHIERS_JOBS / nom).resolve()
+    if chemin.parent != DOSSIER_FICHIERS_JOBS.resolve():
+        raise ValueError(f"Nom de fichier invalide: {nom}")
+    return chemin
+
+
+def executer_prochain_job(worker: Optional[str] = None) -> bool:
+    """Réserve et exécute une tâche ; retourne False s'il n'y en avait aucune"""
+    if not _taches:
+        return False
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+    ligne = _reserver(worker)
+    if ligne is None:
+        return False
+
+    arret = threading.Event()
+    threading.Thread(target=_battements, args=(ligne.id, arret), daemon=True).start()
+    db = SessionLocal()
+    try:
+        resultat = _taches[ligne.type](db, ligne.parametres or {}, _progression(ligne.id))
+        _mettre_a_jour(
+            ligne.id, statut=STATUT_TERMINE, progression=100, resultat=resultat,
+            erreur=None, finished_at=datetime.utcnow()
+        )
+        logger.info(f"Tâche {ligne.id} ({ligne.type}) terminée")
+    except Exception as e:
+        db.rollback()
+        detail = getattr(e, "detail", None) or str(e) or type(e).__name__
+        logger.error(f"Tâche {ligne.id} ({ligne.type}) en échec: {detail}")
+        traceback.print_exc()
+        _mettre_a_jour(ligne.id, statut=STATUT_ECHEC, erreur=str(detail), finished_at=datetime.utcnow())
+    finally:
+        arret.set()
+        db.close()
+    return True
+
+
+def boucle_worker(arret: threading.Event, worker: Optional[str] = None) -> None:
+    """Exécute les tâches en attente jusqu'à ce que `arret` soit positionné"""
+    while not arret.is_set():
+        try:
+            if executer_prochain_job(worker):
+                continue
+        except Exception as e:
+            logger.error(f"Erreur du worker de tâches: {e}")
+        arret.wait(JOBS_POLL_INTERVAL)
+
+
+def demarrer_workers(nombre: int = JOBS_WORKERS) -> threading.Event:
+    """
+    Lance `nombre` threads de worker dans le processus courant (hors boucle
+    asyncio, pour ne pas occuper les workers uvicorn) ; positionner l'événement
+    retourné les arrête après la tâche en cours.
+    """
+    arret = threading.Event()
+    for index in range(max(0, nombre)):
+        threading.Thread(
+            target=boucle_worker, args=(arret,), name=f"job-worker-{index}", daemon=True
+        ).start()
+    return arret
@@ -0,0 +1,37 @@
+"""
+Filtres de dates compatibles avec les index
+
+Comparer `func.date(colonne)` à un jour empêche PostgreSQL d'utiliser un index sur
+la colonne horodatée. Ces fonctions traduisent un jour ou une période en bornes
+semi-ouvertes [début, fin) directement comparables à la colonne.
+"""
+
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_
+
+
+def bornes_jour(jour: date) -> Tuple[datetime, datetime]:
+    """Bornes [00:00 du jour, 00:00 du lendemain)"""
+    debut = datetime.combine(jour, datetime.min.time())
+    return debut, debut + timedelta(days=1)
+
+
+def filtre_jour(colonne, jour: date):
+    """Condition « colonne tombe le jour donné »"""
+    debut, fin = bornes_jour(jour)
+    return and_(colonne >= debut, colonne < fin)
+
+
+def filtres_periode(colonne, date_debut: Optional[date] = None, date_fin: Optional[date] = None) -> List:
+    """
+    Conditions « colonne entre date_debut et date_fin incluses » ; une borne
+    absente n'est pas filtrée. À utiliser avec `query.filter(*filtres_periode(...))`.
+    """
+    conditions = []
+    if date_debut:
+        conditions.append(colonne >= bornes_jour(date_debut)[0])
+    if date_fin:
+        conditions.append(colonne < bornes_jour(date_fin)[1])
+    return conditions
@@ -0,0 +1,77 @@
+"""
+Attribution des références de collecte (COL-YYYYMMDD-NNNN)
+
+Le numéro provient de la séquence PostgreSQL info_collecte_reference_seq :
+nextval() est atomique et ne prend aucun verrou sur info_collecte, deux
+créations simultanées ne peuvent donc pas obtenir la même référence. La date
+du préfixe est informative, l'unicité repose sur le numéro.
+"""
+
+import re
+from datetime import date
+from typing import List, Optional
+
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database.models import reference_collecte_seq
+
+# Nombre maximal de références réservées en une fois pour un terminal hors ligne
+TAILLE_BLOC_MAX = 500
+
+_FORMAT_REFERENCE = re.compile(r"^COL-\d{8}-\d{4,}$")
+
+
+def _formater(numero: int, jour: date) -> str:
+    return f"COL-{jour.strftime('%Y%m%d')}-{numero:04d}"
+
+
+def prochaine_reference(db: Session, jour: Optional[date] = None) -> str:
+    """Attribue une nouvelle référence"""
+    numero = db.execute(select(reference_collecte_seq.next_value())).scalar_one()
+    return _formater(numero, jour or date.today())
+
+
+def reserver_references(db: Session, nombre: int, jour: Optional[date] = None) -> List[str]:
+    """
+    Réserve un bloc de références en un seul aller-retour, pour les terminaux qui
+    saisissent des collectes hors ligne. Les numéros sont uniques mais pas
+    forcément contigus si d'autres créations ont lieu en même temps.
+    """
+    if nombre < 1 or nombre > TAILLE_BLOC_MAX:
+        raise ValueError(f"Le nombre de références doit être compris entre 1 et {TAILLE_BLOC_MAX}")
+    jour = jour or date.today()
+    numeros = db.execute(
+        select(reference_collecte_seq.next_value()).select_from(func.generate_series(1, nombre))
+    ).scalars().all()
+    return [_formater(numero, jour) for numero in sorted(numeros)]
+
+
+def est_reference_valide(reference: str) -> bool:
+    """Vérifie le format d'une référence fournie par un terminal (bloc pré-réservé)"""
+    return bool(reference and _FORMAT_REFERENCE.match(reference))
+
+
+def dernier_numero_attribue(db: Session) -> int:
+    """Plus grand numéro déjà distribué par la séquence (0 si aucun), sans la faire avancer"""
+    last_value, is_called = db.execute(
+        text("SELECT last_value, is_called FROM info_collecte_reference_seq")
+    ).one()
+    return last_value if is_called else last_value - 1
+
+
+def est_reference_attribuee(reference: str, dernier_numero: int) -> bool:
+    """
+    Une référence fournie par un terminal doit avoir été distribuée par la séquence
+    (bloc pré-réservé) : un numéro au-delà du dernier attribué est forgé ou erroné
+    et entrerait plus tard en collision avec nextval().
+    """
+    return est_reference_valide(reference) and int(reference.rsplit("-", 1)[1]) <= dernier_numero
+
+
+def est_conflit_reference(erreur: IntegrityError) -> bool:
+    """L'erreur d'intégrité vient de l'unicité de info_collecte.reference"""
+    diag = getattr(erreur.orig, "diag", None)
+    contrainte = getattr(diag, "constraint_name", None) or str(erreur.orig)
+    return "reference" in contrainte
@@ -0,0 +1,130 @@
+"""
+Lecture du registre des opérations de caisse par curseur et export en flux
+
+Pagination par curseur : les opérations sont triées par (date_operation, id)
+décroissants ; le curseur encode la clé de la dernière opération reçue et la page
+suivante reprend juste après, sans OFFSET (coût constant quelle que soit la page).
+
+Export : NDJSON ou CSV écrit au fil de la lecture d'un curseur côté serveur
+(yield_per), la mémoire utilisée ne dépend pas de la taille du registre.
+"""
+
+import base64
+import csv
+import io
+import json
+from datetime import datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import and_, or_, select
+
+from database.database import session_lecture
+from database.models import OperationCaisse
+
+FORMATS_EXPORT = ("ndjson", "csv")
+TAILLE_LOT_EXPORT = 1000
+
+# En-tête des pages par curseur : clé à passer en ?apres= pour la page suivante
+ENTETE_CURSEUR_SUIVANT = "X-Curseur-Suivant"
+
+COLONNES_EXPORT = (
+    "id", "caisse_id", "collecteur_id", "type_operation", "montant", "libelle",
+    "collecte_id", "reference", "solde_avant", "solde_apres", "notes",
+    "date_operation", "created_at",
+)
+
+
+def encoder_curseur(operation) -> str:
+    cle = f"{operation.date_operation.isoformat()}|{operation.id}"
+    return base64.urlsafe_b64encode(cle.encode("utf-8")).decode("ascii")
+
+
+def decoder_curseur(curseur: str) -> Tuple[datetime, int]:
+    """Clé (date_operation, id) d'un curseur ; ValueError s'il est invalide"""
+    try:
+        date_texte, identifiant = base64.urlsafe_b64decode(curseur.encode("ascii")).decode("utf-8").split("|")
+        return datetime.fromisoformat(date_texte), int(identifiant)
+    except Exception as e:
+        raise ValueError("Curseur invalide") from e
+
+
+def filtre_apres(curseur: str):
+    """
+    Opérations situées après le curseur dans l'ordre (date_operation, id)
+    décroissant. La condition redondante sur date_operation seule permet
+    d'utiliser les index existants sur cette colonne.
+    """
+    date_operation, identifiant = decoder_curseur(curseur)
+    return and_(
+        OperationCaisse.date_operation <= date_operation,
+        or_(
+            OperationCaisse.date_operation < date_operation,
+            OperationCaisse.id < identifiant,
+        ),
+    )
+
+
+def ordre_registre():
+    return OperationCaisse.date_operation.desc(), OperationCaisse.id.desc()
+
+
+def curseur_suivant(operations: List[OperationCaisse], limite: Optional[int]) -> Optional[str]:
+    """Curseur de la page suivante, ou None si la page n'est pas complète"""
+    if not limite or len(operations) < limite:
+        return None
+    return encoder_curseur(operations[-1])
+
+
+def _valeur(valeur):
+    if isinstance(valeur, Enum):
+        return valeur.value
+    if isinstance(valeur, datetime):
+        return valeur.isoformat()
+    if isinstance(valeur, Decimal):
+        return str(valeur)
+    return valeur
+
+
+def flux_operations(criteres: list, format_export: str) -> Iterator[str]:
+    """
+    Lignes NDJSON ou CSV des opérations correspondant aux critères. Le
+    générateur ouvre sa propre session (celle de la requête est fermée avant
+    l'envoi de la réponse) et lit par lots sur un curseur côté serveur.
+    """
+    colonnes = [getattr(OperationCaisse, nom) for nom in COLONNES_EXPORT]
+    requete = (
+        select(*colonnes)
+        .where(*criteres)
+        .order_by(*ordre_registre())
+        .execution_options(yield_per=TAILLE_LOT_EXPORT)
+    )
+    tampon = io.StringIO()
+    writer = csv.writer(tampon)
+
+    db = session_lecture()
+    try:
+        if format_export == "csv":
+            tampon.write("\ufeff")  # BOM pour Excel
+            writer.writerow(COLONNES_EXPORT)
+        for lot in db.execute(requete).partitions():
+            for ligne in lot:
+                valeurs = [_valeur(v) for v in ligne]
+                if format_export == "csv":
+                    writer.writerow(valeurs)
+                else:
+                    tampon.write(json.dumps(dict(zip(COLONNES_EXPORT, valeurs)), ensure_ascii=False))
+                    tampon.write("\n")
+            yield tampon.getvalue()
+            tampon.seek(0)
+            tampon.truncate()
+        reste = tampon.getvalue()
+        if reste:
+            yield reste
+    finally:
+        db.close()
+
+
+def media_type(format_export: str) -> str:
+    return "text/csv; charset=utf-8" if format_export == "csv" else "application/x-ndjson"
@@ -0,0 +1,117 @@
+"""
+Génération automatique des relances (POST /api/relances/generer-automatique)
+
+Les affectations à relancer sont sélectionnées en une seule requête : jointure
+avec la taxe et le contribuable, et anti-jointures (NOT EXISTS) pour écarter
+celles qui ont une collecte complétée depuis leur date de début ou une relance
+planifiée dans les 7 derniers jours. Les relances sont ensuite créées par une
+seule instruction INSERT.
+"""
+
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import exists, insert, or_
+from sqlalchemy.orm import Session
+
+from database.models import (
+    AffectationTaxe, Contribuable, InfoCollecte, Relance, StatutCollecteEnum, Taxe, TypeRelanceEnum
+)
+
+# Pas de nouvelle relance pour une affectation déjà relancée dans cet intervalle
+DELAI_ENTRE_RELANCES = timedelta(days=7)
+
+_DELAIS_ECHEANCE = {
+    "mensuelle": timedelta(days=30),
+    "hebdomadaire": timedelta(days=7),
+    "trimestrielle": timedelta(days=90),
+}
+
+
+def _date_echeance(date_debut: datetime, periodicite) -> datetime:
+    """Date de début + période selon la périodicité de la taxe"""
+    cle = getattr(periodicite, "value", periodicite)
+    return date_debut + _DELAIS_ECHEANCE.get(cle, timedelta(0))
+
+
+def selectionner_candidats(db: Session, jours_retard_min: int, limite: Optional[int] = None):
+    """
+    Affectations en retard sans paiement ni relance récente, avec les colonnes
+    de la taxe et du contribuable nécessaires à la relance.
+    """
+    maintenant = datetime.utcnow()
+    date_limite = maintenant - timedelta(days=jours_retard_min)
+
+    paiement = exists().where(
+        InfoCollecte.contribuable_id == AffectationTaxe.contribuable_id,
+        InfoCollecte.taxe_id == AffectationTaxe.taxe_id,
+        InfoCollecte.statut == StatutCollecteEnum.COMPLETED,
+        InfoCollecte.annule == False,
+        InfoCollecte.date_collecte >= AffectationTaxe.date_debut
+    )
+    relance_recente = exists().where(
+        Relance.affectation_taxe_id == AffectationTaxe.id,
+        Relance.date_planifiee >= maintenant - DELAI_ENTRE_RELANCES
+    )
+
+    query = db.query(
+        AffectationTaxe.id,
+        AffectationTaxe.contribuable_id,
+        AffectationTaxe.date_debut,
+        AffectationTaxe.montant_custom,
+        Taxe.montant,
+        Taxe.periodicite,
+        Contribuable.telephone,
+        Contribuable.email,
+    ).join(
+        Taxe, Taxe.id == AffectationTaxe.taxe_id
+    ).join(
+        Contribuable, Contribuable.id == AffectationTaxe.contribuable_id
+    ).filter(
+        AffectationTaxe.actif == True,
+        AffectationTaxe.date_debut <= date_limite,
+        or_(
+            AffectationTaxe.date_fin.is_(None),
+            AffectationTaxe.date_fin >= date_limite
+        ),
+        ~paiement,
+        ~relance_recente
+    ).order_by(AffectationTaxe.id)
+
+    if limite:
+        query = query.limit(limite)
+    return query.all()
+
+
+def creer_relances_automatiques(
+    db: Session,
+    type_relance: TypeRelanceEnum,
+    jours_retard_min: int = 7,
+    limite: Optional[int] = None,
+) -> List[int]:
+    """Crée les relances des affectations en retard et valide la transaction ; retourne leurs ids"""
+    candidats = selectionner_candidats(db, jours_retard_min, limite)
+    if not candidats:
+        return []
+
+    maintenant = datetime.utcnow()
+    lignes = []
+    for candidat in candidats:
+        montant_due = candidat.montant_custom if candidat.montant_custom else candidat.montant
+        date_echeance = _date_echeance(candidat.date_debut, candidat.periodicite)
+        lignes.append({
+            "contribuable_id": candidat.contribuable_id,
+            "affectation_taxe_id": candidat.id,
+            "type_relance": type_relance,
+            "montant_due": montant_due,
+            "date_echeance": date_echeance,
+            "date_planifiee": maintenant,
+            "message": f"Rappel : Vous avez une taxe de {montant_due} FCFA à payer. Échéance : {date_echeance.strftime('%d/%m/%Y')}",
+            "canal_envoi": candidat.telephone if type_relance == TypeRelanceEnum.SMS else candidat.email,
+            "created_at": maintenant,
+            "updated_at": maintenant,
+        })
+
+    ids = list(db.execute(insert(Relance).returning(Relance.id), lignes).scalars())
+    db.commit()
+    return ids
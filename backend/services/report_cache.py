@@ -0,0 +1,298 @@
+"""
+Cache des résultats des rapports et de la cartographie
+
+Les résultats sont indexés par (espace, endpoint, filtres) et par un numéro de
+version global : toute écriture qui modifie les chiffres (collectes, opérations
+de caisse) incrémente la version après son commit, ce qui rend obsolètes toutes
+les entrées précédentes sans avoir à les parcourir.
+
+Par défaut le cache est en mémoire (LRU avec durée de vie) et la version est
+propre au processus : une écriture traitée par un worker n'invalide pas le cache
+des autres, qui peuvent servir des chiffres périmés jusqu'à REPORT_CACHE_TTL.
+Avec plusieurs workers, REPORT_CACHE_URL doit pointer vers un serveur compatible
+Redis (redis://...) pour partager cache et version ; en cas d'indisponibilité du
+serveur on retombe sur le calcul direct.
+
+Avec un réplica en lecture (READ_DATABASE_URL), un résultat recalculé juste
+après une invalidation pourrait l'être sur un réplica qui n'a pas encore rejoué
+l'écriture, et rester en cache sous la nouvelle version : pendant
+DB_REPLICA_MAX_LAG + DB_REPLICA_CHECK_INTERVAL secondes après chaque changement
+de version, les recalculs se font sur la base principale.
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import date
+from typing import Any, Callable, Dict, Optional
+
+from fastapi.params import Param
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from database.database import (
+    DB_REPLICA_CHECK_INTERVAL,
+    DB_REPLICA_MAX_LAG,
+    SessionLocal,
+    lectures_sur_principale,
+    read_engine,
+)
+
+try:
+    import redis
+except ImportError:  # dépendance optionnelle
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+CACHE_TTL_SECONDS = int(os.getenv("REPORT_CACHE_TTL", "300"))
+CACHE_MAX_ENTRIES = int(os.getenv("REPORT_CACHE_MAX_ENTRIES", "512"))
+CACHE_URL = os.getenv("REPORT_CACHE_URL", "")
+
+_VERSION_KEY = "rapports:version"
+
+# Durée pendant laquelle un réplica peut encore ignorer la dernière écriture
+_FENETRE_PRINCIPALE = DB_REPLICA_MAX_LAG + DB_REPLICA_CHECK_INTERVAL
+
+
+class MemoryCacheBackend:
+    """LRU en mémoire avec durée de vie, propre au processus"""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # Compteurs (version) gardés à part pour ne jamais être évincés par le LRU
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key in self._counters:
+                return self._counters[key]
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expire_at, value = entry
+            if expire_at is not None and expire_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        expire_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (expire_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def compteur(self, key: str) -> int:
+        with self._lock:
+            return self._counters.get(key, 0)
+
+
+class RedisCacheBackend:
+    """Cache partagé sur un serveur compatible Redis (valeurs sérialisées avec pickle)"""
+
+    def __init__(self, url: str):
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self._client.get(key)
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        self._client.set(key, pickle.dumps(value), ex=ttl or None)
+
+    def incr(self, key: str) -> int:
+        return int(self._client.incr(key))
+
+    def compteur(self, key: str) -> int:
+        # INCR stocke un entier brut (b"3"), pas une valeur pickle : lu sans get()
+        raw = self._client.get(key)
+        return int(raw) if raw is not None else 0
+
+
+def _create_backend():
+    if CACHE_URL:
+        if redis is None:
+            logger.warning("REPORT_CACHE_URL défini mais le paquet redis n'est pas installé : cache en mémoire")
+        else:
+            return RedisCacheBackend(CACHE_URL)
+    if int(os.getenv("WEB_CONCURRENCY", "1") or 1) > 1:
+        logger.warning(
+            "Cache des rapports en mémoire avec plusieurs workers (WEB_CONCURRENCY) : "
+            "une écriture n'invalide que le cache de son worker, définir REPORT_CACHE_URL"
+        )
+    return MemoryCacheBackend()
+
+
+_backend = _create_backend()
+_stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0, "errors": 0})
+_stats_lock = threading.Lock()
+# Dernière version vue par le processus et date à laquelle elle l'a été
+_version_vue = {"version": None, "vue_a": 0.0}
+
+
+def set_backend(backend) -> None:
+    """Remplace le stockage du cache (ex. autre serveur compatible Redis)"""
+    global _backend
+    _backend = backend
+
+
+def _compter(espace: str, champ: str) -> None:
+    with _stats_lock:
+        _stats[espace][champ] += 1
+
+
+def get_cache_stats() -> dict:
+    """Compteurs de succès / échecs par espace de cache"""
+    with _stats_lock:
+        espaces = {nom: dict(valeurs) for nom, valeurs in _stats.items()}
+    return {
+        "backend": type(_backend).__name__,
+        "ttl_seconds": CACHE_TTL_SECONDS,
+        "version": _version_courante(),
+        "espaces": espaces,
+    }
+
+
+def _version_courante() -> int:
+    try:
+        return _backend.compteur(_VERSION_KEY)
+    except Exception as e:
+        logger.warning(f"Cache des rapports indisponible: {e}")
+        return -1
+
+
+def _recalcul_sur_principale(version: int) -> bool:
+    """
+    Vrai pendant _FENETRE_PRINCIPALE après que le processus a vu la version changer.
+    La fenêtre part du moment où le changement est observé, jamais avant l'écriture.
+    """
+    if read_engine is None:
+        return False
+    maintenant = time.monotonic()
+    with _stats_lock:
+        if _version_vue["version"] != version:
+            _version_vue.update(version=version, vue_a=maintenant)
+        return maintenant - _version_vue["vue_a"] < _FENETRE_PRINCIPALE
+
+
+def _calculer_sur_principale(func: Callable, bound: inspect.BoundArguments):
+    """Appelle func en remplaçant les sessions du réplica par des sessions sur la base principale"""
+    sessions = []
+    for nom, valeur in list(bound.arguments.items()):
+        if isinstance(valeur, Session) and valeur.get_bind() is read_engine:
+            bound.arguments[nom] = SessionLocal()
+            sessions.append(bound.arguments[nom])
+    try:
+        with lectures_sur_principale():
+            return func(*bound.args, **bound.kwargs)
+    finally:
+        for session in sessions:
+            session.close()
+
+
+def invalider_cache_rapports() -> None:
+    """Rend obsolètes toutes les entrées en incrémentant la version"""
+    try:
+        _backend.incr(_VERSION_KEY)
+    except Exception as e:
+        logger.warning(f"Impossible d'invalider le cache des rapports: {e}")
+
+
+def invalider_apres_commit(db: Session) -> None:
+    """
+    Programme l'invalidation du cache après le commit de la transaction courante,
+    pour qu'aucune requête concurrente ne remette en cache les données d'avant l'écriture.
+    """
+    if db.info.get("invalider_cache_rapports"):
+        return
+    db.info["invalider_cache_rapports"] = True
+
+    def _apres_commit(session):
+        session.info.pop("invalider_cache_rapports", None)
+        invalider_cache_rapports()
+
+    event.listen(db, "after_commit", _apres_commit, once=True)
+
+
+def _cle(espace: str, func: Callable, arguments: Dict[str, Any], version: int) -> str:
+    # La date du jour fait partie de la clé : les périodes par défaut ("aujourd'hui", "ce mois") en dépendent
+    filtres = json.dumps({"jour": date.today(), **arguments}, sort_keys=True, default=str)
+    empreinte = hashlib.sha1(filtres.encode("utf-8")).hexdigest()
+    return f"{espace}:v{version}:{func.__name__}:{empreinte}"
+
+
+def cached_report(
+    espace: str,
+    ignorer_si: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    ttl: Optional[int] = None,
+):
+    """
+    Décorateur pour les endpoints synchrones de rapport. La clé est construite à
+    partir des paramètres de l'appel (hors session) ; `ignorer_si` permet de
+    contourner le cache pour certains appels (ex. ?profile=1) et `ttl` de
+    remplacer la durée de vie par défaut (REPORT_CACHE_TTL).
+    """
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = {
+                nom: (valeur.default if isinstance(valeur, Param) else valeur)
+                for nom, valeur in bound.arguments.items()
+                if not isinstance(valeur, Session)
+            }
+            if ignorer_si and ignorer_si(arguments):
+                return func(*args, **kwargs)
+
+            version = _version_courante()
+            if version < 0:
+                _compter(espace, "errors")
+                return func(*args, **kwargs)
+
+            cle = _cle(espace, func, arguments, version)
+            try:
+                resultat = _backend.get(cle)
+            except Exception as e:
+                logger.warning(f"Lecture du cache des rapports impossible: {e}")
+                _compter(espace, "errors")
+                return func(*args, **kwargs)
+            if resultat is not None:
+                _compter(espace, "hits")
+                return resultat
+
+            _compter(espace, "misses")
+            if _recalcul_sur_principale(version):
+                resultat = _calculer_sur_principale(func, bound)
+            else:
+                resultat = func(*args, **kwargs)
+            try:
+                _backend.set(cle, resultat, ttl or CACHE_TTL_SECONDS)
+            except Exception as e:
+                logger.warning(f"Écriture du cache des rapports impossible: {e}")
+                _compter(espace, "errors")
+            return resultat
+
+        return wrapper
+
+    return decorator
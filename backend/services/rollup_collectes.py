@@ -0,0 +1,257 @@
+"""
+Cumul journalier des collectes (table collecte_daily_rollup) utilisé par les rapports
+"""
+
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, func, literal, select, text, union_all
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from database.models import CollecteDailyRollup, InfoCollecte, StatutCollecteEnum
+from services.plages_dates import filtre_jour
+
+RollupKey = Tuple[date, int, int, str]
+
+# Espace des verrous consultatifs par clé de cumul (pg_advisory_xact_lock(espace, hash))
+_ROLLUP_LOCK_SPACE = 720_003
+
+# Sous-requête triée : les verrous sont toujours pris dans le même ordre
+_VERROUS_SQL = """
+    SELECT pg_advisory_xact_lock(:espace, s.h)
+    FROM (SELECT DISTINCT hashtext(unnest(CAST(:cles AS text[]))) AS h ORDER BY 1) s
+"""
+
+# Cumul recalculé depuis info_collecte, mêmes colonnes que collecte_daily_rollup
+_CUMUL_BRUT_SQL = """
+    SELECT
+        date(ic.date_collecte) AS jour,
+        ic.collecteur_id,
+        ic.taxe_id,
+        ic.type_paiement,
+        COALESCE(SUM(ic.montant), 0) AS montant_total,
+        COUNT(*) AS nombre_transactions
+    FROM info_collecte ic
+    WHERE ic.statut = 'completed'
+      AND ic.annule = FALSE
+    GROUP BY date(ic.date_collecte), ic.collecteur_id, ic.taxe_id, ic.type_paiement
+"""
+
+
+@dataclass
+class EcartRollup:
+    jour: date
+    collecteur_id: int
+    taxe_id: int
+    type_paiement: str
+    montant_total: Optional[Decimal]
+    montant_total_brut: Optional[Decimal]
+    nombre_transactions: Optional[int]
+    nombre_transactions_brut: Optional[int]
+
+
+def _enum_value(value) -> str:
+    return value.value if hasattr(value, "value") else value
+
+
+def rollup_key(collecte: InfoCollecte) -> Optional[RollupKey]:
+    """Clé de cumul (jour, collecteur, taxe, type de paiement) d'une collecte"""
+    if collecte.date_collecte is None:
+        return None
+    return (
+        collecte.date_collecte.date(),
+        collecte.collecteur_id,
+        collecte.taxe_id,
+        _enum_value(collecte.type_paiement),
+    )
+
+
+def refresh_rollup_keys(db: Session, keys: Iterable[Optional[RollupKey]]) -> None:
+    """
+    Recalcule les lignes de cumul des clés données à partir de info_collecte,
+    dans la transaction courante. Chaque clé ne couvre qu'une journée d'un
+    collecteur pour une taxe, le recalcul reste donc borné.
+    """
+    keys = {key for key in keys if key is not None}
+    if not keys:
+        return
+
+    db.flush()
+    # Une transaction concurrente sur la même clé attend ici le commit de la
+    # première, puis recalcule avec un instantané qui voit ses collectes
+    db.execute(
+        text(_VERROUS_SQL),
+        {"espace": _ROLLUP_LOCK_SPACE, "cles": ["|".join(str(part) for part in key) for key in keys]},
+    ).all()
+    for jour, collecteur_id, taxe_id, type_paiement in keys:
+        nombre, montant = db.query(
+            func.count(InfoCollecte.id),
+            func.coalesce(func.sum(InfoCollecte.montant), 0),
+        ).filter(
+            InfoCollecte.collecteur_id == collecteur_id,
+            InfoCollecte.taxe_id == taxe_id,
+            InfoCollecte.type_paiement == type_paiement,
+            InfoCollecte.statut == StatutCollecteEnum.COMPLETED,
+            InfoCollecte.annule == False,
+            filtre_jour(InfoCollecte.date_collecte, jour),
+        ).one()
+
+        key_filter = and_(
+            CollecteDailyRollup.jour == jour,
+            CollecteDailyRollup.collecteur_id == collecteur_id,
+            CollecteDailyRollup.taxe_id == taxe_id,
+            CollecteDailyRollup.type_paiement == type_paiement,
+        )
+        if not nombre:
+            db.execute(delete(CollecteDailyRollup).where(key_filter))
+            continue
+
+        stmt = insert(CollecteDailyRollup).values(
+            jour=jour,
+            collecteur_id=collecteur_id,
+            taxe_id=taxe_id,
+            type_paiement=type_paiement,
+            montant_total=montant,
+            nombre_transactions=nombre,
+            updated_at=datetime.utcnow(),
+        )
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["jour", "collecteur_id", "taxe_id", "type_paiement"],
+            set_={
+                "montant_total": stmt.excluded.montant_total,
+                "nombre_transactions": stmt.excluded.nombre_transactions,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        ))
+
+
+def _filtre_jours(depuis: Optional[date], jusqu_a: Optional[date]) -> Tuple[str, dict]:
+    conditions = []
+    params = {}
+    if depuis:
+        conditions.append("jour >= :depuis")
+        params["depuis"] = depuis
+    if jusqu_a:
+        conditions.append("jour <= :jusqu_a")
+        params["jusqu_a"] = jusqu_a
+    return (" WHERE " + " AND ".join(conditions) if conditions else ""), params
+
+
+def rebuild_rollup(db: Session, depuis: Optional[date] = None, jusqu_a: Optional[date] = None) -> int:
+    """
+    Reconstruit le cumul (entièrement ou sur une plage de jours) et valide la transaction.
+    Retourne le nombre de lignes de cumul écrites.
+    """
+    where, params = _filtre_jours(depuis, jusqu_a)
+
+    # Les mises à jour incrémentales attendent la fin de la reconstruction
+    # (et celle-ci attend celles déjà écrites) : aucune n'est écrasée
+    db.execute(text("LOCK TABLE collecte_daily_rollup IN SHARE ROW EXCLUSIVE MODE"))
+    db.execute(text(f"DELETE FROM collecte_daily_rollup{where}"), params)
+    result = db.execute(text(f"""
+        INSERT INTO collecte_daily_rollup
+            (jour, collecteur_id, taxe_id, type_paiement, montant_total, nombre_transactions, updated_at)
+        SELECT jour, collecteur_id, taxe_id, type_paiement, montant_total, nombre_transactions, now()
+        FROM ({_CUMUL_BRUT_SQL}) agg{where}
+    """), params)
+    db.commit()
+    return result.rowcount
+
+
+def comparer_rollup(
+    db: Session, depuis: Optional[date] = None, jusqu_a: Optional[date] = None
+) -> List[EcartRollup]:
+    """
+    Compare le cumul à celui recalculé depuis info_collecte (jours passés et
+    journée en cours) et retourne les clés en écart, absentes d'un côté ou de
+    l'autre comprises. Une liste vide signifie que les rapports lus dans le
+    cumul sont identiques à ceux calculés sur les collectes.
+    """
+    where, params = _filtre_jours(depuis, jusqu_a)
+    lignes = db.execute(text(f"""
+        SELECT
+            jour, collecteur_id, taxe_id, type_paiement,
+            r.montant_total, a.montant_total AS montant_total_brut,
+            r.nombre_transactions, a.nombre_transactions AS nombre_transactions_brut
+        FROM (SELECT * FROM collecte_daily_rollup{where}) r
+        FULL OUTER JOIN (SELECT * FROM ({_CUMUL_BRUT_SQL}) agg{where}) a
+            USING (jour, collecteur_id, taxe_id, type_paiement)
+        WHERE r.montant_total IS DISTINCT FROM a.montant_total
+           OR r.nombre_transactions IS DISTINCT FROM a.nombre_transactions
+        ORDER BY jour, collecteur_id, taxe_id, type_paiement
+    """), params).all()
+    return [
+        EcartRollup(
+            jour=ligne.jour,
+            collecteur_id=ligne.collecteur_id,
+            taxe_id=ligne.taxe_id,
+            type_paiement=ligne.type_paiement,
+            montant_total=ligne.montant_total,
+            montant_total_brut=ligne.montant_total_brut,
+            nombre_transactions=ligne.nombre_transactions,
+            nombre_transactions_brut=ligne.nombre_transactions_brut,
+        )
+        for ligne in lignes
+    ]
+
+
+def rollup_source(
+    date_debut: Optional[date] = None,
+    date_fin: Optional[date] = None,
+    collecteur_id: Optional[int] = None,
+    taxe_id: Optional[int] = None,
+):
+    """
+    Sous-requête (jour, collecteur_id, taxe_id, type_paiement, montant_total, nombre_transactions)
+    couvrant la période demandée : les journées passées sont lues dans le cumul, la journée
+    en cours (partielle) est agrégée directement depuis info_collecte.
+    """
+    aujourd_hui = date.today()
+
+    rollup = select(
+        CollecteDailyRollup.jour.label("jour"),
+        CollecteDailyRollup.collecteur_id.label("collecteur_id"),
+        CollecteDailyRollup.taxe_id.label("taxe_id"),
+        CollecteDailyRollup.type_paiement.label("type_paiement"),
+        CollecteDailyRollup.montant_total.label("montant_total"),
+        CollecteDailyRollup.nombre_transactions.label("nombre_transactions"),
+    ).where(CollecteDailyRollup.jour != aujourd_hui)
+    if date_debut:
+        rollup = rollup.where(CollecteDailyRollup.jour >= date_debut)
+    if date_fin:
+        rollup = rollup.where(CollecteDailyRollup.jour <= date_fin)
+    if collecteur_id:
+        rollup = rollup.where(CollecteDailyRollup.collecteur_id == collecteur_id)
+    if taxe_id:
+        rollup = rollup.where(CollecteDailyRollup.taxe_id == taxe_id)
+
+    inclut_aujourd_hui = (not date_debut or date_debut <= aujourd_hui) and (not date_fin or date_fin >= aujourd_hui)
+    if not inclut_aujourd_hui:
+        return rollup.subquery("collectes_jour")
+
+    courant = select(
+        literal(aujourd_hui).label("jour"),
+        InfoCollecte.collecteur_id,
+        InfoCollecte.taxe_id,
+        InfoCollecte.type_paiement,
+        func.coalesce(func.sum(InfoCollecte.montant), 0).label("montant_total"),
+        func.count(InfoCollecte.id).label("nombre_transactions"),
+    ).where(
+        InfoCollecte.statut == StatutCollecteEnum.COMPLETED,
+        InfoCollecte.annule == False,
+        filtre_jour(InfoCollecte.date_collecte, aujourd_hui),
+    )
+    if collecteur_id:
+        courant = courant.where(InfoCollecte.collecteur_id == collecteur_id)
+    if taxe_id:
+        courant = courant.where(InfoCollecte.taxe_id == taxe_id)
+    courant = courant.group_by(
+        InfoCollecte.collecteur_id,
+        InfoCollecte.taxe_id,
+        InfoCollecte.type_paiement,
+    )
+
+    return union_all(rollup, courant).subquery("collectes_jour")
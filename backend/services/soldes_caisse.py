@@ -0,0 +1,139 @@
+"""
+Cumuls des opérations de caisse (total des entrées, des sorties, nombre d'opérations)
+
+Les cumuls sont stockés sur la caisse et mis à jour dans la même transaction que
+l'opération qui les modifie : l'état d'une caisse (GET /api/caisses/{id}/etat) se
+lit sans parcourir son historique. reconcilier_cumuls compare ces cumuls au
+registre des opérations (scripts/reconcilier_caisses.py).
+
+Toute opération commence par verrouiller_caisse (SELECT ... FOR UPDATE) : les
+opérations sur une même caisse (mobile et back-office) s'exécutent l'une après
+l'autre, chacune partant du solde laissé par la précédente.
+"""
+
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from database.models import Caisse, TypeOperationCaisseEnum
+
+# Opérations comptées dans les entrées / les sorties (les ajustements et clôtures ne le sont pas)
+OPERATIONS_ENTREE = (TypeOperationCaisseEnum.ENTREE, TypeOperationCaisseEnum.OUVERTURE)
+OPERATIONS_SORTIE = (TypeOperationCaisseEnum.SORTIE, TypeOperationCaisseEnum.FERMETURE)
+
+_CUMULS_REGISTRE_SQL = """
+    SELECT
+        caisse_id,
+        COALESCE(SUM(montant) FILTER (WHERE type_operation IN ('entree', 'ouverture')), 0) AS total_entrees,
+        COALESCE(SUM(montant) FILTER (WHERE type_operation IN ('sortie', 'fermeture')), 0) AS total_sorties,
+        COUNT(*) AS nombre_operations
+    FROM operation_caisse
+    GROUP BY caisse_id
+"""
+
+
+@dataclass
+class EcartCaisse:
+    caisse_id: int
+    code: str
+    total_entrees: Decimal
+    total_entrees_registre: Decimal
+    total_sorties: Decimal
+    total_sorties_registre: Decimal
+    nombre_operations: int
+    nombre_operations_registre: int
+
+
+def verrouiller_caisse(db: Session, caisse_id: int) -> Optional[Caisse]:
+    """
+    Charge la caisse en posant un verrou sur sa ligne jusqu'à la fin de la
+    transaction ; une opération concurrente attend ici et relit ensuite le solde
+    et l'état à jour.
+    """
+    return (
+        db.query(Caisse)
+        .filter(Caisse.id == caisse_id)
+        .populate_existing()
+        .with_for_update()
+        .first()
+    )
+
+
+def cumuler_operation(caisse: Caisse, type_operation, montant: Decimal) -> None:
+    """
+    Ajoute une opération aux cumuls de la caisse. Les cumuls sont incrémentés par
+    l'UPDATE émis au flush (total = total + montant) : deux opérations simultanées
+    ne peuvent pas écraser l'incrément de l'autre.
+    """
+    type_operation = TypeOperationCaisseEnum(type_operation)
+    if type_operation in OPERATIONS_ENTREE:
+        caisse.total_entrees = Caisse.total_entrees + montant
+    elif type_operation in OPERATIONS_SORTIE:
+        caisse.total_sorties = Caisse.total_sorties + montant
+    caisse.nombre_operations = Caisse.nombre_operations + 1
+
+
+def reconcilier_cumuls(
+    db: Session, caisse_id: Optional[int] = None, corriger: bool = False
+) -> List[EcartCaisse]:
+    """
+    Compare les cumuls stockés de chaque caisse (ou d'une seule) à ceux recalculés
+    depuis operation_caisse et retourne les écarts. Avec corriger=True, les cumuls
+    en écart sont remplacés par ceux du registre et la transaction est validée.
+    """
+    lignes = db.execute(
+        text(f"""
+            SELECT
+                c.id, c.code,
+                c.total_entrees, c.total_sorties, c.nombre_operations,
+                COALESCE(r.total_entrees, 0) AS total_entrees_registre,
+                COALESCE(r.total_sorties, 0) AS total_sorties_registre,
+                COALESCE(r.nombre_operations, 0) AS nombre_operations_registre
+            FROM caisse c
+            LEFT JOIN ({_CUMULS_REGISTRE_SQL}) r ON r.caisse_id = c.id
+            WHERE (CAST(:caisse_id AS integer) IS NULL OR c.id = :caisse_id)
+              AND (
+                  c.total_entrees IS DISTINCT FROM COALESCE(r.total_entrees, 0)
+                  OR c.total_sorties IS DISTINCT FROM COALESCE(r.total_sorties, 0)
+                  OR c.nombre_operations IS DISTINCT FROM COALESCE(r.nombre_operations, 0)
+              )
+            ORDER BY c.id
+        """),
+        {"caisse_id": caisse_id},
+    ).all()
+    ecarts = [
+        EcartCaisse(
+            caisse_id=ligne.id,
+            code=ligne.code,
+            total_entrees=ligne.total_entrees,
+            total_entrees_registre=ligne.total_entrees_registre,
+            total_sorties=ligne.total_sorties,
+            total_sorties_registre=ligne.total_sorties_registre,
+            nombre_operations=ligne.nombre_operations,
+            nombre_operations_registre=ligne.nombre_operations_registre,
+        )
+        for ligne in lignes
+    ]
+
+    if corriger and ecarts:
+        ids = [ecart.caisse_id for ecart in ecarts]
+        # Verrouiller d'abord les caisses : les opérations en cours se terminent avant
+        # le recalcul, et aucune ne peut s'insérer entre le recalcul et l'écriture
+        db.execute(text("SELECT id FROM caisse WHERE id = ANY(:ids) ORDER BY id FOR UPDATE"), {"ids": ids})
+        db.execute(
+            text(f"""
+                UPDATE caisse c SET
+                    total_entrees = COALESCE(r.total_entrees, 0),
+                    total_sorties = COALESCE(r.total_sorties, 0),
+                    nombre_operations = COALESCE(r.nombre_operations, 0)
+                FROM caisse c2
+                LEFT JOIN ({_CUMULS_REGISTRE_SQL}) r ON r.caisse_id = c2.id
+                WHERE c.id = c2.id AND c.id = ANY(:ids)
+            """),
+            {"ids": ids},
+        )
+        db.commit()
+    return ecarts
@@ -0,0 +1,55 @@
+"""
+Comptage et chronométrage des requêtes SQL émises par une session
+(utilisé par le paramètre de débogage ?profile=1 des rapports)
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+class ProfilSQL:
+    """Nombre de requêtes exécutées et durées mesurées pendant le bloc profilé"""
+
+    def __init__(self):
+        self.requetes = 0
+        self.duree_sql = 0.0
+        self.duree_totale = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "requetes_sql": self.requetes,
+            "duree_sql_ms": round(self.duree_sql * 1000, 2),
+            "duree_totale_ms": round(self.duree_totale * 1000, 2),
+        }
+
+
+@contextmanager
+def profiler_sql(db: Session) -> Iterator[ProfilSQL]:
+    """
+    Écoute la connexion de la session (et seulement elle, les autres requêtes
+    concurrentes ne sont pas comptées) pendant la durée du bloc.
+    """
+    profil = ProfilSQL()
+    connection = db.connection()
+
+    def avant(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("profil_sql_debut", []).append(time.perf_counter())
+
+    def apres(conn, cursor, statement, parameters, context, executemany):
+        debut = conn.info["profil_sql_debut"].pop()
+        profil.requetes += 1
+        profil.duree_sql += time.perf_counter() - debut
+
+    event.listen(connection, "before_cursor_execute", avant)
+    event.listen(connection, "after_cursor_execute", apres)
+    debut_total = time.perf_counter()
+    try:
+        yield profil
+    finally:
+        profil.duree_totale = time.perf_counter() - debut_total
+        event.remove(connection, "before_cursor_execute", avant)
+        event.remove(connection, "after_cursor_execute", apres)
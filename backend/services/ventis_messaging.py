@@ -5,14 +5,45 @@ Intégration pour l'envoi automatique de SMS dans le système de relances
 
 import httpx
 import asyncio
-from typing import Dict, Any, Optional
+import json
+import tempfile
+import weakref
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional
 import os
 from datetime import datetime
 import time
 import logging
 
+from services.clients_http import client_partage
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou entre processus
+    fcntl = None
+
 logger = logging.getLogger(__name__)
 
+# Token partagé entre les processus workers ("" pour désactiver)
+TOKEN_CACHE_FILE = os.getenv(
+    "VENTIS_TOKEN_CACHE_FILE", os.path.join(tempfile.gettempdir(), "ventis_keycloak_token.json")
+)
+# Renouvellement anticipé : secondes avant l'expiration (déjà fixée à 90 % de la durée de vie)
+TOKEN_MARGE_RAFRAICHISSEMENT = int(os.getenv("VENTIS_TOKEN_REFRESH_MARGIN", "30"))
+
+# Disjoncteur par endpoint : délai avant de revérifier un endpoint introuvable (404),
+# nombre d'erreurs serveur consécutives avant ouverture et durée d'ouverture (secondes)
+ENDPOINT_REVERIFICATION = int(os.getenv("VENTIS_ENDPOINT_REPROBE", "600"))
+ENDPOINT_ECHECS_MAX = int(os.getenv("VENTIS_ENDPOINT_FAILURES", "5"))
+ENDPOINT_DELAI_DISJONCTEUR = int(os.getenv("VENTIS_ENDPOINT_COOLDOWN", "30"))
+
+
+@dataclass
+class DisjoncteurEndpoint:
+    raison: str  # "absent" (404) ou "erreurs" (5xx, réseau)
+    echecs: int = 0
+    ouvert_jusqua: float = 0.0
+
 
 class VentisMessagingService:
     """Service pour interagir avec l'API externe Ventis Messaging"""
@@ -52,33 +83,142 @@ class VentisMessagingService:
             logger.warning("KEYCLOAK_MESSAGING_CLIENT_SECRET n'est pas configuré. Cela peut causer des erreurs d'authentification si requis par Keycloak.")
         self.verify_ssl = os.getenv("KEYCLOAK_VERIFY_SSL", "false").lower() == "true"
         
+        # Client HTTP partagé pour Keycloak et l'API (connexions réutilisées entre les envois)
+        self._http = client_partage("ventis", verify=self.verify_ssl)
+        
         # Token d'accès (sera récupéré dynamiquement)
         self.access_token: Optional[str] = None
         self.token_expiry: Optional[float] = None
+        # Récupération en cours, partagée par tous les appels d'une même boucle asyncio
+        self._recuperations: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Task]" = weakref.WeakKeyDictionary()
+        # Découverte de l'endpoint d'envoi : dernier endpoint qui a fonctionné et disjoncteurs
+        self._endpoint_actif: Optional[str] = None
+        self._disjoncteurs: Dict[str, DisjoncteurEndpoint] = {}
+        # Le token enregistré n'est réutilisé que pour le même compte
+        self._cle_jeton = f"{self.keycloak_host}|{self.keycloak_realm}|{self.client_id}|{self.username}"
         
         # Mode debug
         self.debug_mode = os.getenv("VENTIS_DEBUG", "false").lower() == "true"
         
         logger.info(f"VentisMessagingService initialisé - API URL: {self.base_url}")
 
-    async def get_access_token(self, force_refresh: bool = False) -> Optional[str]:
+    def _jeton_valide(self) -> bool:
+        return bool(self.access_token and self.token_expiry and time.time() < self.token_expiry)
+
+    def _lire_jeton_persistant(self) -> bool:
+        """Reprend le token enregistré par un autre processus s'il est encore valide"""
+        if not TOKEN_CACHE_FILE:
+            return False
+        try:
+            with open(TOKEN_CACHE_FILE, "r", encoding="utf-8") as f:
+                donnees = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if donnees.get("cle") != self._cle_jeton or not donnees.get("access_token"):
+            return False
+        if float(donnees.get("expiry") or 0) <= time.time():
+            return False
+        self.access_token = donnees["access_token"]
+        self.token_expiry = float(donnees["expiry"])
+        return True
+
+    def _ecrire_jeton_persistant(self) -> None:
+        if not TOKEN_CACHE_FILE or not self.access_token:
+            return
+        temporaire = f"{TOKEN_CACHE_FILE}.{os.getpid()}.tmp"
+        try:
+            descripteur = os.open(temporaire, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(descripteur, "w", encoding="utf-8") as f:
+                json.dump({"cle": self._cle_jeton, "access_token": self.access_token, "expiry": self.token_expiry}, f)
+            os.replace(temporaire, TOKEN_CACHE_FILE)
+        except OSError as e:
+            logger.warning(f"Impossible d'enregistrer le token Keycloak: {e}")
+
+    def _verrouiller_entre_processus(self):
+        """Verrou de fichier bloquant (POSIX) : un seul processus se connecte à Keycloak à la fois"""
+        if not TOKEN_CACHE_FILE or fcntl is None:
+            return None
+        try:
+            verrou = open(f"{TOKEN_CACHE_FILE}.lock", "a")
+            fcntl.flock(verrou.fileno(), fcntl.LOCK_EX)
+            return verrou
+        except OSError as e:
+            logger.warning(f"Verrou du token Keycloak indisponible: {e}")
+            return None
+
+    async def get_access_token(self, force_refresh: bool = False, token_rejete: Optional[str] = None) -> Optional[str]:
         """
         Récupère un token d'accès OAuth2 depuis Keycloak
         Utilise le grant type 'password' (Resource Owner Password Credentials)
+
+        Les demandes simultanées partagent une seule récupération (par boucle
+        asyncio), et un token déjà renouvelé par un autre appel ou un autre
+        processus est réutilisé : `token_rejete` est le token refusé (401) qui a
+        motivé la demande, un token différent et valide est donc accepté.
         """
         # Si le token existe et n'est pas expiré, le retourner
-        if not force_refresh and self.access_token and self.token_expiry and time.time() < self.token_expiry:
+        if self._jeton_valide() and (not force_refresh or (token_rejete and self.access_token != token_rejete)):
             if self.debug_mode:
                 remaining_time = int(self.token_expiry - time.time())
                 logger.debug(f"Utilisation du token existant (expire dans {remaining_time}s)")
             return self.access_token
 
+        # Token enregistré par un autre processus
+        if self._lire_jeton_persistant() and (not force_refresh or self.access_token != token_rejete):
+            return self.access_token
+
+        boucle = asyncio.get_running_loop()
+        tache = self._recuperations.get(boucle)
+        if tache is None or tache.done():
+            tache = boucle.create_task(self._recuperer_jeton(token_rejete if force_refresh else None))
+            self._recuperations[boucle] = tache
+        return await asyncio.shield(tache)
+
+    async def _recuperer_jeton(self, token_rejete: Optional[str]) -> Optional[str]:
+        verrou = await asyncio.to_thread(self._verrouiller_entre_processus)
+        try:
+            # Un autre processus a pu renouveler le token pendant l'attente du verrou
+            if self._lire_jeton_persistant() and self.access_token != token_rejete:
+                return self.access_token
+            token = await self._demander_jeton_keycloak()
+            if token:
+                self._ecrire_jeton_persistant()
+            elif token_rejete and self.access_token == token_rejete:
+                # Ne plus présenter un token refusé
+                self.access_token = None
+                self.token_expiry = None
+            return token
+        finally:
+            if verrou is not None:
+                verrou.close()
+
+    async def rafraichir_jeton_en_continu(self) -> None:
+        """
+        Renouvelle le token avant son expiration, pour que les envois ne
+        l'attendent jamais ; lancée au démarrage de l'application, elle ne fait
+        rien tant qu'aucun token n'a été demandé.
+        """
+        while True:
+            try:
+                if not (self.access_token and self.token_expiry):
+                    await asyncio.sleep(30)
+                    continue
+                attente = self.token_expiry - TOKEN_MARGE_RAFRAICHISSEMENT - time.time()
+                if attente > 0:
+                    await asyncio.sleep(min(attente, 300))
+                    continue
+                if not await self.get_access_token(force_refresh=True, token_rejete=self.access_token):
+                    await asyncio.sleep(30)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Renouvellement anticipé du token Keycloak impossible: {e}")
+                await asyncio.sleep(30)
+
+    async def _demander_jeton_keycloak(self) -> Optional[str]:
+        """Demande un nouveau token à Keycloak"""
         logger.info("Récupération d'un nouveau token d'accès Keycloak...")
         
-        # Invalider le token actuel
-        self.access_token = None
-        self.token_expiry = None
-        
         # Construire l'URL du token endpoint
         token_url = f"{self.keycloak_host}/realms/{self.keycloak_realm}/protocol/openid-connect/token"
         
@@ -99,7 +239,7 @@ class VentisMessagingService:
         }
         
         try:
-            async with httpx.AsyncClient(verify=self.verify_ssl) as client:
+            async with self._http.client() as client:
                 response = await client.post(
                     token_url,
                     data=data,
@@ -190,7 +330,7 @@ class VentisMessagingService:
     ) -> tuple[bool, Dict[str, Any]]:
         """Tente d'envoyer un message via un endpoint spécifique"""
         try:
-            async with httpx.AsyncClient(verify=self.verify_ssl) as client:
+            async with self._http.client() as client:
                 response = await client.post(
                     endpoint,
                     json=payload,
@@ -206,7 +346,8 @@ class VentisMessagingService:
                     logger.warning("Erreur 401 - Token expiré, récupération d'un nouveau token...")
                     
                     # Forcer le refresh du token
-                    new_token = await self.get_access_token(force_refresh=True)
+                    token_rejete = headers.get('Authorization', '')[len('Bearer '):]
+                    new_token = await self.get_access_token(force_refresh=True, token_rejete=token_rejete)
                     
                     if new_token:
                         # Mettre à jour le header avec le nouveau token
@@ -250,6 +391,78 @@ class VentisMessagingService:
                 'error': str(e)
             }
 
+    def _endpoints_candidats(self) -> List[str]:
+        """Endpoint principal puis alternatives, par ordre de préférence"""
+        candidats = [f"{self.base_url}/message"]
+        for alt_path in self.alternative_endpoints:
+            if alt_path == "/message":  # Déjà en tête
+                continue
+            candidats.append(f"{self.base_url.rsplit('/', 1)[0]}{alt_path}")
+        return candidats
+
+    def _endpoints_a_essayer(self) -> List[str]:
+        """
+        Endpoint qui a fonctionné en dernier en premier (un seul appel en régime
+        établi), puis les autres endpoints dont le disjoncteur est fermé ou dont
+        le délai de nouvelle vérification est écoulé. L'endpoint principal est
+        revérifié en premier à chaque échéance, pour y revenir s'il est rétabli.
+        """
+        maintenant = time.monotonic()
+        candidats = self._endpoints_candidats()
+        disponibles = [
+            e for e in candidats
+            if e not in self._disjoncteurs or self._disjoncteurs[e].ouvert_jusqua <= maintenant
+        ]
+        actif = self._endpoint_actif if self._endpoint_actif in disponibles else None
+        principal = candidats[0]
+        if actif and actif != principal and principal in disponibles and principal in self._disjoncteurs:
+            # Nouvelle vérification de l'endpoint principal (une seule, puis retour à l'actif)
+            ordre = [principal, actif]
+        else:
+            ordre = [actif] if actif else []
+        return ordre + [e for e in disponibles if e not in ordre]
+
+    def _endpoint_reussi(self, endpoint: str) -> None:
+        self._disjoncteurs.pop(endpoint, None)
+        if self._endpoint_actif != endpoint:
+            logger.info(f"Endpoint Ventis retenu: {endpoint}")
+        self._endpoint_actif = endpoint
+
+    def _endpoint_absent(self, endpoint: str) -> None:
+        self._disjoncteurs[endpoint] = DisjoncteurEndpoint(
+            raison="absent", ouvert_jusqua=time.monotonic() + ENDPOINT_REVERIFICATION
+        )
+        if self._endpoint_actif == endpoint:
+            self._endpoint_actif = None
+
+    def _endpoint_en_erreur(self, endpoint: str, status_code: Optional[int]) -> None:
+        """Seules les erreurs serveur / réseau comptent ; une erreur 4xx prouve que l'endpoint répond"""
+        if status_code is not None and status_code < 500:
+            self._disjoncteurs.pop(endpoint, None)
+            return
+        disjoncteur = self._disjoncteurs.get(endpoint)
+        if disjoncteur is None or disjoncteur.raison != "erreurs":
+            disjoncteur = self._disjoncteurs[endpoint] = DisjoncteurEndpoint(raison="erreurs")
+        disjoncteur.echecs += 1
+        if disjoncteur.echecs >= ENDPOINT_ECHECS_MAX:
+            disjoncteur.ouvert_jusqua = time.monotonic() + ENDPOINT_DELAI_DISJONCTEUR
+            logger.warning(f"Disjoncteur ouvert pour {endpoint} ({disjoncteur.echecs} échecs consécutifs)")
+
+    def _reponse_disjoncteurs_ouverts(self) -> Dict[str, Any]:
+        if any(d.raison == "erreurs" for d in self._disjoncteurs.values()):
+            return {
+                'success': False,
+                'status_code': 503,
+                'error': 'CIRCUIT_OPEN',
+                'detail': 'API Ventis indisponible (trop d\'échecs consécutifs), nouvel essai sous peu'
+            }
+        return {
+            'success': False,
+            'status_code': 404,
+            'error': 'ENDPOINT_NOT_FOUND',
+            'detail': 'Aucun endpoint API valide trouvé. Vérifiez la documentation Ventis.'
+        }
+
     async def send_message(
         self, 
         to: str, 
@@ -300,39 +513,33 @@ class VentisMessagingService:
                 "message": message
             }
             
-            # Essayer l'endpoint principal
-            main_endpoint = f"{self.base_url}/message"
-            
-            success, result = await self.try_send_with_endpoint(
-                main_endpoint,
-                payload,
-                headers
-            )
-            
-            if success:
-                logger.info(f"SMS envoyé avec succès via {result['endpoint_used']}")
-                return result
+            # Endpoints dans l'ordre : celui qui a fonctionné en dernier, puis les autres
+            # (un endpoint au disjoncteur ouvert n'est pas essayé)
+            endpoints = self._endpoints_a_essayer()
+            if not endpoints:
+                return self._reponse_disjoncteurs_ouverts()
             
-            # Si l'endpoint principal échoue avec 404, essayer les alternatives
-            if result.get('status_code') == 404:
-                logger.warning("Endpoint principal introuvable (404), essai des alternatives...")
+            for endpoint in endpoints:
+                success, result = await self.try_send_with_endpoint(
+                    endpoint,
+                    payload,
+                    headers
+                )
                 
-                for alt_path in self.alternative_endpoints:
-                    if alt_path == "/message":  # Déjà testé
-                        continue
-                    
-                    alt_endpoint = f"{self.base_url.rsplit('/', 1)[0]}{alt_path}"
-                    
-                    success, result = await self.try_send_with_endpoint(
-                        alt_endpoint,
-                        payload,
-                        headers
-                    )
-                    
-                    if success:
-                        logger.info(f"SMS envoyé avec succès via endpoint alternatif: {result['endpoint_used']}")
-                        return result
+                if success:
+                    self._endpoint_reussi(endpoint)
+                    logger.info(f"SMS envoyé avec succès via {result['endpoint_used']}")
+                    return result
+                
+                if result.get('status_code') == 404:
+                    # Endpoint absent : essayer le suivant, et ne plus le solliciter avant la prochaine vérification
+                    self._endpoint_absent(endpoint)
+                    logger.warning(f"Endpoint Ventis introuvable (404): {endpoint}")
+                    continue
                 
+                self._endpoint_en_erreur(endpoint, result.get('status_code'))
+                break
+            else:
                 # Aucun endpoint n'a fonctionné
                 logger.error("Aucun endpoint API Ventis trouvé")
                 return {
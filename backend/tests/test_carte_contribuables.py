@@ -0,0 +1,120 @@
+"""
+Statut de paiement de la carte : le calcul sur les collectes agrégées par taxe
+doit donner le même résultat que l'ancienne boucle par contribuable, qui
+interrogeait les collectes de chaque affectation une à une.
+"""
+
+import random
+from collections import namedtuple
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from services.carte_contribuables import statut_paiement, totaux_collectes
+
+Affectation = namedtuple("Affectation", "taxe_id date_debut taxe_nom")
+# Collecte complétée et non annulée
+Collecte = namedtuple("Collecte", "taxe_id montant date_collecte")
+
+MAINTENANT = datetime(2026, 3, 17, 10, 30)
+DEBUT_MOIS = MAINTENANT.replace(day=1)
+
+
+def ancienne_boucle(affectations, collectes, debut_mois):
+    """Reproduction de l'ancienne boucle de get_contribuables_for_map pour un contribuable"""
+    a_paye = True
+    taxes_impayees = []
+    if affectations:
+        for affectation in affectations:
+            date_reference = max(affectation.date_debut, debut_mois)
+            collecte = [
+                c for c in collectes
+                if c.taxe_id == affectation.taxe_id and c.date_collecte >= date_reference
+            ]
+            if not collecte:
+                a_paye = False
+                taxes_impayees.append(affectation.taxe_nom or f"Taxe #{affectation.taxe_id}")
+    else:
+        if not [c for c in collectes if c.date_collecte >= debut_mois]:
+            a_paye = False
+
+    total_collecte = 0
+    nombre_collectes = 0
+    derniere_collecte = None
+    collectes_completes = sorted(collectes, key=lambda c: c.date_collecte, reverse=True)
+    if collectes_completes:
+        nombre_collectes = len(collectes_completes)
+        total_collecte = sum(float(c.montant) for c in collectes_completes)
+        derniere_collecte = collectes_completes[0].date_collecte.isoformat()
+    return a_paye, taxes_impayees, total_collecte, nombre_collectes, derniere_collecte
+
+
+def grouper_par_taxe(collectes):
+    """Équivalent en mémoire du GROUP BY (contribuable, taxe) de _collectes_par_contribuable_taxe"""
+    stats = {}
+    for c in collectes:
+        nombre, total, derniere = stats.get(c.taxe_id, (0, Decimal("0"), None))
+        stats[c.taxe_id] = (
+            nombre + 1,
+            total + c.montant,
+            c.date_collecte if derniere is None else max(derniere, c.date_collecte),
+        )
+    return stats
+
+
+def calcul_groupe(affectations, collectes, debut_mois):
+    stats_taxes = grouper_par_taxe(collectes)
+    a_paye, taxes_impayees = statut_paiement(affectations, stats_taxes, debut_mois)
+    return (a_paye, taxes_impayees, *totaux_collectes(stats_taxes))
+
+
+def comparer(affectations, collectes):
+    attendu = ancienne_boucle(affectations, collectes, DEBUT_MOIS)
+    obtenu = calcul_groupe(affectations, collectes, DEBUT_MOIS)
+    assert obtenu[0] == attendu[0]
+    assert obtenu[1] == attendu[1]
+    assert obtenu[2] == pytest.approx(attendu[2])
+    assert obtenu[3:] == attendu[3:]
+
+
+def test_sans_affectation_ni_collecte():
+    assert calcul_groupe([], [], DEBUT_MOIS) == (False, [], 0, 0, None)
+
+
+def test_affectation_payee_avant_son_debut():
+    """Une collecte antérieure au début de l'affectation ne la règle pas"""
+    affectations = [Affectation(1, DEBUT_MOIS + timedelta(days=10), "Patente")]
+    collectes = [Collecte(1, Decimal("5000"), DEBUT_MOIS + timedelta(days=5))]
+    comparer(affectations, collectes)
+    assert calcul_groupe(affectations, collectes, DEBUT_MOIS)[:2] == (False, ["Patente"])
+
+
+def test_collecte_a_la_date_de_reference():
+    affectations = [Affectation(1, DEBUT_MOIS - timedelta(days=40), None)]
+    collectes = [Collecte(1, Decimal("1000"), DEBUT_MOIS)]
+    comparer(affectations, collectes)
+    assert calcul_groupe(affectations, collectes, DEBUT_MOIS)[0] is True
+
+
+def test_donnees_aleatoires_identiques_a_l_ancienne_boucle():
+    rng = random.Random(20260317)
+    for _ in range(2000):
+        taxes = rng.sample(range(1, 8), rng.randint(0, 4))
+        affectations = [
+            Affectation(
+                taxe_id,
+                DEBUT_MOIS + timedelta(days=rng.randint(-90, 15), hours=rng.randint(0, 23)),
+                rng.choice([None, f"Taxe {taxe_id}"]),
+            )
+            for taxe_id in taxes
+        ]
+        collectes = [
+            Collecte(
+                rng.randint(1, 8),
+                Decimal(rng.randint(1, 500) * 100),
+                DEBUT_MOIS + timedelta(days=rng.randint(-120, 16), minutes=rng.randint(0, 1440)),
+            )
+            for _ in range(rng.randint(0, 12))
+        ]
+        comparer(affectations, collectes)
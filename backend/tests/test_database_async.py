@@ -0,0 +1,61 @@
+"""
+Accès asynchrone (asyncpg) : conversion de l'URL de connexion et, sur une vraie
+base, mêmes résultats que la session synchrone
+"""
+
+import asyncio
+
+import pytest
+from sqlalchemy import func, select
+
+from database.database import _url_asynchrone
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "postgresql://user:pass@db:5432/taxe",
+        "postgresql+psycopg2://user:pass@db:5432/taxe",
+        "postgres://user:pass@db:5432/taxe",
+    ],
+)
+def test_url_asynchrone_change_de_pilote(url):
+    assert _url_asynchrone(url) == ("postgresql+asyncpg://user:pass@db:5432/taxe", {})
+
+
+def test_url_asynchrone_sslmode_devient_argument_ssl():
+    url, connect_args = _url_asynchrone(
+        "postgresql://user:pass@db:5432/taxe?sslmode=require&application_name=api"
+    )
+    assert url == "postgresql+asyncpg://user:pass@db:5432/taxe?application_name=api"
+    assert connect_args == {"ssl": "require"}
+
+
+def test_url_asynchrone_conserve_le_mot_de_passe_encode():
+    url, _ = _url_asynchrone("postgresql://user:p%40ss%3Aword@db/taxe")
+    assert url == "postgresql+asyncpg://user:p%40ss%3Aword@db/taxe"
+
+
+def test_url_asynchrone_deja_asyncpg():
+    assert _url_asynchrone("postgresql+asyncpg://u:p@db/taxe") == ("postgresql+asyncpg://u:p@db/taxe", {})
+
+
+@pytest.mark.database
+def test_session_asynchrone_identique_a_la_synchrone(db):
+    from database.database import AsyncSessionLocal, async_engine
+    from database.models import InfoCollecte
+
+    requete = select(InfoCollecte.id).order_by(InfoCollecte.id.desc()).limit(100)
+
+    async def lire():
+        try:
+            async with AsyncSessionLocal() as session:
+                ids = (await session.execute(requete)).scalars().all()
+                nombre = (await session.execute(select(func.count(InfoCollecte.id)))).scalar_one()
+                return ids, nombre
+        finally:
+            await async_engine.dispose()
+
+    ids, nombre = asyncio.run(lire())
+    assert ids == db.execute(requete).scalars().all()
+    assert nombre == db.execute(select(func.count(InfoCollecte.id))).scalar_one()
@@ -0,0 +1,82 @@
+"""
+Envoi des relances SMS en parallèle contre le faux serveur Ventis de
+scripts/benchmark_envoi_relances.py (aucun appel réel, aucune base de données)
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from scripts.benchmark_envoi_relances import demarrer_faux_ventis
+from services import envoi_relances, ventis_messaging
+
+LATENCE = 0.05
+
+
+@pytest.fixture
+def faux_ventis(monkeypatch):
+    def demarrer(latence: float = LATENCE, taux_erreur: float = 0.0):
+        serveur = demarrer_faux_ventis(latence, taux_erreur)
+        url = f"http://127.0.0.1:{serveur.server_address[1]}"
+        monkeypatch.setenv("VENTIS_MESSAGING_URL", f"{url}/messaging/api/v1")
+        monkeypatch.setenv("KEYCLOAK_MESSAGING_HOST", url)
+        monkeypatch.setenv("KEYCLOAK_MESSAGING_CLIENT_SECRET", "test")
+        monkeypatch.setattr(ventis_messaging, "TOKEN_CACHE_FILE", "")
+        monkeypatch.setattr(envoi_relances, "ventis_messaging_service", ventis_messaging.VentisMessagingService())
+        monkeypatch.setattr(envoi_relances, "ENVOI_DELAI_BASE", 0.01)
+        serveurs.append(serveur)
+
+    serveurs = []
+    yield demarrer
+    for serveur in serveurs:
+        serveur.shutdown()
+
+
+def _envois(nombre: int):
+    return [
+        envoi_relances.EnvoiRelance(
+            relance_id=i, affectation_taxe_id=i, telephone=f"2410{i:07d}", message="Rappel de test"
+        )
+        for i in range(nombre)
+    ]
+
+
+def _envoyer(envois, **options):
+    async def _tout_envoyer():
+        try:
+            return await envoi_relances.envoyer_sms(envois, **options)
+        finally:
+            await envoi_relances.fermer_clients()
+
+    debut = time.perf_counter()
+    resultats = asyncio.run(_tout_envoyer())
+    return resultats, time.perf_counter() - debut
+
+
+def test_envois_paralleles_plus_rapides_qu_en_sequence(faux_ventis):
+    faux_ventis()
+    envois = _envois(40)
+    resultats, duree = _envoyer(envois, concurrence=10, debit_max=0)
+
+    assert [r.relance_id for r in resultats] == [e.relance_id for e in envois]
+    assert all(r.succes for r in resultats)
+    # 40 appels de 50 ms : 2 s en séquence, environ 0,2 s à 10 en parallèle
+    assert duree < len(envois) * LATENCE / 3
+
+
+def test_erreurs_transitoires_retentees(faux_ventis):
+    faux_ventis(latence=0.0, taux_erreur=0.2)
+    resultats, _ = _envoyer(_envois(40), concurrence=10, debit_max=0, tentatives_max=8)
+
+    assert all(r.succes for r in resultats)
+    assert sum(r.tentatives for r in resultats) > len(resultats)
+
+
+def test_debit_maximal_respecte(faux_ventis):
+    faux_ventis(latence=0.0)
+    resultats, duree = _envoyer(_envois(10), concurrence=10, debit_max=20)
+
+    assert all(r.succes for r in resultats)
+    # 10 départs espacés de 50 ms
+    assert duree >= 9 / 20
@@ -0,0 +1,111 @@
+"""
+Bornes semi-ouvertes [début, fin) des filtres de dates (services/plages_dates.py)
+"""
+
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import Column, DateTime, Integer, MetaData, Table, create_engine, insert, select, text
+
+from services.plages_dates import bornes_jour, filtre_jour, filtres_periode
+
+metadata = MetaData()
+evenements = Table(
+    "evenement",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("date_evenement", DateTime, nullable=False),
+)
+
+# Instants autour des limites du 31/01 et du 01/02/2026
+INSTANTS = [
+    datetime(2026, 1, 30, 23, 59, 59, 999999),
+    datetime(2026, 1, 31, 0, 0),
+    datetime(2026, 1, 31, 12, 30),
+    datetime(2026, 1, 31, 23, 59, 59, 999999),
+    datetime(2026, 2, 1, 0, 0),
+    datetime(2026, 2, 1, 23, 59, 59),
+    datetime(2026, 2, 2, 0, 0),
+]
+
+
+@pytest.fixture(scope="module")
+def connexion():
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    with engine.connect() as conn:
+        conn.execute(insert(evenements), [{"date_evenement": instant} for instant in INSTANTS])
+        yield conn
+
+
+def _selection(connexion, *conditions):
+    return connexion.execute(
+        select(evenements.c.date_evenement).where(*conditions).order_by(evenements.c.date_evenement)
+    ).scalars().all()
+
+
+def test_bornes_jour():
+    assert bornes_jour(date(2026, 1, 31)) == (datetime(2026, 1, 31), datetime(2026, 2, 1))
+    # Changement de mois et d'année, année bissextile
+    assert bornes_jour(date(2025, 12, 31))[1] == datetime(2026, 1, 1)
+    assert bornes_jour(date(2028, 2, 28))[1] == datetime(2028, 2, 29)
+
+
+def test_filtre_jour_inclut_minuit_et_exclut_le_lendemain(connexion):
+    assert _selection(connexion, filtre_jour(evenements.c.date_evenement, date(2026, 1, 31))) == [
+        datetime(2026, 1, 31, 0, 0),
+        datetime(2026, 1, 31, 12, 30),
+        datetime(2026, 1, 31, 23, 59, 59, 999999),
+    ]
+
+
+def test_filtres_periode_bornes_incluses(connexion):
+    conditions = filtres_periode(evenements.c.date_evenement, date(2026, 1, 31), date(2026, 2, 1))
+    assert _selection(connexion, *conditions) == INSTANTS[1:6]
+
+
+def test_filtres_periode_identique_a_func_date(connexion):
+    """Même sélection que l'ancien filtre date(colonne) BETWEEN date_debut AND date_fin"""
+    debut = date(2026, 1, 30)
+    for jours in range(4):
+        fin = debut + timedelta(days=jours)
+        attendu = [instant for instant in INSTANTS if debut <= instant.date() <= fin]
+        assert _selection(connexion, *filtres_periode(evenements.c.date_evenement, debut, fin)) == attendu
+
+
+def test_filtres_periode_borne_absente(connexion):
+    assert filtres_periode(evenements.c.date_evenement) == []
+    assert _selection(connexion, *filtres_periode(evenements.c.date_evenement, date_debut=date(2026, 2, 1))) == INSTANTS[4:]
+    assert _selection(connexion, *filtres_periode(evenements.c.date_evenement, date_fin=date(2026, 1, 30))) == INSTANTS[:1]
+
+
+def test_conditions_sans_fonction_sur_la_colonne():
+    """La colonne est comparée telle quelle, un index sur elle reste utilisable"""
+    condition = filtre_jour(evenements.c.date_evenement, date(2026, 1, 31))
+    sql = str(condition.compile(compile_kwargs={"literal_binds": True}))
+    assert "date(" not in sql.lower()
+    assert "evenement.date_evenement >= '2026-01-31 00:00:00'" in sql
+    assert "evenement.date_evenement < '2026-02-01 00:00:00'" in sql
+
+
+@pytest.mark.database
+@pytest.mark.parametrize(
+    "index, condition",
+    [
+        ("idx_info_collecte_statut_annule_date", "statut = 'completed' AND annule = FALSE"),
+        ("idx_info_collecte_collecteur_date", "collecteur_id = 1"),
+    ],
+)
+def test_explain_utilise_les_index_date_collecte(db, index, condition):
+    debut, fin = bornes_jour(date.today())
+    # Sans parcours séquentiel possible, le plan montre si l'index est utilisable par ces bornes
+    db.execute(text("SET LOCAL enable_seqscan = off"))
+    plan = db.execute(
+        text(f"""
+            EXPLAIN (FORMAT JSON)
+            SELECT id FROM info_collecte
+            WHERE {condition} AND date_collecte >= :debut AND date_collecte < :fin
+        """),
+        {"debut": debut, "fin": fin},
+    ).scalar()
+    assert index in str(plan)
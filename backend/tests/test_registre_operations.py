@@ -0,0 +1,88 @@
+"""
+Pagination par curseur du registre des opérations de caisse
+(encoder_curseur / decoder_curseur / filtre_apres / curseur_suivant)
+"""
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import Column, DateTime, Integer, MetaData, Table, create_engine, insert, select
+
+from database.models import OperationCaisse
+from services.registre_operations import (
+    curseur_suivant,
+    decoder_curseur,
+    encoder_curseur,
+    filtre_apres,
+    ordre_registre,
+)
+
+
+def _operation(identifiant: int, date_operation: datetime):
+    return SimpleNamespace(id=identifiant, date_operation=date_operation)
+
+
+@pytest.mark.parametrize(
+    "date_operation",
+    [datetime(2026, 3, 1, 8, 0), datetime(2026, 3, 1, 8, 0, 0, 123456), datetime(1999, 12, 31, 23, 59, 59)],
+)
+def test_aller_retour_du_curseur(date_operation):
+    curseur = encoder_curseur(_operation(4217, date_operation))
+    assert decoder_curseur(curseur) == (date_operation, 4217)
+    # Utilisable tel quel dans une URL
+    assert all(c.isalnum() or c in "-_=" for c in curseur)
+
+
+@pytest.mark.parametrize("curseur", ["", "pas-un-curseur", "bWFs", encoder_curseur(_operation(1, datetime(2026, 1, 1)))[:-4]])
+def test_curseur_invalide(curseur):
+    with pytest.raises(ValueError):
+        decoder_curseur(curseur)
+
+
+def test_curseur_suivant_seulement_si_page_complete():
+    operations = [_operation(i, datetime(2026, 3, 1) - timedelta(minutes=i)) for i in range(1, 4)]
+    assert curseur_suivant(operations, 3) == encoder_curseur(operations[-1])
+    assert curseur_suivant(operations, 4) is None
+    assert curseur_suivant(operations, None) is None
+
+
+@pytest.fixture(scope="module")
+def connexion():
+    """Table operation_caisse réduite aux colonnes du tri, dans SQLite en mémoire"""
+    metadata = MetaData()
+    table = Table(
+        OperationCaisse.__tablename__,
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("date_operation", DateTime),
+    )
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    debut = datetime(2026, 3, 1, 8, 0)
+    with engine.connect() as conn:
+        # Plusieurs opérations par instant : le tri départage par id
+        conn.execute(
+            insert(table),
+            [{"id": i, "date_operation": debut + timedelta(minutes=i // 4)} for i in range(1, 58)],
+        )
+        yield conn
+
+
+def test_pages_successives_couvrent_tout_le_registre_sans_doublon(connexion):
+    colonnes = (OperationCaisse.id, OperationCaisse.date_operation)
+    tout = connexion.execute(select(*colonnes).order_by(*ordre_registre())).all()
+
+    vues, curseur = [], None
+    while True:
+        requete = select(*colonnes).order_by(*ordre_registre()).limit(10)
+        if curseur:
+            requete = requete.where(filtre_apres(curseur))
+        page = connexion.execute(requete).all()
+        vues.extend(page)
+        curseur = curseur_suivant(page, 10)
+        if curseur is None:
+            break
+
+    assert [ligne.id for ligne in vues] == [ligne.id for ligne in tout]
+    assert len({ligne.id for ligne in vues}) == 57
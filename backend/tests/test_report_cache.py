@@ -0,0 +1,70 @@
+"""
+Cache des rapports sur un serveur compatible Redis (client factice en mémoire)
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from services import report_cache
+from services.report_cache import RedisCacheBackend
+
+
+class FauxRedis:
+    """Reproduit le stockage de Redis : des octets, INCR sur un entier brut"""
+
+    def __init__(self):
+        self.donnees = {}
+
+    def get(self, key):
+        return self.donnees.get(key)
+
+    def set(self, key, value, ex=None):
+        self.donnees[key] = value
+
+    def incr(self, key):
+        valeur = int(self.donnees.get(key, b"0")) + 1
+        self.donnees[key] = str(valeur).encode()
+        return valeur
+
+
+@pytest.fixture
+def client(monkeypatch):
+    faux = FauxRedis()
+    monkeypatch.setattr(
+        report_cache, "redis", SimpleNamespace(Redis=SimpleNamespace(from_url=lambda url, **kwargs: faux))
+    )
+    backend = RedisCacheBackend("redis://faux")
+    ancien = report_cache._backend
+    report_cache.set_backend(backend)
+    yield faux
+    report_cache.set_backend(ancien)
+
+
+def test_version_lue_apres_incr(client):
+    backend = report_cache._backend
+    assert report_cache._version_courante() == 0
+    assert backend.incr(report_cache._VERSION_KEY) == 1
+    assert client.donnees[report_cache._VERSION_KEY] == b"1"
+    assert report_cache._version_courante() == 1
+
+    backend.set("cle", {"total": 3})
+    assert backend.get("cle") == {"total": 3}
+
+
+def test_cache_toujours_actif_apres_invalidation(client):
+    appels = []
+
+    @report_cache.cached_report("test_redis")
+    def rapport(annee: int):
+        appels.append(annee)
+        return {"annee": annee, "appel": len(appels)}
+
+    assert rapport(2026) == rapport(2026)
+    report_cache.invalider_cache_rapports()
+    assert report_cache._version_courante() == 1
+    assert rapport(2026) == {"annee": 2026, "appel": 2}
+    assert rapport(2026) == {"annee": 2026, "appel": 2}
+
+    stats = report_cache.get_cache_stats()["espaces"]["test_redis"]
+    assert stats == {"hits": 2, "misses": 2, "errors": 0}
@@ -0,0 +1,82 @@
+"""
+Cumul journalier des collectes : le cumul maintenu par les hooks doit rester
+identique à celui recalculé depuis info_collecte, y compris quand plusieurs
+transactions modifient la même clé (jour, collecteur, taxe, moyen) en même temps.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+pytestmark = pytest.mark.database
+
+# Journée sans collecte réelle, réservée au test
+JOUR_TEST = date(2000, 1, 3)
+NOMBRE_COLLECTES = 60
+
+
+def test_cumul_identique_aux_collectes(db):
+    from services.rollup_collectes import comparer_rollup
+
+    assert comparer_rollup(db) == []
+
+
+def test_collectes_concurrentes_sur_une_meme_cle(db):
+    from database.database import SessionLocal
+    from database.models import (
+        CollecteDailyRollup,
+        Collecteur,
+        Contribuable,
+        InfoCollecte,
+        StatutCollecteEnum,
+        Taxe,
+        TypePaiementEnum,
+    )
+    from services.collecte_hooks import collectes_modifiees
+    from services.references_collecte import prochaine_reference
+    from services.rollup_collectes import comparer_rollup
+
+    contribuable = db.query(Contribuable).first()
+    collecteur = db.query(Collecteur).first()
+    taxe = db.query(Taxe).first()
+    if not (contribuable and collecteur and taxe):
+        pytest.skip("Base sans contribuable, collecteur ou taxe")
+
+    def creer_collecte(_) -> int:
+        session = SessionLocal()
+        try:
+            collecte = InfoCollecte(
+                contribuable_id=contribuable.id,
+                collecteur_id=collecteur.id,
+                taxe_id=taxe.id,
+                montant=Decimal("100.00"),
+                type_paiement=TypePaiementEnum.ESPECES,
+                statut=StatutCollecteEnum.COMPLETED,
+                reference=prochaine_reference(session, JOUR_TEST),
+                date_collecte=datetime.combine(JOUR_TEST, datetime.min.time()).replace(hour=12),
+            )
+            session.add(collecte)
+            collectes_modifiees(session, [collecte])
+            session.commit()
+            return collecte.id
+        finally:
+            session.close()
+
+    with ThreadPoolExecutor(max_workers=12) as executor:
+        ids = list(executor.map(creer_collecte, range(NOMBRE_COLLECTES)))
+
+    try:
+        assert comparer_rollup(db, depuis=JOUR_TEST, jusqu_a=JOUR_TEST) == []
+        ligne = db.get(
+            CollecteDailyRollup, (JOUR_TEST, collecteur.id, taxe.id, TypePaiementEnum.ESPECES)
+        )
+        assert ligne.nombre_transactions >= NOMBRE_COLLECTES
+    finally:
+        db.rollback()
+        collectes = db.query(InfoCollecte).filter(InfoCollecte.id.in_(ids)).all()
+        for collecte in collectes:
+            db.delete(collecte)
+        collectes_modifiees(db, collectes)
+        db.commit()
@@ -0,0 +1,16 @@
+"""
+Opérations de caisse concurrentes sur une même caisse : le registre et le solde
+doivent concorder (scripts/stress_operations_caisse.py, en version réduite)
+"""
+
+from decimal import Decimal
+
+import pytest
+
+pytestmark = pytest.mark.database
+
+
+def test_operations_concurrentes_sur_une_caisse():
+    from scripts.stress_operations_caisse import lancer
+
+    assert lancer(300, concurrence=20, solde_initial=Decimal("10000")) == []
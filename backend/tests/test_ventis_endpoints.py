@@ -0,0 +1,101 @@
+"""
+Découverte de l'endpoint d'envoi Ventis : ordre des essais et disjoncteurs
+(VentisMessagingService._endpoints_a_essayer et transitions associées)
+"""
+
+import pytest
+
+from services import ventis_messaging
+
+BASE = "https://ventis.test/messaging/api/v1"
+PRINCIPAL = f"{BASE}/message"
+MESSAGES = "https://ventis.test/messaging/api/messages"
+SMS = "https://ventis.test/messaging/api/sms"
+SEND = "https://ventis.test/messaging/api/send"
+
+
+class Horloge:
+    def __init__(self):
+        self.maintenant = 1000.0
+
+    def __call__(self):
+        return self.maintenant
+
+
+@pytest.fixture
+def horloge(monkeypatch):
+    horloge = Horloge()
+    monkeypatch.setattr(ventis_messaging.time, "monotonic", horloge)
+    return horloge
+
+
+@pytest.fixture
+def service(monkeypatch, horloge):
+    monkeypatch.setenv("VENTIS_MESSAGING_URL", BASE)
+    monkeypatch.setenv("KEYCLOAK_MESSAGING_CLIENT_SECRET", "test")
+    return ventis_messaging.VentisMessagingService()
+
+
+def test_ordre_initial(service):
+    assert service._endpoints_a_essayer() == [PRINCIPAL, MESSAGES, SMS, SEND]
+
+
+def test_endpoint_reussi_essaye_seul_en_premier(service):
+    service._endpoint_absent(PRINCIPAL)
+    service._endpoint_absent(MESSAGES)
+    service._endpoint_reussi(SMS)
+
+    assert service._endpoints_a_essayer() == [SMS, SEND]
+
+
+def test_endpoint_absent_reverifie_apres_le_delai(service, horloge):
+    service._endpoint_absent(PRINCIPAL)
+    service._endpoint_reussi(MESSAGES)
+    assert service._endpoints_a_essayer()[0] == MESSAGES
+    assert PRINCIPAL not in service._endpoints_a_essayer()
+
+    horloge.maintenant += ventis_messaging.ENDPOINT_REVERIFICATION
+    # Le principal est revérifié une fois avant l'endpoint actif
+    assert service._endpoints_a_essayer()[:2] == [PRINCIPAL, MESSAGES]
+
+    service._endpoint_reussi(PRINCIPAL)
+    assert service._endpoints_a_essayer()[0] == PRINCIPAL
+    assert PRINCIPAL not in service._disjoncteurs
+
+
+def test_disjoncteur_ouvert_apres_echecs_consecutifs(service, horloge):
+    for _ in range(ventis_messaging.ENDPOINT_ECHECS_MAX - 1):
+        service._endpoint_en_erreur(PRINCIPAL, 503)
+    assert PRINCIPAL in service._endpoints_a_essayer()
+
+    service._endpoint_en_erreur(PRINCIPAL, None)  # erreur réseau
+    assert PRINCIPAL not in service._endpoints_a_essayer()
+
+    # Demi-ouvert à l'échéance : un nouvel essai est autorisé
+    horloge.maintenant += ventis_messaging.ENDPOINT_DELAI_DISJONCTEUR
+    assert service._endpoints_a_essayer()[0] == PRINCIPAL
+
+
+def test_erreur_client_referme_le_disjoncteur(service):
+    service._endpoint_en_erreur(PRINCIPAL, 500)
+    service._endpoint_en_erreur(PRINCIPAL, 400)  # l'endpoint répond
+    assert PRINCIPAL not in service._disjoncteurs
+
+
+def test_reussite_remet_les_echecs_a_zero(service):
+    for _ in range(ventis_messaging.ENDPOINT_ECHECS_MAX - 1):
+        service._endpoint_en_erreur(PRINCIPAL, 502)
+    service._endpoint_reussi(PRINCIPAL)
+    service._endpoint_en_erreur(PRINCIPAL, 502)
+    assert service._disjoncteurs[PRINCIPAL].echecs == 1
+
+
+def test_reponse_quand_tous_les_endpoints_sont_coupes(service):
+    for endpoint in (PRINCIPAL, MESSAGES, SMS, SEND):
+        service._endpoint_absent(endpoint)
+    assert service._endpoints_a_essayer() == []
+    assert service._reponse_disjoncteurs_ouverts()["status_code"] == 404
+
+    for _ in range(ventis_messaging.ENDPOINT_ECHECS_MAX):
+        service._endpoint_en_erreur(SEND, 503)
+    assert service._reponse_disjoncteurs_ouverts()["error"] == "CIRCUIT_OPEN"